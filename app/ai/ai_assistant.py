@@ -1,47 +1,147 @@
-import io
-from contextlib import redirect_stdout
-from langchain_aws import ChatBedrock
-from langchain_community.utilities import SQLDatabase
-from langchain_community.agent_toolkits import create_sql_agent
-
-def ask_pos_ai(user_question):
-    # Path to your database
-    db = SQLDatabase.from_uri("sqlite:///database/posai.db")
-    
-    # Amazon Nova Micro
-    llm = ChatBedrock(
-        model_id="amazon.nova-micro-v1:0",
-        region_name="us-east-1",
-        model_kwargs={"temperature": 0}
-    )
-    
-    # 'tool-calling' is the key here. It handles all prompt variables 
-    # automatically and stops the 'Observation' infinite loop.
-    agent_executor = create_sql_agent(
-        llm=llm,
-        db=db,
-        agent_type="tool-calling", 
-        verbose=True # Keep verbose as True
-    )
-    
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from types import SimpleNamespace
+
+logger = logging.getLogger(__name__)
+
+# LangChain and its dependencies take seconds to import, so they are loaded on
+# the first question (or by prewarm_ai) rather than at startup. The chat model
+# backend (and the AWS SDK for Bedrock) is imported when the engine is built.
+_stack = None
+_stack_lock = threading.Lock()
+_prewarm = None
+
+# Agent runs mostly wait on the model; this many run at once per process and
+# further questions queue.
+AI_WORKERS = 4
+_workers = None
+
+CANCELLED = "Question cancelled."
+
+
+def load_ai_stack() -> SimpleNamespace:
+    """
+    Import the LangChain stack once and return the classes used here.
+
+    Returns:
+        SimpleNamespace: The LangChain classes and factories the query engine uses
+    """
+    global _stack
+    if _stack is None:
+        with _stack_lock:
+            if _stack is None:
+                start = time.perf_counter()
+                from langchain_community.utilities import SQLDatabase
+                from langchain_community.agent_toolkits import create_sql_agent
+                from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+                try:
+                    from langchain_classic.agents import AgentExecutor, create_tool_calling_agent
+                except ImportError:
+                    from langchain.agents import AgentExecutor, create_tool_calling_agent
+                _stack = SimpleNamespace(
+                    SQLDatabase=SQLDatabase,
+                    create_sql_agent=create_sql_agent,
+                    ChatPromptTemplate=ChatPromptTemplate,
+                    MessagesPlaceholder=MessagesPlaceholder,
+                    AgentExecutor=AgentExecutor,
+                    create_tool_calling_agent=create_tool_calling_agent,
+                )
+                logger.info(f"AI stack loaded in {time.perf_counter() - start:.2f}s")
+    return _stack
+
+
+def prewarm_ai(delay: float = 0.0) -> threading.Thread:
+    """
+    Load the AI stack and build the query engine in a daemon thread, after ``delay`` seconds.
+
+    Call once the POS screen is interactive so the first chat question does
+    not pay the import cost. Only the first call per process starts a thread.
+    Failures are logged; chat reports them on use.
+    """
+    global _prewarm
+    with _stack_lock:
+        if _prewarm is not None:
+            return _prewarm
+
+    def warm():
+        if delay:
+            time.sleep(delay)
+        from app.ai.query_engine import get_query_engine
+
+        try:
+            load_ai_stack()
+            get_query_engine().warm()
+        except Exception as e:
+            logger.warning(f"AI stack prewarm failed: {e}")
+
+    with _stack_lock:
+        if _prewarm is None:
+            _prewarm = threading.Thread(target=warm, name="ai-prewarm", daemon=True)
+            _prewarm.start()
+    return _prewarm
+
+
+def submit_question(user_question: str, on_event=None, cancel: threading.Event = None) -> Future:
+    """
+    Answer ``user_question`` on the AI worker pool instead of the caller's thread.
+
+    Args:
+        user_question: The question text
+        on_event: Optional ``on_event(kind, payload)`` for streamed tokens, steps
+            and query results, called from the worker thread
+        cancel: Optional event that stops the run at its next token or step
+
+    Returns:
+        Future: Resolves to the answer text (``CANCELLED`` if cancelled)
+    """
+    global _workers
+    if _workers is None:
+        with _stack_lock:
+            if _workers is None:
+                _workers = ThreadPoolExecutor(max_workers=AI_WORKERS, thread_name_prefix="ai-worker")
+    return _workers.submit(ask_pos_ai, user_question, on_event, cancel)
+
+
+def ask_pos_ai(user_question, on_event=None, cancel: threading.Event = None):
+    # Common questions are answered by the intent router without the LLM. The
+    # rest go to the engine (built once per process); repeated questions are
+    # answered from the cache until their tables change.
+    from app.ai.answer_cache import get_answer_cache
+    from app.ai.intent_router import get_intent_router
+    from app.ai.query_engine import get_query_engine
+
+    if cancel is not None and cancel.is_set():
+        return CANCELLED
+
+    router = get_intent_router()
+    start = time.perf_counter()
+    try:
+        routed = router.route(user_question)
+    except Exception as e:
+        logger.warning(f"Intent router failed, using the agent: {e}")
+        routed = None
+    route_time = time.perf_counter() - start
+    hit_rate = router.stats()["hit_rate"]
+    if routed is not None:
+        logger.info(f"Answered by intent router ({routed.intent}) in {route_time * 1e3:.1f} ms "
+                    f"(router hit rate {hit_rate:.0%})")
+        return routed.answer
+
+    cache = get_answer_cache()
+    answer, ticket = cache.lookup(user_question)
+    if answer is not None:
+        return answer
+
     try:
-        # We use a system message to guide its behavior without breaking the template
-        query = (
-            f"Analyze the available database tables and their schema carefully. "
-            f"Then, using the available tools, answer this question: {user_question}\n"
-            f"Provide only the factual answer to the question, without any additional explanation, "
-            f"conversational text, or internal thoughts."
-        )
-        
-        # Redirect stdout to a StringIO object to capture the verbose output
-        # This prevents it from being printed to the console.
-        f = io.StringIO()
-        with redirect_stdout(f):
-            response = agent_executor.invoke({"input": query})
-        
-        # The captured verbose output is now in 'f.getvalue()' but is not printed.
-        # You can choose to log 'f.getvalue()' to a file or discard it.
-
-        return response["output"][0]["text"]
+        result = get_query_engine().process_query(user_question, on_event=on_event, cancel=cancel)
     except Exception as e:
+        if cancel is not None and cancel.is_set():
+            logger.info(f"AI question cancelled after {time.perf_counter() - start:.2f}s")
+            return CANCELLED
         return f"AI Error: {str(e)}"
+    cache.store(ticket, result.answer, result.sql)
+    logger.info(f"Answered by agent in {result.total:.2f}s after {route_time * 1e3:.1f} ms routing "
+                f"(router hit rate {hit_rate:.0%})")
+    return result.answer
@@ -0,0 +1,214 @@
+"""
+Answer cache for the POS assistant.
+
+Managers ask the same few questions many times a day, and each costs a
+multi-second agent run. Answers are cached by normalized question text and
+tagged with the tables their SQL read (views resolve to their base tables).
+An entry is served only while none of those tables has changed, as tracked by
+``app.data.changes``, and while it is younger than its TTL; the TTL also
+bounds how long a write by another process can go unnoticed.
+"""
+
+import logging
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from app.data import changes, products
+
+logger = logging.getLogger(__name__)
+
+# Answers older than this are re-asked even if no write was seen.
+DEFAULT_TTL = 15 * 60
+
+# Least recently used entries are dropped beyond this.
+MAX_ENTRIES = 256
+
+
+def normalize_question(question: str) -> str:
+    """
+    Case-, spacing- and punctuation-insensitive cache key for a question.
+    """
+    text = question.lower().replace("’", "'")
+    return " ".join(re.sub(r"[^\w']+", " ", text).replace("'", "").split())
+
+
+def tables_read(statements, db_path) -> tuple:
+    """
+    Base tables read by ``statements``, found by preparing each one under an authorizer.
+
+    Statements that do not prepare (the agent's failed attempts) are skipped.
+
+    Returns:
+        tuple: Sorted upper-case table names, empty if nothing could be attributed
+    """
+    tables = set()
+
+    def authorize(action, table, column, database, source):
+        if action == sqlite3.SQLITE_READ and table:
+            tables.add(table.upper())
+        return sqlite3.SQLITE_OK
+
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        conn.set_authorizer(authorize)
+        for statement in statements:
+            try:
+                conn.execute(f"EXPLAIN {statement}").fetchall()
+            except sqlite3.Error:
+                continue
+    finally:
+        conn.close()
+    return tuple(sorted(tables))
+
+
+@dataclass
+class CacheEntry:
+    """
+    Cached answer with the versions of the tables it was computed from.
+    """
+    answer: str
+    tables: tuple
+    versions: tuple
+    expires: float
+
+
+@dataclass
+class CacheTicket:
+    """
+    Returned by a cache miss; pass it to ``store`` with the fresh answer.
+    """
+    key: str
+    counters: dict
+
+
+class AnswerCache:
+    """
+    Bounded LRU cache of assistant answers, invalidated by writes to the tables they read.
+    """
+
+    def __init__(self, db_path=None, ttl: float = DEFAULT_TTL, max_entries: int = MAX_ENTRIES) -> None:
+        """
+        Initialize the cache.
+
+        Args:
+            db_path: Database the answers come from, defaults to the app database
+            ttl: Seconds an entry may be served
+            max_entries: Maximum number of entries kept
+        """
+        self.db_path = db_path or products.DB_PATH
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.expired = 0
+        self.evictions = 0
+        self.uncacheable = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def lookup(self, question: str) -> tuple:
+        """
+        Look up ``question``.
+
+        Returns:
+            tuple: (answer, None) on a hit, (None, CacheTicket) on a miss
+        """
+        key = normalize_question(question)
+        # Taken before the question is answered, so writes made while the
+        # agent runs leave the stored entry stale.
+        changes.poll_external(self.db_path)
+        counters = changes.snapshot()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry.expires <= time.monotonic():
+                    del self._entries[key]
+                    self.expired += 1
+                elif entry.versions != changes.version(*entry.tables, at=counters):
+                    del self._entries[key]
+                    self.stale += 1
+                else:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry.answer, None
+            self.misses += 1
+        return None, CacheTicket(key=key, counters=counters)
+
+    def store(self, ticket: CacheTicket, answer: str, statements) -> bool:
+        """
+        Cache the answer to a missed question.
+
+        Args:
+            ticket: The ticket returned by ``lookup``
+            answer: The answer text
+            statements: SQL the agent ran to produce it
+
+        Returns:
+            bool: False if no table could be attributed and nothing was cached
+        """
+        tables = tables_read(statements, self.db_path) if statements else ()
+        if not tables:
+            with self._lock:
+                self.uncacheable += 1
+            return False
+
+        entry = CacheEntry(
+            answer=answer,
+            tables=tables,
+            versions=changes.version(*tables, at=ticket.counters),
+            expires=time.monotonic() + self.ttl,
+        )
+        with self._lock:
+            self._entries[ticket.key] = entry
+            self._entries.move_to_end(ticket.key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        logger.debug(f"Cached answer for '{ticket.key}' (reads {', '.join(tables)})")
+        return True
+
+    def clear(self) -> None:
+        """
+        Drop every entry; statistics are kept.
+        """
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """
+        Entry count and hit/miss statistics.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "stale": self.stale,
+                "expired": self.expired,
+                "evictions": self.evictions,
+                "uncacheable": self.uncacheable,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_answer_cache() -> AnswerCache:
+    """
+    Return the process-wide answer cache, creating it on first use.
+    """
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = AnswerCache()
+    return _cache
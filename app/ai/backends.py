@@ -0,0 +1,118 @@
+"""
+Chat model backends for the POS assistant.
+
+The engine used to hard-code Bedrock in us-east-1, so every question paid a
+cross-region round trip and the assistant failed completely offline. The
+backend is now chosen by configuration:
+
+- ``bedrock``: Amazon Bedrock through ``langchain_aws`` (the default)
+- ``local``: a model server on this machine or the shop LAN speaking the
+  OpenAI chat-completions protocol, e.g. Ollama at http://localhost:11434
+- ``fake``: a deterministic in-process model that writes SQL from keywords,
+  for load tests and benchmarks on machines with no network
+
+Each backend is a factory returning a LangChain chat model that supports
+tool calling, so the agent code is the same for all of them.
+
+Environment variables:
+
+- ``POSAI_LLM_BACKEND``: bedrock, local or fake
+- ``POSAI_LLM_MODEL``: model id for the chosen backend
+- ``POSAI_LLM_URL``: base URL of the local model server
+- ``POSAI_LLM_REGION``: Bedrock region
+- ``POSAI_FAKE_LLM_LATENCY``: seconds the fake model waits per call
+"""
+
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BACKEND = "bedrock"
+
+# Model id per backend when POSAI_LLM_MODEL is not set.
+DEFAULT_MODELS = {
+    "bedrock": "amazon.nova-micro-v1:0",
+    "local": "mistral:7b-instruct-q4_0",
+    "fake": "fake-sql",
+}
+
+BEDROCK_REGION = "us-east-1"
+
+LOCAL_URL = "http://localhost:11434"
+
+# Seconds to wait for the local server to answer one request.
+LOCAL_TIMEOUT = 120.0
+
+
+def backend_name(name: str = None) -> str:
+    """
+    Resolve the backend to use: ``name``, else ``POSAI_LLM_BACKEND``, else the default.
+    """
+    name = (name or os.environ.get("POSAI_LLM_BACKEND") or DEFAULT_BACKEND).lower()
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown LLM backend '{name}', expected one of: {', '.join(BACKENDS)}")
+    return name
+
+
+def bedrock_chat_model(model: str):
+    """
+    Bedrock chat model (imports boto3 and langchain_aws on first use).
+    """
+    from langchain_aws import ChatBedrock
+
+    # Streamed so the chat view shows the answer as it is written and a
+    # cancel stops the generation at the next token.
+    return ChatBedrock(
+        model_id=model,
+        region_name=os.environ.get("POSAI_LLM_REGION", BEDROCK_REGION),
+        model_kwargs={"temperature": 0},
+        streaming=True
+    )
+
+
+def local_chat_model(model: str):
+    """
+    Chat model served over HTTP by a local OpenAI-compatible server.
+    """
+    from app.ai.local_models import LocalChatModel
+
+    return LocalChatModel(
+        model=model,
+        base_url=os.environ.get("POSAI_LLM_URL", LOCAL_URL),
+        timeout=LOCAL_TIMEOUT,
+        streaming=True,
+    )
+
+
+def fake_chat_model(model: str):
+    """
+    Deterministic in-process chat model; no network.
+    """
+    from app.ai.local_models import FakeChatModel
+
+    return FakeChatModel(model=model, latency=float(os.environ.get("POSAI_FAKE_LLM_LATENCY", "0")))
+
+
+BACKENDS = {
+    "bedrock": bedrock_chat_model,
+    "local": local_chat_model,
+    "fake": fake_chat_model,
+}
+
+
+def create_chat_model(backend: str = None, model: str = None):
+    """
+    Build the chat model for a backend.
+
+    Args:
+        backend: Backend name, defaults to ``POSAI_LLM_BACKEND`` or bedrock
+        model: Model id, defaults to ``POSAI_LLM_MODEL`` or the backend's default
+
+    Returns:
+        BaseChatModel: A LangChain chat model with tool calling
+    """
+    backend = backend_name(backend)
+    model = model or os.environ.get("POSAI_LLM_MODEL") or DEFAULT_MODELS[backend]
+    logger.info(f"Using LLM backend {backend} ({model})")
+    return BACKENDS[backend](model)
@@ -0,0 +1,369 @@
+"""
+Deterministic fast path for the assistant's most common questions.
+
+Sales totals, best sellers and low stock map directly onto the
+DAILY_SALES_SUMMARY, PRODUCT_PERFORMANCE and LOW_STOCK_ALERTS definitions, so
+they are recognised here with a few regular expressions, together with their
+parameters (date range, top-N, category), and answered with fixed
+parameterized SQL in milliseconds. A question is only routed if every word in
+it is accounted for by the intent's vocabulary, its parameters or filler
+words, so anything the router is not sure about (comparisons, breakdowns, a
+product name) returns ``None`` and goes to the LLM agent.
+"""
+
+import logging
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta, timezone
+
+from app.data import changes, products
+from app.data.connection import get_reader_pool
+from app.data.rollups import sales_totals
+
+logger = logging.getLogger(__name__)
+
+# PRODUCT_PERFORMANCE's figures, read from PRODUCT_SALES in the order of the
+# metric's index and stopping at the limit; CROSS JOIN keeps PRODUCT_SALES as
+# the outer loop (ORDER BY cannot be a parameter).
+TOP_PRODUCTS_SQL = {
+    metric: f"""SELECT P.NAME, PS.TOTAL_QUANTITY_SOLD, PS.TOTAL_REVENUE, PS.TOTAL_PROFIT
+                FROM PRODUCT_SALES PS
+                CROSS JOIN PRODUCTS P ON P.ID = PS.PRODUCT_ID
+                LEFT JOIN CATEGORIES C ON C.ID = P.CATEGORY_ID
+                WHERE P.IS_ACTIVE = 1 AND (? IS NULL OR C.NAME = ? COLLATE NOCASE) AND PS.TOTAL_QUANTITY_SOLD > 0
+                ORDER BY PS.{column} DESC, PS.PRODUCT_ID DESC
+                LIMIT ?"""
+    for metric, column in (("quantity", "TOTAL_QUANTITY_SOLD"), ("revenue", "TOTAL_REVENUE"), ("profit", "TOTAL_PROFIT"))
+}
+
+LOW_STOCK_SQL = """SELECT NAME, SKU, CURRENT_STOCK, REORDER_LEVEL, ALERT_LEVEL
+                   FROM LOW_STOCK_ALERTS
+                   WHERE (? IS NULL OR CATEGORY_NAME = ? COLLATE NOCASE)
+                     AND (? = 0 OR CURRENT_STOCK = 0)"""
+
+# Default and maximum number of rows listed in an answer.
+DEFAULT_TOP_N = 5
+DEFAULT_LIST_LIMIT = 20
+MAX_LIMIT = 50
+
+NUMBER_WORDS = {
+    "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7,
+    "eight": 8, "nine": 9, "ten": 10, "fifteen": 15, "twenty": 20,
+}
+
+_NUMBER = r"(\d+|" + "|".join(NUMBER_WORDS) + r")"
+
+# "top 5", "first ten", "5 best", "ten products".
+LIMIT_PATTERNS = [
+    re.compile(r"\b(top|first|best)\s+(?P<n>\d+|" + "|".join(NUMBER_WORDS) + r")\b"),
+    re.compile(r"\b(?P<n>\d+|" + "|".join(NUMBER_WORDS) + r")\s+(best|top|most|products?|items?)\b"),
+]
+
+LOW_STOCK = re.compile(
+    r"\b(low[- ]stock|low on stock|running (low|out)|out of stock|reorder|restock|stock alerts?)\b"
+)
+OUT_OF_STOCK = re.compile(r"\b(out of stock|no stock|zero stock)\b")
+TOP_PRODUCTS = re.compile(
+    r"\b(top|best[- ]?sell(ing|ers?)|most (sold|popular|profitable)|highest (revenue|profit)|sell(s|ing)? the most)\b"
+)
+PRODUCT_WORDS = re.compile(r"\b(products?|items?|sellers?|skus?)\b")
+SALES = re.compile(r"\b(sales|sold|revenue|turnover|takings|earn(ed|ings)?|income|transactions?|make|made|average|bills?)\b")
+
+# Words any question may contain; "'s" is stripped before matching.
+FILLER_WORDS = {
+    "what", "which", "how", "much", "many", "is", "are", "was", "were", "be", "the", "a", "an", "our", "my",
+    "we", "us", "me", "i", "do", "did", "does", "have", "has", "had", "show", "list", "give", "tell", "get",
+    "all", "total", "please", "so", "far", "in", "of", "for", "on", "at", "to", "there", "any", "currently",
+    "current", "right", "now", "store", "shop", "that", "and", "category", "categories",
+}
+
+# Further words each intent understands. Anything else sends the question to the agent.
+INTENT_WORDS = {
+    "sales_summary": {
+        "sales", "sale", "sold", "revenue", "turnover", "takings", "earn", "earned", "earnings", "income",
+        "transaction", "transactions", "make", "made", "money", "average", "bill", "bills", "value", "amount",
+        "number", "count", "tax", "discount", "discounts", "summary",
+    },
+    "top_products": {
+        "top", "best", "selling", "bestselling", "seller", "sellers", "most", "sold", "sell", "sells", "popular",
+        "profitable", "highest", "revenue", "profit", "by", "quantity", "units", "product", "products", "item",
+        "items", "sku", "skus", "ever", "time", "first",
+    },
+    "low_stock": {
+        "low", "stock", "stocks", "running", "out", "reorder", "level", "levels", "restock", "restocking",
+        "alert", "alerts", "product", "products", "item", "items", "sku", "skus", "need", "needs", "below",
+        "or", "no", "zero", "left", "top", "first",
+    },
+}
+
+DATE_PATTERNS = [
+    (re.compile(r"\btoday'?s?\b|\bso far\b"), lambda today, m: (today, today, "today")),
+    (re.compile(r"\byesterday'?s?\b"), lambda today, m: (today - timedelta(1), today - timedelta(1), "yesterday")),
+    (re.compile(r"\bthis week'?s?\b"),
+     lambda today, m: (today - timedelta(today.weekday()), today, "this week")),
+    (re.compile(r"\blast week'?s?\b"),
+     lambda today, m: (today - timedelta(today.weekday() + 7), today - timedelta(today.weekday() + 1), "last week")),
+    (re.compile(r"\bthis month'?s?\b"), lambda today, m: (today.replace(day=1), today, "this month")),
+    (re.compile(r"\blast month'?s?\b"),
+     lambda today, m: ((today.replace(day=1) - timedelta(1)).replace(day=1), today.replace(day=1) - timedelta(1),
+                       "last month")),
+    (re.compile(r"\b(last|past) " + _NUMBER + r" days\b"),
+     lambda today, m: (today - timedelta(_number(m.group(2)) - 1), today, f"in the last {_number(m.group(2))} days")),
+    (re.compile(r"\b(\d{4}-\d{2}-\d{2})\b"),
+     lambda today, m: (date.fromisoformat(m.group(1)), date.fromisoformat(m.group(1)), f"on {m.group(1)}")),
+]
+
+
+def _number(text: str) -> int:
+    return int(text) if text.isdigit() else NUMBER_WORDS[text]
+
+
+def parse_date_range(text: str, today: date = None) -> tuple:
+    """
+    Find a single date range in ``text``.
+
+    Args:
+        text: Lower-case question
+        today: Reference day, defaults to the local date
+
+    Returns:
+        tuple: (first day, last day, label), None if there is none, or False if
+            the question names more than one range
+    """
+    today = today or date.today()
+    found = []
+    for pattern, build in DATE_PATTERNS:
+        for match in pattern.finditer(text):
+            try:
+                found.append(build(today, match))
+            except ValueError:
+                return False
+    if len(found) > 1:
+        return False
+    return found[0] if found else None
+
+
+def utc_bounds(first: date, last: date) -> tuple:
+    """
+    CREATED_AT bounds (UTC text, end exclusive) covering local days ``first`` to ``last``.
+    """
+    def utc(day):
+        local_midnight = datetime.combine(day, datetime.min.time()).astimezone()
+        return local_midnight.astimezone(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+
+    return utc(first), utc(last + timedelta(1))
+
+
+def _rupees(amount) -> str:
+    return f"₹ {amount:,.2f}"
+
+
+@dataclass
+class RoutedAnswer:
+    """
+    Answer produced by the router without the LLM.
+    """
+    intent: str
+    params: dict
+    answer: str
+    elapsed: float = 0.0
+
+
+@dataclass
+class _Intent:
+    name: str
+    params: dict = field(default_factory=dict)
+
+
+class IntentRouter:
+    """
+    Recognises common questions and answers them from the database directly.
+    """
+
+    def __init__(self, db_path=None) -> None:
+        """
+        Initialize the router.
+
+        Args:
+            db_path: Database file, defaults to the app database
+        """
+        self.db_path = db_path or products.DB_PATH
+        self.questions = 0
+        self.routed = {}
+        self.route_time = 0.0
+        self._categories = None
+        self._categories_version = None
+        self._lock = threading.Lock()
+
+    def _category_names(self, conn) -> list:
+        """
+        Category names, longest first, re-read only after CATEGORIES changes
+        (here, or in another process as seen by ``changes.poll_external``).
+        """
+        changes.poll_external(self.db_path)
+        current = changes.version("CATEGORIES")
+        if self._categories is None or self._categories_version != current:
+            names = [row[0] for row in conn.execute("SELECT NAME FROM CATEGORIES")]
+            self._categories = sorted(names, key=len, reverse=True)
+            self._categories_version = current
+        return self._categories
+
+    def _category(self, text: str, conn) -> str:
+        for name in self._category_names(conn):
+            if re.search(rf"\b{re.escape(name.lower())}\b", text):
+                return name
+        return None
+
+    @staticmethod
+    def _limit(text: str, default: int) -> int:
+        for pattern in LIMIT_PATTERNS:
+            match = pattern.search(text)
+            if match:
+                return max(1, min(MAX_LIMIT, _number(match.group("n"))))
+        return default
+
+    @staticmethod
+    def _residue(text: str, category: str) -> set:
+        """
+        Words of ``text`` not explained by its date range, category, numbers or filler.
+        """
+        for pattern, _ in DATE_PATTERNS:
+            text = pattern.sub(" ", text)
+        if category:
+            text = re.sub(rf"\b{re.escape(category.lower())}\b", " ", text)
+        # Only a top-N count may be a number; "product 5" is a product name.
+        for pattern in LIMIT_PATTERNS:
+            text = pattern.sub(lambda m: " ".join(w for w in m.group(0).split() if w not in NUMBER_WORDS
+                                                  and not w.isdigit()), text)
+        words = {re.sub(r"'s?$", "", word) for word in re.findall(r"[a-z0-9']+", text)}
+        return {word for word in words if word} - FILLER_WORDS
+
+    def match(self, question: str, conn) -> _Intent:
+        """
+        Classify ``question``; None if it should go to the agent.
+        """
+        text = " ".join(re.sub(r"(?<=[a-z])-(?=[a-z])", " ", question.lower().replace("’", "'")).split())
+        dates = parse_date_range(text)
+        if dates is False:
+            return None
+        category = self._category(text, conn)
+        residue = self._residue(text, category)
+
+        def understood(intent):
+            return residue <= INTENT_WORDS[intent]
+
+        if LOW_STOCK.search(text) and understood("low_stock"):
+            if dates:
+                return None
+            return _Intent("low_stock", {
+                "category": category,
+                "out_of_stock": bool(OUT_OF_STOCK.search(text)),
+                "limit": self._limit(text, DEFAULT_LIST_LIMIT),
+            })
+
+        if TOP_PRODUCTS.search(text) and PRODUCT_WORDS.search(text) and understood("top_products"):
+            # PRODUCT_SALES is all-time; ranges go to the agent.
+            if dates:
+                return None
+            metric = "profit" if "profit" in text else "revenue" if re.search(r"\b(revenue|earn\w*)\b", text) else "quantity"
+            return _Intent("top_products", {"category": category, "metric": metric,
+                                            "limit": self._limit(text, DEFAULT_TOP_N)})
+
+        if SALES.search(text) and category is None and understood("sales_summary"):
+            first, last, label = dates or parse_date_range("today")
+            return _Intent("sales_summary", {"first": first, "last": last, "label": label})
+
+        return None
+
+    def _sales_summary(self, conn, first, last, label) -> str:
+        # Same aggregates as DAILY_SALES_SUMMARY, but over local days; the rollups are by UTC period.
+        count, subtotal, tax, discounts, revenue = sales_totals(conn, *utc_bounds(first, last))
+        average = revenue / count if count else 0
+        if first != last and label != f"on {first}":
+            label = f"{label} ({first} to {last})"
+        if not count:
+            return f"No completed sales {label}."
+        return (f"Sales {label}: {count} transactions, revenue {_rupees(revenue)} "
+                f"(tax {_rupees(tax)}, discounts {_rupees(discounts)}), average sale {_rupees(average)}.")
+
+    def _top_products(self, conn, category, metric, limit) -> str:
+        rows = conn.execute(TOP_PRODUCTS_SQL[metric], (category, category, limit)).fetchall()
+        scope = f" in {category}" if category else ""
+        if not rows:
+            return f"No products{scope} have been sold yet."
+        heading = {"quantity": "quantity sold", "revenue": "revenue", "profit": "profit"}[metric]
+        lines = [f"Top {len(rows)} products{scope} by {heading}:"]
+        for rank, (name, quantity, revenue, profit) in enumerate(rows, 1):
+            figure = {"quantity": f"{quantity:g} sold", "revenue": _rupees(revenue), "profit": _rupees(profit)}[metric]
+            lines.append(f"{rank}. {name}: {figure}")
+        return "\n".join(lines)
+
+    def _low_stock(self, conn, category, out_of_stock, limit) -> str:
+        rows = conn.execute(LOW_STOCK_SQL, (category, category, int(out_of_stock))).fetchall()
+        scope = f" in {category}" if category else ""
+        what = "out of stock" if out_of_stock else "at or below their reorder level"
+        if not rows:
+            return f"No products{scope} are {what}."
+        lines = [f"{len(rows)} products{scope} are {what}:"]
+        for name, sku, stock, reorder, alert in rows[:limit]:
+            lines.append(f"- {name} ({sku}): {stock:g} left, reorder at {reorder:g} [{alert}]")
+        if len(rows) > limit:
+            lines.append(f"...and {len(rows) - limit} more.")
+        return "\n".join(lines)
+
+    def route(self, question: str) -> RoutedAnswer:
+        """
+        Answer ``question`` if it matches a known intent.
+
+        Returns:
+            RoutedAnswer: The answer, or None if the question should go to the agent
+        """
+        start = time.perf_counter()
+        with get_reader_pool(self.db_path).snapshot() as conn:
+            with self._lock:
+                intent = self.match(question, conn)
+            answer = None
+            if intent is not None:
+                answer = getattr(self, f"_{intent.name}")(conn, **intent.params)
+        elapsed = time.perf_counter() - start
+
+        with self._lock:
+            self.questions += 1
+            self.route_time += elapsed
+            if intent is not None:
+                self.routed[intent.name] = self.routed.get(intent.name, 0) + 1
+        if intent is None:
+            return None
+        return RoutedAnswer(intent=intent.name, params=intent.params, answer=answer, elapsed=elapsed)
+
+    def stats(self) -> dict:
+        """
+        Questions seen, questions answered per intent and the hit rate.
+        """
+        with self._lock:
+            routed = sum(self.routed.values())
+            return {
+                "questions": self.questions,
+                "routed": routed,
+                "by_intent": dict(self.routed),
+                "hit_rate": routed / self.questions if self.questions else 0.0,
+                "mean_route_time": self.route_time / self.questions if self.questions else 0.0,
+            }
+
+
+_router = None
+_router_lock = threading.Lock()
+
+
+def get_intent_router() -> IntentRouter:
+    """
+    Return the process-wide intent router, creating it on first use.
+    """
+    global _router
+    if _router is None:
+        with _router_lock:
+            if _router is None:
+                _router = IntentRouter()
+    return _router
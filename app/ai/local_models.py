@@ -0,0 +1,269 @@
+"""
+LangChain chat models that run without a cloud provider.
+
+``LocalChatModel`` talks to a model server on this machine or the shop LAN
+over the OpenAI chat-completions protocol (Ollama, llama.cpp server, vLLM),
+using only the standard library for HTTP. ``FakeChatModel`` answers in
+process and deterministically: it plays the agent's tool calls (schema
+discovery when those tools are offered, then one query chosen from keywords
+in the question) and answers with the query result, so the whole assistant
+pipeline can be exercised and benchmarked offline.
+
+Imported by ``app.ai.backends`` when one of these backends is selected.
+"""
+
+import json
+import re
+import time
+import urllib.error
+import urllib.request
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, HumanMessage, SystemMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+# Keyword pattern -> query the fake model runs. The first match wins.
+FAKE_QUERIES = [
+    (r"\bstock\b|reorder", "SELECT NAME, CURRENT_STOCK, REORDER_LEVEL FROM PRODUCTS "
+                           "WHERE CURRENT_STOCK <= REORDER_LEVEL AND IS_ACTIVE = 1 ORDER BY CURRENT_STOCK LIMIT 10"),
+    (r"categor", "SELECT C.NAME, COUNT(*) FROM PRODUCTS P JOIN CATEGORIES C ON C.ID = P.CATEGORY_ID "
+                 "GROUP BY C.NAME ORDER BY 2 DESC LIMIT 5"),
+    (r"\b(sales|revenue|sold|transactions?)\b", "SELECT COUNT(*), COALESCE(SUM(TOTAL_AMOUNT), 0) FROM TRANSACTIONS "
+                                                "WHERE STATUS = 'COMPLETED'"),
+    (r"\bprice", "SELECT ROUND(AVG(SELLING_PRICE), 2) FROM PRODUCTS WHERE IS_ACTIVE = 1"),
+]
+FAKE_DEFAULT_QUERY = "SELECT COUNT(*) FROM PRODUCTS WHERE IS_ACTIVE = 1"
+
+# Characters of the query result the fake model repeats as its answer.
+FAKE_ANSWER_LENGTH = 500
+
+
+def _text(content) -> str:
+    """
+    Flatten message content (text or content blocks) to text.
+    """
+    if isinstance(content, str):
+        return content
+    return "".join(block.get("text", "") if isinstance(block, dict) else str(block) for block in content or [])
+
+
+def _bind_openai_tools(model, tools, **kwargs):
+    return model.bind(tools=[convert_to_openai_tool(tool) for tool in tools], **kwargs)
+
+
+def _usage(usage) -> dict:
+    """
+    LangChain usage metadata from an OpenAI ``usage`` object, or None.
+    """
+    if not usage:
+        return None
+    return {
+        "input_tokens": usage.get("prompt_tokens", 0),
+        "output_tokens": usage.get("completion_tokens", 0),
+        "total_tokens": usage.get("total_tokens", 0),
+    }
+
+
+def _to_openai(message) -> dict:
+    """
+    Convert a LangChain message to an OpenAI chat-completions message.
+    """
+    if isinstance(message, SystemMessage):
+        return {"role": "system", "content": _text(message.content)}
+    if isinstance(message, ToolMessage):
+        return {"role": "tool", "tool_call_id": message.tool_call_id, "content": _text(message.content)}
+    if isinstance(message, AIMessage):
+        converted = {"role": "assistant", "content": _text(message.content)}
+        if message.tool_calls:
+            converted["tool_calls"] = [
+                {"id": call["id"], "type": "function",
+                 "function": {"name": call["name"], "arguments": json.dumps(call["args"])}}
+                for call in message.tool_calls
+            ]
+        return converted
+    return {"role": "user", "content": _text(message.content)}
+
+
+class LocalChatModel(BaseChatModel):
+    """
+    Chat model served by a local OpenAI-compatible HTTP server.
+
+    With ``streaming`` set, LangChain calls ``_stream`` and each piece of the
+    reply is reported as a new token while the server is still writing.
+    """
+
+    model: str
+    base_url: str = "http://localhost:11434"
+    timeout: float = 120.0
+    temperature: float = 0.0
+    streaming: bool = False
+
+    @property
+    def _llm_type(self) -> str:
+        return "posai-local"
+
+    def bind_tools(self, tools, **kwargs):
+        return _bind_openai_tools(self, tools, **kwargs)
+
+    def _payload(self, messages, stop, stream: bool, **kwargs) -> dict:
+        payload = {
+            "model": self.model,
+            "messages": [_to_openai(message) for message in messages],
+            "temperature": self.temperature,
+            "stream": stream,
+        }
+        if stream:
+            payload["stream_options"] = {"include_usage": True}
+        if kwargs.get("tools"):
+            payload["tools"] = kwargs["tools"]
+        if stop:
+            payload["stop"] = stop
+        return payload
+
+    def _post(self, payload: dict):
+        """
+        Send a chat-completions request; the caller reads and closes the response.
+        """
+        url = f"{self.base_url.rstrip('/')}/v1/chat/completions"
+        request = urllib.request.Request(
+            url, data=json.dumps(payload).encode("utf-8"), headers={"Content-Type": "application/json"}
+        )
+        try:
+            return urllib.request.urlopen(request, timeout=self.timeout)
+        except urllib.error.URLError as e:
+            raise RuntimeError(f"Local model server at {self.base_url} is not reachable: {e.reason}") from e
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        with self._post(self._payload(messages, stop, False, **kwargs)) as response:
+            body = json.load(response)
+
+        reply = body["choices"][0]["message"]
+        tool_calls = [
+            {"name": call["function"]["name"], "args": json.loads(call["function"].get("arguments") or "{}"),
+             "id": call.get("id") or f"call_{index}"}
+            for index, call in enumerate(reply.get("tool_calls") or [])
+        ]
+        message = AIMessage(
+            content=reply.get("content") or "",
+            tool_calls=tool_calls,
+            usage_metadata=_usage(body.get("usage")),
+        )
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        # Server-sent events: one "data: {chunk}" line per delta, then "data: [DONE]".
+        with self._post(self._payload(messages, stop, True, **kwargs)) as response:
+            for line in response:
+                line = line.decode("utf-8").strip()
+                if not line.startswith("data:"):
+                    continue
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    break
+                body = json.loads(data)
+                delta = (body.get("choices") or [{}])[0].get("delta") or {}
+                piece = delta.get("content") or ""
+                tool_call_chunks = [
+                    {"name": (call.get("function") or {}).get("name"),
+                     "args": (call.get("function") or {}).get("arguments"),
+                     "id": call.get("id"), "index": call.get("index", index)}
+                    for index, call in enumerate(delta.get("tool_calls") or [])
+                ]
+                usage = _usage(body.get("usage"))
+                if not (piece or tool_call_chunks or usage):
+                    continue
+                chunk = ChatGenerationChunk(message=AIMessageChunk(
+                    content=piece, tool_call_chunks=tool_call_chunks, usage_metadata=usage
+                ))
+                if run_manager and piece:
+                    run_manager.on_llm_new_token(piece, chunk=chunk)
+                yield chunk
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    Deterministic, offline stand-in for the assistant's chat model.
+
+    Token usage is estimated at four characters per token over the messages
+    and tool schemas it is sent, so prompt sizes can be compared offline.
+    """
+
+    model: str = "fake-sql"
+    latency: float = 0.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "posai-fake"
+
+    def bind_tools(self, tools, **kwargs):
+        return _bind_openai_tools(self, tools, **kwargs)
+
+    @staticmethod
+    def query_for(question: str) -> str:
+        """
+        The query the fake model runs for ``question``.
+        """
+        for pattern, query in FAKE_QUERIES:
+            if re.search(pattern, question, re.I):
+                return query
+        return FAKE_DEFAULT_QUERY
+
+    def _reply(self, messages, tools) -> tuple:
+        """
+        Next agent step: (text, tool calls, usage).
+        """
+        if self.latency:
+            time.sleep(self.latency)
+
+        question = next((_text(m.content) for m in reversed(messages) if isinstance(m, HumanMessage)), "")
+        offered = {tool["function"]["name"] for tool in tools}
+        called = {call["name"] for m in messages if isinstance(m, AIMessage) for call in m.tool_calls}
+        query = self.query_for(question)
+        tables = ", ".join(dict.fromkeys(re.findall(r"\b(?:FROM|JOIN)\s+(\w+)", query)))
+
+        call = None
+        if "sql_db_list_tables" in offered and "sql_db_list_tables" not in called:
+            call = ("sql_db_list_tables", {"tool_input": ""})
+        elif "sql_db_schema" in offered and "sql_db_schema" not in called:
+            call = ("sql_db_schema", {"table_names": tables})
+        elif "sql_db_query" in offered and "sql_db_query" not in called:
+            call = ("sql_db_query", {"query": query})
+
+        if call is not None:
+            text, tool_calls = "", [{"name": call[0], "args": call[1], "id": f"call_{len(called) + 1}"}]
+        else:
+            result = next((_text(m.content) for m in reversed(messages) if isinstance(m, ToolMessage)), "")
+            text, tool_calls = (result[:FAKE_ANSWER_LENGTH] or "I could not query the database."), []
+
+        prompt_chars = sum(len(_text(m.content)) for m in messages) + len(json.dumps(tools))
+        output_chars = len(text) + len(json.dumps([c["args"] for c in tool_calls]))
+        usage = {"input_tokens": prompt_chars // 4, "output_tokens": output_chars // 4,
+                 "total_tokens": (prompt_chars + output_chars) // 4}
+        return text, tool_calls, usage
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        text, tool_calls, usage = self._reply(messages, kwargs.get("tools") or [])
+        message = AIMessage(content=text, tool_calls=tool_calls, usage_metadata=usage)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        text, tool_calls, usage = self._reply(messages, kwargs.get("tools") or [])
+        if tool_calls:
+            yield ChatGenerationChunk(message=AIMessageChunk(
+                content="",
+                tool_call_chunks=[
+                    {"name": call["name"], "args": json.dumps(call["args"]), "id": call["id"], "index": index}
+                    for index, call in enumerate(tool_calls)
+                ],
+                usage_metadata=usage,
+            ))
+            return
+
+        for index, piece in enumerate(re.findall(r"\S+\s*", text) or [text]):
+            chunk = ChatGenerationChunk(message=AIMessageChunk(
+                content=piece, usage_metadata=usage if index == 0 else None
+            ))
+            if run_manager:
+                run_manager.on_llm_new_token(piece, chunk=chunk)
+            yield chunk
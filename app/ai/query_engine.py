@@ -0,0 +1,379 @@
+"""
+Long-lived natural-language query engine for the chat screen.
+
+``ask_pos_ai`` used to reflect the schema, create a Bedrock client and build a
+SQL agent for every question. ``AIQueryEngine`` builds them once per process
+and shares them between sessions; each question gets its own callback handler
+that times the stages (schema reflection, LLM calls, tool calls, SQL
+execution).
+
+By default the prompt carries a compact schema digest (see
+``schema_context``) and the agent is only given the query tool, so it no
+longer spends LLM turns listing tables and fetching their definitions.
+Its query tool runs the generated SQL in the ``sql_sandbox`` (read-only,
+plan-checked, time-boxed, row-limited).
+
+Callers may pass ``on_event`` to receive streamed tokens and intermediate
+steps as they happen, and a ``threading.Event`` to cancel the run; each
+question's step trace is kept on its result and logged under ``.trace``
+rather than printed.
+"""
+
+import itertools
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+
+from app.ai.ai_assistant import load_ai_stack
+from app.ai.backends import backend_name, create_chat_model
+from app.ai.schema_context import get_schema_digest
+from app.ai.sql_sandbox import sandboxed_query_tool
+from app.data import products
+
+logger = logging.getLogger(__name__)
+trace_logger = logger.getChild("trace")
+
+# The agent's tool that runs the generated SQL; other tools count as "tool".
+SQL_TOOL = "sql_db_query"
+
+PROMPT = (
+    "Analyze the available database tables and their schema carefully. "
+    "Then, using the available tools, answer this question: {question}\n"
+    "Provide only the factual answer to the question, without any additional explanation, "
+    "conversational text, or internal thoughts."
+)
+
+# System prompt of the digest agent; {schema} is the schema digest.
+SCHEMA_PROMPT = (
+    "You answer questions about a shop's point-of-sale SQLite database. "
+    "The complete schema is below, so do not ask for it; write one SQLite query "
+    f"and run it with the {SQL_TOOL} tool.\n\n"
+    "{schema}\n\n"
+    "Select only the columns you need and add a LIMIT to listings. "
+    "Provide only the factual answer to the question, without any additional explanation, "
+    "conversational text, or internal thoughts."
+)
+
+# Enough for a query, a corrected query after an error, and the answer.
+MAX_ITERATIONS = 6
+
+# Characters of a tool result shown as an intermediate step.
+STEP_PREVIEW = 200
+
+
+class QueryCancelled(Exception):
+    """
+    Raised inside an agent run when the caller cancels the question.
+    """
+
+
+@dataclass
+class QueryResult:
+    """
+    Answer to one question with its per-stage timings (seconds).
+    """
+    question: str
+    answer: str
+    timings: dict = field(default_factory=dict)
+    llm_calls: int = 0
+    tool_calls: int = 0
+    prompt_tokens: int = 0
+    sql: list = field(default_factory=list)
+    results: list = field(default_factory=list)
+    trace: list = field(default_factory=list)
+    total: float = 0.0
+
+
+def _stage_timer(request_id: int, on_event=None, cancel: threading.Event = None):
+    """
+    Build a LangChain callback handler (imported lazily) for one question.
+
+    It times LLM and tool runs, records the SQL and a step trace, forwards
+    tokens, steps and query results to ``on_event(kind, payload)`` (kind is
+    "token" or "step" with text, or "table" with a ``SandboxResult``), and raises ``QueryCancelled`` at the next callback once ``cancel`` is set.
+    """
+    from langchain_core.callbacks import BaseCallbackHandler
+
+    class StageTimer(BaseCallbackHandler):
+        # Let QueryCancelled propagate and stop the agent.
+        raise_error = True
+
+        def __init__(self) -> None:
+            self.timings = {"llm": 0.0, "tool": 0.0, "sql": 0.0}
+            self.llm_calls = 0
+            self.tool_calls = 0
+            self.prompt_tokens = 0
+            self.sql = []
+            self.results = []
+            self.trace = []
+            self._started = {}
+            self._tools = {}
+
+        def _check(self):
+            if cancel is not None and cancel.is_set():
+                raise QueryCancelled("Question cancelled")
+
+        def _step(self, text):
+            self.trace.append(text)
+            trace_logger.debug(f"[q{request_id}] {text}")
+            self._emit("step", text)
+
+        def _emit(self, kind, text):
+            if on_event is None:
+                return
+            try:
+                on_event(kind, text)
+            except Exception as e:
+                # A closed screen must not fail the question.
+                logger.debug(f"AI event handler failed: {e}")
+
+        def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+            self._check()
+            self._started[run_id] = ("llm", time.perf_counter())
+
+        def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+            self._check()
+            self._started[run_id] = ("llm", time.perf_counter())
+
+        def on_llm_new_token(self, token, *, run_id, **kwargs):
+            self._check()
+            if token:
+                self._emit("token", token)
+
+        def on_llm_end(self, response, *, run_id, **kwargs):
+            self._stop(run_id)
+            self.llm_calls += 1
+            # Chat models report usage on the message; not every provider does.
+            for generations in response.generations:
+                for generation in generations:
+                    usage = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                    self.prompt_tokens += usage.get("input_tokens", 0)
+
+        def on_llm_error(self, error, *, run_id, **kwargs):
+            self._stop(run_id)
+
+        def on_tool_start(self, serialized, input_str, *, run_id, **kwargs):
+            self._check()
+            name = (serialized or {}).get("name", "tool")
+            stage = "sql" if name == SQL_TOOL else "tool"
+            if stage == "sql":
+                query = (kwargs.get("inputs") or {}).get("query", input_str)
+                self.sql.append(query)
+                self._step(f"Running SQL: {query}")
+            else:
+                self._step(f"Using {name}")
+            self._tools[run_id] = name
+            self._started[run_id] = (stage, time.perf_counter())
+
+        def on_tool_end(self, output, *, run_id, **kwargs):
+            self._stop(run_id)
+            self.tool_calls += 1
+            text = str(getattr(output, "content", output))
+            preview = text if len(text) <= STEP_PREVIEW else text[:STEP_PREVIEW] + "..."
+            self._step(f"{self._tools.pop(run_id, 'tool')} returned: {preview}")
+
+        def on_custom_event(self, name, data, *, run_id, **kwargs):
+            if name == "sql_result":
+                self.results.append(data)
+                self._emit("table", data)
+
+        def on_tool_error(self, error, *, run_id, **kwargs):
+            self._stop(run_id)
+            self._step(f"{self._tools.pop(run_id, 'tool')} failed: {error}")
+
+        def _stop(self, run_id):
+            started = self._started.pop(run_id, None)
+            if started is not None:
+                stage, start = started
+                self.timings[stage] += time.perf_counter() - start
+
+    return StageTimer()
+
+
+def answer_text(output) -> str:
+    """
+    Flatten an agent output (plain text or a list of content blocks) to text.
+    """
+    if isinstance(output, str):
+        return output
+    if isinstance(output, list):
+        return "".join(
+            block.get("text", "") if isinstance(block, dict) else str(block)
+            for block in output
+        )
+    return str(output)
+
+
+class AIQueryEngine:
+    """
+    Process-wide SQL agent over the POS database, built once and shared by all sessions.
+    """
+
+    def __init__(self, db_path=None, backend: str = None, model: str = None,
+                 schema_digest: bool = True) -> None:
+        """
+        Initialize the engine. The database, model and agent are built on the first query.
+
+        Args:
+            db_path: Database file, defaults to the app database
+            backend: LLM backend (bedrock, local or fake), defaults to ``POSAI_LLM_BACKEND``
+            model: Model id, defaults to the backend's configured model
+            schema_digest: Put the schema digest in the prompt and offer only the
+                query tool; False uses the toolkit agent that discovers the schema itself
+        """
+        self.db_path = db_path or products.DB_PATH
+        self.backend = backend_name(backend)
+        self.model = model
+        self.schema_digest = schema_digest
+        self.reflection_time = None
+        self.queries = 0
+        self._totals = {}
+        self._db = None
+        self._llm = None
+        self._agent = None
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._request_ids = itertools.count(1)
+
+    def _ensure_agent(self) -> tuple:
+        """
+        Build the SQLDatabase, chat model and agent executor once.
+
+        Returns:
+            tuple: (agent executor, True if this call built it)
+        """
+        if self._agent is not None:
+            return self._agent, False
+        with self._lock:
+            if self._agent is not None:
+                return self._agent, False
+            stack = load_ai_stack()
+            start = time.perf_counter()
+            if self.schema_digest:
+                # The digest replaces reflection; the sandboxed tool opens its own connections.
+                get_schema_digest(self.db_path)
+            else:
+                self._db = stack.SQLDatabase.from_uri(f"sqlite:///file:{self.db_path}?mode=ro&uri=true")
+            self.reflection_time = time.perf_counter() - start
+
+            self._llm = create_chat_model(self.backend, self.model)
+            # Not verbose: the executor is shared by concurrent sessions, and
+            # stage timings come from the per-question callback handler.
+            if self.schema_digest:
+                tools = [sandboxed_query_tool(self.db_path)]
+                prompt = stack.ChatPromptTemplate.from_messages([
+                    ("system", SCHEMA_PROMPT),
+                    ("human", "{input}"),
+                    stack.MessagesPlaceholder("agent_scratchpad"),
+                ])
+                self._agent = stack.AgentExecutor(
+                    agent=stack.create_tool_calling_agent(self._llm, tools, prompt),
+                    tools=tools,
+                    max_iterations=MAX_ITERATIONS,
+                    handle_parsing_errors=True,
+                    verbose=False
+                )
+            else:
+                self._agent = stack.create_sql_agent(
+                    llm=self._llm,
+                    db=self._db,
+                    agent_type="tool-calling",
+                    verbose=False
+                )
+            logger.info(f"AI query engine ready (schema reflection {self.reflection_time:.2f}s)")
+        return self._agent, True
+
+    def warm(self) -> None:
+        """
+        Build the engine ahead of the first question.
+        """
+        self._ensure_agent()
+
+    def process_query(self, question: str, on_event=None, cancel: threading.Event = None) -> QueryResult:
+        """
+        Answer a natural-language question about the POS data.
+
+        Args:
+            question: The user's question
+            on_event: Optional ``on_event(kind, payload)`` called from the worker
+                thread with streamed tokens ("token"), intermediate steps ("step")
+                and query results ("table")
+            cancel: Optional event; once set, the run stops at its next LLM
+                token or step with ``QueryCancelled``
+
+        Returns:
+            QueryResult: The answer, per-stage timings and the step trace
+        """
+        start = time.perf_counter()
+        agent, first_use = self._ensure_agent()
+        setup = time.perf_counter() - start
+
+        request_id = next(self._request_ids)
+        if cancel is not None and cancel.is_set():
+            raise QueryCancelled("Question cancelled")
+        timer = _stage_timer(request_id, on_event, cancel)
+        if self.schema_digest:
+            # Cached per schema version, so this is one PRAGMA unless the schema changed.
+            inputs = {"input": question, "schema": get_schema_digest(self.db_path)}
+        else:
+            inputs = {"input": PROMPT.format(question=question)}
+        response = agent.invoke(inputs, config={"callbacks": [timer]})
+
+        timings = dict(timer.timings)
+        # Reflection is only paid by the question that built the engine.
+        timings["reflection"] = self.reflection_time if first_use else 0.0
+        timings["setup"] = setup
+        result = QueryResult(
+            question=question,
+            answer=answer_text(response["output"]),
+            timings=timings,
+            llm_calls=timer.llm_calls,
+            tool_calls=timer.tool_calls,
+            prompt_tokens=timer.prompt_tokens,
+            sql=timer.sql,
+            results=timer.results,
+            trace=timer.trace,
+            total=time.perf_counter() - start,
+        )
+        self._record(result)
+        logger.info(
+            f"AI query q{request_id} in {result.total:.2f}s: llm {timings['llm']:.2f}s ({result.llm_calls} calls, "
+            f"{result.prompt_tokens} prompt tokens), "
+            f"tools {timings['tool']:.2f}s, sql {timings['sql']:.3f}s, setup {setup:.2f}s"
+        )
+        return result
+
+    def _record(self, result: QueryResult) -> None:
+        with self._stats_lock:
+            self.queries += 1
+            for stage, seconds in result.timings.items():
+                self._totals[stage] = self._totals.get(stage, 0.0) + seconds
+            self._totals["total"] = self._totals.get("total", 0.0) + result.total
+
+    def stats(self) -> dict:
+        """
+        Number of questions answered and mean seconds per stage.
+        """
+        with self._stats_lock:
+            queries = self.queries
+            return {
+                "queries": queries,
+                **({stage: total / queries for stage, total in self._totals.items()} if queries else {}),
+            }
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_query_engine() -> AIQueryEngine:
+    """
+    Return the process-wide query engine, creating it on first use.
+    """
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = AIQueryEngine()
+    return _engine
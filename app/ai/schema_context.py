@@ -0,0 +1,216 @@
+"""
+Compact schema digest for natural-language-to-SQL prompts.
+
+The tool-calling SQL agent used to spend several LLM round trips per question
+listing tables and fetching their CREATE statements. The digest gives the
+model the same information up front, in a fraction of the tokens: one line
+per table or view with column names, types, keys and allowed values, plus the
+description written next to each definition in ``database_init``.
+
+It is generated from the DDL dictionaries in ``database_init`` (so it stays
+in step with the schema the app creates), falls back to ``sqlite_master`` for
+objects created elsewhere, and is cached per ``PRAGMA schema_version``.
+"""
+
+import inspect
+import logging
+import re
+import sqlite3
+import threading
+
+from app.data import database_init
+
+logger = logging.getLogger(__name__)
+
+# Meanings that are not obvious from names and types alone.
+COLUMN_NOTES = {
+    "TRANSACTIONS.STATUS": "only COMPLETED rows are sales",
+    "TRANSACTIONS.NOTES": "holds the original method (e.g. UPI) when PAYMENT_METHOD is OTHER",
+    "TRANSACTIONS.CREATED_AT": "UTC",
+    "TRANSACTION_ITEMS.LINE_TOTAL": "QUANTITY*UNIT_PRICE-DISCOUNT_AMOUNT",
+    "TRANSACTION_ITEMS.UNIT_COST": "product COST_PRICE at the time of sale",
+    "INVENTORY_LOG.QUANTITY_CHANGE": "negative for sales",
+    "INVENTORY_LOG.REFERENCE_ID": "TRANSACTIONS.ID when REFERENCE_TYPE is TRANSACTION",
+    "PRODUCTS.IS_ACTIVE": "1 active, 0 discontinued",
+    "SALES_HOURLY.PERIOD": "UTC hour, YYYY-MM-DD HH:00:00",
+    "SALES_DAILY.PERIOD": "UTC date, YYYY-MM-DD",
+    "SALES_MONTHLY.PERIOD": "UTC month, YYYY-MM",
+}
+
+GENERAL_NOTES = [
+    "Money columns are in rupees (INR).",
+    "Timestamps are UTC text 'YYYY-MM-DD HH:MM:SS'; use DATE(col, 'localtime') for local days.",
+    "For sales totals by hour, day or month prefer SALES_HOURLY/SALES_DAILY/SALES_MONTHLY over grouping TRANSACTIONS.",
+    "For all-time sales, profit or last sale per product prefer PRODUCT_SALES over grouping TRANSACTION_ITEMS.",
+]
+
+_TYPE_ABBREVIATIONS = {
+    "INTEGER": "int", "TEXT": "text", "BOOLEAN": "bool", "TIMESTAMP": "ts", "REAL": "real",
+}
+
+_CONSTRAINT_KEYWORDS = ("FOREIGN", "CHECK", "PRIMARY", "UNIQUE", "CONSTRAINT")
+
+
+def _definition_comments() -> dict:
+    """
+    Map each key of the ``database_init`` dictionaries to the comment block above it.
+    """
+    comments, block = {}, []
+    for line in inspect.getsource(database_init).splitlines():
+        stripped = line.strip()
+        if stripped.startswith("#"):
+            block.append(stripped.lstrip("#").strip())
+            continue
+        match = re.match(r'"(\w+)"\s*:', stripped)
+        if match and block:
+            # Keep the first sentence, without the "NAME table:" / "NAME view:" lead-in.
+            text = re.sub(r"^\w+\s+(table|view|trigger)\s*:\s*", "", " ".join(block))
+            comments[match.group(1)] = re.split(r"(?<=\.)\s", text, maxsplit=1)[0].rstrip(",")
+        if stripped:
+            block = []
+    return comments
+
+
+def _split_top_level(text: str) -> list:
+    """
+    Split on commas that are not inside parentheses.
+    """
+    parts, depth, current = [], 0, []
+    for char in text:
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        if char == "," and depth == 0:
+            parts.append("".join(current).strip())
+            current = []
+        else:
+            current.append(char)
+    if "".join(current).strip():
+        parts.append("".join(current).strip())
+    return parts
+
+
+def _table_line(name: str, ddl: str, description: str = None) -> str:
+    """
+    One-line digest of a CREATE TABLE statement.
+    """
+    body = ddl[ddl.index("(") + 1:ddl.rindex(")")]
+    columns, references, allowed = [], {}, {}
+
+    for part in _split_top_level(body):
+        upper = part.upper()
+        if upper.startswith("FOREIGN"):
+            match = re.search(r"\((\w+)\)\s*REFERENCES\s+(\w+)\s*\((\w+)\)", part, re.I)
+            if match:
+                references[match.group(1).upper()] = f"{match.group(2)}.{match.group(3)}"
+        elif upper.startswith("CHECK"):
+            match = re.search(r"(\w+)\s+IN\s*\(([^)]*)\)", part, re.I)
+            if match:
+                allowed[match.group(1).upper()] = "|".join(v.strip().strip("'") for v in match.group(2).split(","))
+
+    for part in _split_top_level(body):
+        if part.upper().startswith(_CONSTRAINT_KEYWORDS):
+            continue
+        tokens = part.split()
+        column, declared = tokens[0].upper(), tokens[1].upper() if len(tokens) > 1 else ""
+        kind = _TYPE_ABBREVIATIONS.get(declared.split("(")[0], "num" if declared.startswith("DECIMAL") else declared.lower())
+        flags = []
+        if "PRIMARY KEY" in part.upper():
+            flags.append("pk")
+        if re.search(r"\bUNIQUE\b", part, re.I):
+            flags.append("unique")
+        if column in references:
+            flags.append(f"->{references[column]}")
+        if column in allowed:
+            flags.append(allowed[column])
+        note = COLUMN_NOTES.get(f"{name}.{column}")
+        if note:
+            flags.append(f"'{note}'")
+        columns.append(" ".join([column, kind] + flags).strip())
+
+    line = f"TABLE {name}({', '.join(columns)})"
+    return f"{line} -- {description}" if description else line
+
+
+def _view_line(name: str, ddl: str, description: str = None) -> str:
+    """
+    One-line digest of a CREATE VIEW statement: its output columns.
+    """
+    select = re.search(r"\bSELECT\b(.*)", ddl, re.I | re.S).group(1)
+    # The column list ends at the first FROM outside parentheses.
+    depth, end = 0, len(select)
+    for match in re.finditer(r"\(|\)|\bFROM\b", select, re.I):
+        token = match.group(0)
+        if token == "(":
+            depth += 1
+        elif token == ")":
+            depth -= 1
+        elif depth == 0:
+            end = match.start()
+            break
+
+    columns = []
+    for expression in _split_top_level(select[:end]):
+        alias = re.search(r"\bAS\s+(\w+)\s*$", expression, re.I)
+        columns.append((alias.group(1) if alias else expression.split(".")[-1]).upper())
+
+    line = f"VIEW {name}({', '.join(columns)})"
+    return f"{line} -- {description}" if description else line
+
+
+def build_schema_digest(conn: sqlite3.Connection = None) -> str:
+    """
+    Build the digest text.
+
+    Args:
+        conn: Optional connection; objects in its schema that are not in
+            ``database_init`` are appended from ``sqlite_master``
+
+    Returns:
+        str: The digest, one line per table and view
+    """
+    comments = _definition_comments()
+    lines = [_table_line(name, ddl, comments.get(name)) for name, ddl in database_init.tables.items()]
+    lines += [_view_line(name, ddl, comments.get(name)) for name, ddl in database_init.views.items()]
+
+    if conn is not None:
+        known = set(database_init.tables) | set(database_init.views)
+        for kind, name, sql in conn.execute(
+            "SELECT TYPE, NAME, SQL FROM sqlite_master "
+            "WHERE TYPE IN ('table', 'view') AND NAME NOT LIKE 'sqlite_%' AND SQL IS NOT NULL ORDER BY NAME"
+        ):
+            if name.upper() in known or "VIRTUAL TABLE" in sql.upper():
+                continue
+            try:
+                lines.append(_table_line(name, sql) if kind == "table" else _view_line(name, sql))
+            except (ValueError, AttributeError):
+                lines.append(f"{kind.upper()} {name}")
+
+    return "\n".join(lines + GENERAL_NOTES)
+
+
+_digests = {}
+_digests_lock = threading.Lock()
+
+
+def get_schema_digest(db_path) -> str:
+    """
+    Return the digest for ``db_path``, rebuilding it only when the schema version changes.
+    """
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        version = conn.execute("PRAGMA schema_version").fetchone()[0]
+        key = (str(db_path), version)
+        digest = _digests.get(key)
+        if digest is None:
+            with _digests_lock:
+                digest = _digests.get(key)
+                if digest is None:
+                    digest = build_schema_digest(conn)
+                    _digests.clear()
+                    _digests[key] = digest
+                    logger.info(f"Schema digest built for schema version {version}: {len(digest)} chars")
+        return digest
+    finally:
+        conn.close()
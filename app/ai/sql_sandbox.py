@@ -0,0 +1,270 @@
+"""
+Sandboxed execution of SQL written by the assistant's model.
+
+The agent used to run whatever SQL the model produced on the database the
+tills write to, with no row limit or timeout; a careless cross join over
+TRANSACTION_ITEMS could hold the CPU and the WAL for as long as it liked.
+Generated queries now run here:
+
+- on a read-only (``mode=ro``) analytics connection with an authorizer that
+  allows only reads, so nothing can be written, attached or reconfigured
+- after an ``EXPLAIN QUERY PLAN`` check that rejects full scans of large
+  tables and nested scans whose row product is too big
+- in a short snapshot that is stopped after an instruction budget or a
+  wall-clock timeout, whichever comes first, and pauses for checkout writes
+- wrapped in an outer LIMIT, so at most ``MAX_ROWS`` rows come back
+
+The model sees the first rows as text; the chat view pages through the full
+(bounded) result.
+"""
+
+import logging
+import re
+import sqlite3
+import time
+from dataclasses import dataclass, field
+
+from app.data import products
+from app.data.connection import get_reader_pool
+
+logger = logging.getLogger(__name__)
+
+# Rows returned per query; more are reported as truncated.
+MAX_ROWS = 200
+
+# Rows shown to the model in the tool result.
+TOOL_ROWS = 50
+
+# Rows per page in the chat view.
+PAGE_SIZE = 20
+
+# Wall-clock seconds and SQLite VM instructions a query may use.
+QUERY_TIMEOUT = 2.0
+INSTRUCTION_BUDGET = 50_000_000
+
+# A full scan of a table with more rows than this is rejected.
+LARGE_TABLE_ROWS = 250_000
+
+# Nested scans whose row counts multiply past this are rejected (cross joins).
+MAX_SCAN_ROWS = 2_000_000
+
+_ALLOWED_ACTIONS = {
+    sqlite3.SQLITE_SELECT, sqlite3.SQLITE_READ, sqlite3.SQLITE_FUNCTION, sqlite3.SQLITE_RECURSIVE,
+}
+
+_KEYWORDS = {
+    "WHERE", "JOIN", "LEFT", "RIGHT", "INNER", "OUTER", "CROSS", "NATURAL", "ON", "USING", "GROUP", "ORDER",
+    "LIMIT", "HAVING", "UNION", "EXCEPT", "INTERSECT", "WINDOW", "AS", "SELECT", "FULL",
+}
+
+
+class SandboxError(Exception):
+    """
+    A generated query was refused or stopped.
+    """
+
+
+@dataclass
+class SandboxResult:
+    """
+    Rows of one sandboxed query.
+    """
+    sql: str
+    columns: list
+    rows: list = field(default_factory=list)
+    truncated: bool = False
+    elapsed: float = 0.0
+
+    def pages(self, size: int = PAGE_SIZE) -> int:
+        """
+        Number of pages of ``size`` rows.
+        """
+        return max(1, -(-len(self.rows) // size))
+
+    def page(self, number: int, size: int = PAGE_SIZE) -> list:
+        """
+        Rows of page ``number`` (0-based).
+        """
+        return self.rows[number * size:(number + 1) * size]
+
+    def to_text(self, max_rows: int = TOOL_ROWS) -> str:
+        """
+        Tab-separated text of the first ``max_rows`` rows, for the model.
+        """
+        lines = ["\t".join(self.columns)]
+        lines += ["\t".join("" if value is None else str(value) for value in row) for row in self.rows[:max_rows]]
+        shown = min(len(self.rows), max_rows)
+        if self.truncated or shown < len(self.rows):
+            more = "more than " if self.truncated else ""
+            lines.append(f"(showing {shown} of {more}{len(self.rows)} rows)")
+        elif not self.rows:
+            lines.append("(no rows)")
+        return "\n".join(lines)
+
+
+def _authorize(action, arg1, arg2, database, source):
+    return sqlite3.SQLITE_OK if action in _ALLOWED_ACTIONS else sqlite3.SQLITE_DENY
+
+
+def _normalize(sql: str) -> str:
+    """
+    Strip whitespace, code fences and trailing semicolons; only SELECT/WITH may run.
+    """
+    sql = re.sub(r"^```(sql)?|```$", "", sql.strip(), flags=re.I).strip().rstrip(";").strip()
+    if not re.match(r"(SELECT|WITH)\b", sql, re.I):
+        raise SandboxError("Only SELECT queries are allowed")
+    return sql
+
+
+def _aliases(conn, sql: str, tables: set) -> dict:
+    """
+    Map table aliases used in ``sql`` and in the views to table names.
+    """
+    texts = [sql] + [row[0] for row in conn.execute("SELECT SQL FROM sqlite_master WHERE TYPE = 'view'")]
+    aliases = {}
+    for text in texts:
+        for table, alias in re.findall(r"(?:\bFROM|\bJOIN|,)\s*(\w+)(?:\s+(?:AS\s+)?(\w+))?", text or "", re.I):
+            if table.upper() in tables:
+                aliases[table.upper()] = table.upper()
+                if alias and alias.upper() not in _KEYWORDS:
+                    aliases[alias.upper()] = table.upper()
+    return aliases
+
+
+def check_plan(conn, sql: str) -> list:
+    """
+    Reject ``sql`` if its plan scans a large table or nests scans into a cross join.
+
+    Table sizes are estimated from ``MAX(ROWID)``, which reads one index page.
+    Tables without a rowid (the sales rollups) are counted instead, stopping
+    once a count would be rejected anyway.
+
+    Returns:
+        list: The query plan detail lines
+    """
+    plan = conn.execute(f"EXPLAIN QUERY PLAN {sql}").fetchall()
+    tables, without_rowid = set(), set()
+    for name, definition in conn.execute("SELECT NAME, SQL FROM sqlite_master WHERE TYPE = 'table'"):
+        tables.add(name.upper())
+        if re.search(r"\bWITHOUT\s+ROWID\b", definition or "", re.I):
+            without_rowid.add(name.upper())
+    aliases = _aliases(conn, sql, tables)
+    sizes, loops = {}, {}
+
+    for _, parent, _, detail in plan:
+        match = re.match(r"SCAN (\w+)", detail)
+        if not match:
+            continue
+        table = aliases.get(match.group(1).upper())
+        if table is None:
+            continue
+        if table not in sizes:
+            if table in without_rowid:
+                sizes[table] = conn.execute(
+                    f'SELECT COUNT(*) FROM (SELECT 1 FROM "{table}" LIMIT {LARGE_TABLE_ROWS + 1})'
+                ).fetchone()[0]
+            else:
+                sizes[table] = conn.execute(f'SELECT COALESCE(MAX(ROWID), 0) FROM "{table}"').fetchone()[0]
+        rows = sizes[table]
+        if rows > LARGE_TABLE_ROWS:
+            raise SandboxError(
+                f"Query rejected: it reads all of {table} (~{rows:,} rows). "
+                f"Filter on an indexed column or a date range."
+            )
+        # Scans under the same parent are nested loops; their row counts multiply.
+        loops[parent] = loops.get(parent, 1) * max(rows, 1)
+        if loops[parent] > MAX_SCAN_ROWS:
+            raise SandboxError(
+                f"Query rejected: it joins {table} without an index (~{loops[parent]:,} row combinations). "
+                f"Add a join condition."
+            )
+    return [row[3] for row in plan]
+
+
+def run_query(sql: str, db_path=None, max_rows: int = MAX_ROWS, timeout: float = QUERY_TIMEOUT,
+              budget: int = INSTRUCTION_BUDGET) -> SandboxResult:
+    """
+    Run a generated SELECT under the sandbox limits.
+
+    Args:
+        sql: The query
+        db_path: Database file, defaults to the app database
+        max_rows: Rows returned at most
+        timeout: Wall-clock seconds before the query is stopped
+        budget: SQLite VM instructions before the query is stopped
+
+    Returns:
+        SandboxResult: Column names and up to ``max_rows`` rows
+
+    Raises:
+        SandboxError: If the query is not a single read, is rejected by the plan
+            check, is stopped by a limit, or fails
+    """
+    sql = _normalize(sql)
+    start = time.perf_counter()
+    try:
+        # The analytics pool's snapshot enforces the limits and gives way to checkout writes.
+        with get_reader_pool(db_path or products.DB_PATH).snapshot(timeout=timeout, budget=budget) as conn:
+            conn.set_authorizer(_authorize)
+            try:
+                check_plan(conn, sql)
+                cursor = conn.execute(f"SELECT * FROM ({sql}) LIMIT {max_rows + 1}")
+                columns = [column[0] for column in cursor.description]
+                rows = cursor.fetchall()
+            finally:
+                conn.set_authorizer(None)
+    except sqlite3.OperationalError as e:
+        if "interrupted" in str(e):
+            elapsed = time.perf_counter() - start
+            limit = "time limit" if elapsed >= timeout else "work limit"
+            raise SandboxError(
+                f"Query stopped at the {limit} after {elapsed:.1f}s. Narrow it with filters or aggregates."
+            ) from None
+        raise SandboxError(f"Invalid query: {e}") from None
+    except sqlite3.Error as e:
+        raise SandboxError(f"Invalid query: {e}") from None
+
+    result = SandboxResult(
+        sql=sql,
+        columns=columns,
+        rows=rows[:max_rows],
+        truncated=len(rows) > max_rows,
+        elapsed=time.perf_counter() - start,
+    )
+    logger.debug(f"Sandboxed query returned {len(result.rows)} rows in {result.elapsed * 1e3:.1f} ms")
+    return result
+
+
+def sandboxed_query_tool(db_path=None):
+    """
+    Build the agent's SQL tool (LangChain imported lazily) on top of ``run_query``.
+
+    The tool is named like the toolkit's query tool. Refusals and errors come
+    back to the model as text so it can correct the query; each result is
+    also dispatched as a ``sql_result`` custom callback event for the chat view.
+    """
+    from langchain_core.callbacks import dispatch_custom_event
+    from langchain_core.tools import BaseTool
+
+    class SandboxedQueryTool(BaseTool):
+        name: str = "sql_db_query"
+        description: str = (
+            "Run one SQLite SELECT query against the POS database and get the result rows. "
+            f"At most {MAX_ROWS} rows are returned and the first {TOOL_ROWS} are shown; "
+            "queries that scan large tables or run too long are refused. "
+            "If the query is wrong, an error is returned; rewrite the query and try again."
+        )
+
+        def _run(self, query: str, run_manager=None) -> str:
+            try:
+                result = run_query(query, db_path)
+            except SandboxError as e:
+                return f"Error: {e}"
+            try:
+                dispatch_custom_event("sql_result", result)
+            except RuntimeError:
+                # Not inside a traced run (e.g. the tool invoked directly).
+                pass
+            return result.to_text()
+
+    return SandboxedQueryTool()
@@ -0,0 +1,280 @@
+"""
+Read-through SKU catalog cache for the sale and inventory screens.
+
+Every scan used to cost a SQLite query. This cache keeps product rows keyed by
+SKU in a bounded LRU and serves repeat lookups from memory. Unknown SKUs are
+cached as well, because partially typed barcodes miss far more often than
+they hit.
+
+Invalidation is cheap and works across processes: at most every
+``check_interval`` seconds a lookup reads ``PRAGMA data_version`` on a private
+connection. The value only moves when another connection (another session,
+terminal or process) commits, and only then are the rows whose ``UPDATED_AT``
+was stamped since the previous check evicted, along with the SKUs deleted or
+replaced since (PRODUCT_TOMBSTONES), which no longer have a row to stamp.
+"""
+
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from app.data.connection import get_pool
+
+logger = logging.getLogger(__name__)
+
+# Maximum number of SKUs (including known misses) held in memory.
+DEFAULT_CAPACITY = 50_000
+
+# Seconds between PRAGMA data_version checks; bounds staleness across processes.
+DEFAULT_CHECK_INTERVAL = 0.25
+
+# UPDATED_AT has one-second resolution and a writer may commit a moment after
+# it stamped the row, so each sync looks back this far before the last check.
+SYNC_SLACK = "-2 seconds"
+
+# Number of most recent TRANSACTION_ITEMS rows used to rank fast movers at warm-up.
+WARM_HISTORY_ROWS = 200_000
+
+PRODUCT_COLUMNS = "ID, SKU, NAME, CATEGORY_ID, COST_PRICE, SELLING_PRICE, CURRENT_STOCK, REORDER_LEVEL"
+
+# SKUs written, deleted or replaced since :since (less SYNC_SLACK).
+CHANGED_SKUS = """SELECT SKU FROM PRODUCTS WHERE UPDATED_AT >= DATETIME(:since, :slack)
+                  UNION ALL
+                  SELECT SKU FROM PRODUCT_TOMBSTONES WHERE REMOVED_AT >= DATETIME(:since, :slack)"""
+
+_MISSING = object()
+
+
+def _utc_timestamp() -> str:
+    """
+    Current time in the format SQLite's CURRENT_TIMESTAMP writes to UPDATED_AT.
+    """
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime())
+
+
+class CatalogCache:
+    """
+    Bounded LRU of PRODUCTS rows keyed by SKU, invalidated via ``PRAGMA data_version``.
+
+    Cached rows have the columns of ``PRODUCT_COLUMNS``; ``None`` marks a SKU
+    that is known not to exist.
+    """
+
+    def __init__(self, db_path, capacity: int = DEFAULT_CAPACITY, check_interval: float = DEFAULT_CHECK_INTERVAL) -> None:
+        """
+        Initialize the cache.
+
+        Args:
+            db_path: Path to the database file
+            capacity: Maximum number of cached SKUs
+            check_interval: Seconds between data_version checks
+        """
+        self.db_path = str(db_path)
+        self.capacity = capacity
+        self.check_interval = check_interval
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._next_check = 0.0
+        self._generation = 0
+        self._watcher = None
+        self._data_version = None
+        self._synced_at = None
+
+    # --- Lookups ---
+    def get(self, sku: str):
+        """
+        Return the cached PRODUCTS row for ``sku``, loading it on a miss.
+
+        Returns:
+            tuple | None: Row with ``PRODUCT_COLUMNS`` or None if the SKU does not exist
+        """
+        if time.monotonic() >= self._next_check:
+            self._sync()
+
+        # Hit path without the lock: single OrderedDict operations are atomic
+        # under the GIL, and a concurrent eviction only costs the LRU bump.
+        entries = self._entries
+        row = entries.get(sku, _MISSING)
+        if row is not _MISSING:
+            try:
+                entries.move_to_end(sku)
+            except KeyError:
+                pass
+            self.hits += 1
+            return row
+
+        with self._lock:
+            self.misses += 1
+            generation = self._generation
+
+        with get_pool(self.db_path).connection() as conn:
+            row = conn.execute(f"SELECT {PRODUCT_COLUMNS} FROM PRODUCTS WHERE SKU = ?", (sku,)).fetchone()
+
+        with self._lock:
+            # Skip the insert if an invalidation ran while we were reading.
+            if generation == self._generation:
+                self._store(sku, row)
+        return row
+
+    def _store(self, sku: str, row) -> None:
+        """
+        Insert a row and evict least recently used SKUs over capacity. Caller holds the lock.
+        """
+        self._entries[sku] = row
+        self._entries.move_to_end(sku)
+        while len(self._entries) > self.capacity:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    # --- Invalidation ---
+    def invalidate(self, *skus: str) -> None:
+        """
+        Drop specific SKUs, e.g. right after this process wrote them.
+        """
+        with self._lock:
+            self._generation += 1
+            for sku in skus:
+                self._entries.pop(sku, None)
+
+    def clear(self) -> None:
+        """
+        Drop every cached SKU.
+        """
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    def _sync(self) -> None:
+        """
+        Evict SKUs changed by other connections since the last check.
+        """
+        # One thread checks; the others keep serving from memory.
+        if not self._sync_lock.acquire(blocking=False):
+            return
+        try:
+            self._next_check = time.monotonic() + self.check_interval
+            if self._watcher is None:
+                # A private connection that never writes, so every commit made
+                # through the pool or by another process moves its data_version.
+                self._watcher = sqlite3.connect(self.db_path, check_same_thread=False)
+                self._synced_at = _utc_timestamp()
+                self._data_version = self._read_data_version()
+                return
+
+            version = self._read_data_version()
+            if version == self._data_version:
+                return
+
+            synced_at = _utc_timestamp()
+            if self._synced_at is None:
+                self.clear()
+            else:
+                changed = self._watcher.execute(
+                    CHANGED_SKUS, {"since": self._synced_at, "slack": SYNC_SLACK}
+                ).fetchall()
+
+                if len(changed) > self.capacity // 4:
+                    self.clear()
+                elif changed:
+                    self.invalidate(*(sku for (sku,) in changed))
+
+            self._data_version = version
+            self._synced_at = synced_at
+        except sqlite3.Error as e:
+            # Fail safe: an unreadable database must not serve stale prices.
+            logger.warning(f"Catalog cache sync failed, clearing cache: {e}")
+            self.clear()
+            self._synced_at = None
+        finally:
+            self._sync_lock.release()
+
+    def _read_data_version(self) -> int:
+        return self._watcher.execute("PRAGMA data_version").fetchone()[0]
+
+    # --- Warm-up ---
+    def warm(self, limit: int = 5_000) -> int:
+        """
+        Preload the fastest-moving SKUs, ranked by quantity over recent sales.
+
+        Falls back to the most recently updated products when there is no sales
+        history yet.
+
+        Args:
+            limit: Maximum number of SKUs to preload
+
+        Returns:
+            int: Number of SKUs loaded
+        """
+        limit = min(limit, self.capacity)
+        self._sync()
+        with self._lock:
+            generation = self._generation
+
+        with get_pool(self.db_path).connection() as conn:
+            rows = conn.execute(
+                f"""SELECT {', '.join('P.' + c for c in PRODUCT_COLUMNS.split(', '))}
+                    FROM (
+                        SELECT PRODUCT_ID, SUM(QUANTITY) AS MOVED
+                        FROM TRANSACTION_ITEMS
+                        WHERE ID > (SELECT COALESCE(MAX(ID), 0) FROM TRANSACTION_ITEMS) - ?
+                        GROUP BY PRODUCT_ID
+                        ORDER BY MOVED DESC
+                        LIMIT ?
+                    ) S
+                    JOIN PRODUCTS P ON P.ID = S.PRODUCT_ID
+                    ORDER BY S.MOVED ASC""",
+                (WARM_HISTORY_ROWS, limit)
+            ).fetchall()
+
+            if len(rows) < limit:
+                recent = conn.execute(
+                    f"SELECT {PRODUCT_COLUMNS} FROM PRODUCTS ORDER BY UPDATED_AT DESC LIMIT ?",
+                    (limit - len(rows),)
+                ).fetchall()
+                rows = recent[::-1] + rows
+
+        with self._lock:
+            if generation != self._generation:
+                return 0
+            # Rows arrive coldest first, so the hottest SKUs end up most recently used.
+            for row in rows:
+                self._store(row[1], row)
+        logger.info(f"Catalog cache warmed with {len(rows)} SKUs")
+        return len(rows)
+
+    def stats(self) -> dict:
+        """
+        Hit/miss counters and current size, for logging and benchmarks.
+        """
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_catalog_cache(db_path) -> CatalogCache:
+    """
+    Return the process-wide catalog cache for ``db_path``, creating it on first use.
+    """
+    key = str(db_path)
+    cache = _caches.get(key)
+    if cache is None:
+        with _caches_lock:
+            cache = _caches.get(key)
+            if cache is None:
+                cache = _caches[key] = CatalogCache(db_path)
+    return cache
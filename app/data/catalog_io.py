@@ -0,0 +1,511 @@
+"""
+Streaming bulk import and export of the product catalog.
+
+Files are read and written one record at a time (CSV or JSON Lines), so a
+200k-SKU catalog never sits in memory. Each chunk of an import is first
+loaded with ``executemany`` into a temporary staging table, which takes no
+lock on the main database; the raw text is trimmed, typed and validated there
+by SQLite rather than value by value in Python. The chunk is then applied in one short write
+transaction: category names are resolved to IDs in a single set-based
+statement, and the rows are merged with ``INSERT ... SELECT ... ON
+CONFLICT DO UPDATE``, which stamps UPDATED_AT itself. The per-row triggers
+that log stock changes and index product text are bypassed; the chunk's
+INVENTORY_LOG and PRODUCTS_FTS rows are written set-based instead, by
+comparing the merged products with a snapshot taken just before the merge.
+Between chunks the write lock is released for a moment so a terminal
+checking out at the same time is never locked out.
+
+Usage:
+    python -m app.data.catalog_io import products.csv
+    python -m app.data.catalog_io import categories.jsonl --kind categories
+    python -m app.data.catalog_io export products.jsonl
+"""
+
+import argparse
+import csv
+import json
+import logging
+import sqlite3
+import sys
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from app.data import changes, products
+from app.data.connection import bypass_triggers, open_connection
+
+logger = logging.getLogger(__name__)
+
+# Rows per write transaction; small enough to hold the write lock for only a
+# few tens of milliseconds.
+DEFAULT_CHUNK_SIZE = 2_000
+
+# Pause between chunks so writers waiting on the lock (checkout) get a turn.
+DEFAULT_YIELD_SECONDS = 0.002
+
+# Rows per read when exporting; each chunk is its own short read.
+EXPORT_CHUNK_SIZE = 5_000
+
+STAGE_TABLE = "temp.CATALOG_STAGE"
+
+# The staged products as they were before the merge, keyed by ID.
+BEFORE_TABLE = "temp.CATALOG_BEFORE"
+
+FORMATS = {".csv": "csv", ".jsonl": "jsonl", ".ndjson": "jsonl"}
+
+
+# Importable columns per kind: staging type and the default a new row gets
+# when the value is blank (None for nullable columns).
+IMPORT_FIELDS = {
+    "products": {
+        "SKU": ("TEXT", None),
+        "NAME": ("TEXT", None),
+        "DESCRIPTION": ("TEXT", None),
+        "CATEGORY_ID": ("INTEGER", None),
+        "COST_PRICE": ("REAL", "0.00"),
+        "SELLING_PRICE": ("REAL", "0.00"),
+        "CURRENT_STOCK": ("INTEGER", "0"),
+        "REORDER_LEVEL": ("INTEGER", "10"),
+        "MAX_STOCK": ("INTEGER", None),
+        "IS_ACTIVE": ("BOOLEAN", "1"),
+    },
+    "categories": {
+        "NAME": ("TEXT", None),
+        "DESCRIPTION": ("TEXT", None),
+        "PARENT_ID": ("INTEGER", None),
+    },
+}
+
+# Storage classes a staged value may have once column affinity has applied;
+# anything else (e.g. text in a price column) rejects the row.
+VALID_TYPES = {
+    "INTEGER": "('integer', 'null')",
+    "REAL": "('integer', 'real', 'null')",
+    "BOOLEAN": "('integer', 'null')",
+}
+
+# Target table, conflict key, required columns, category-name columns and the
+# ID column they resolve to, per kind.
+IMPORT_TARGETS = {
+    "products": ("PRODUCTS", "SKU", ("SKU", "NAME"), ("CATEGORY", "CATEGORY_NAME"), "CATEGORY_ID"),
+    "categories": ("CATEGORIES", "NAME", ("NAME",), ("PARENT", "PARENT_NAME"), "PARENT_ID"),
+}
+
+EXPORT_COLUMNS = {
+    "products": ["SKU", "NAME", "DESCRIPTION", "CATEGORY", "COST_PRICE", "SELLING_PRICE",
+                 "CURRENT_STOCK", "REORDER_LEVEL", "MAX_STOCK", "IS_ACTIVE"],
+    "categories": ["NAME", "DESCRIPTION", "PARENT"],
+}
+
+EXPORT_QUERIES = {
+    "products": """SELECT P.ID, P.SKU, P.NAME, P.DESCRIPTION, C.NAME, P.COST_PRICE, P.SELLING_PRICE,
+                          P.CURRENT_STOCK, P.REORDER_LEVEL, P.MAX_STOCK, P.IS_ACTIVE
+                   FROM PRODUCTS P
+                   LEFT JOIN CATEGORIES C ON C.ID = P.CATEGORY_ID
+                   WHERE P.ID > ?
+                   ORDER BY P.ID
+                   LIMIT ?""",
+    "categories": """SELECT C.ID, C.NAME, C.DESCRIPTION, PC.NAME
+                     FROM CATEGORIES C
+                     LEFT JOIN CATEGORIES PC ON PC.ID = C.PARENT_ID
+                     WHERE C.ID > ?
+                     ORDER BY C.ID
+                     LIMIT ?""",
+}
+
+
+# Product imports write these rows themselves instead of the per-row triggers,
+# in order: snapshot, (merge), log stock changes, unindex old text, index new text.
+# CROSS JOIN keeps the chunk as the outer loop; the planner has no statistics on
+# the staging tables and would otherwise scan all of PRODUCTS for each chunk.
+PRODUCT_SNAPSHOT = f"""INSERT INTO {BEFORE_TABLE} (ID, SKU, NAME, DESCRIPTION, CURRENT_STOCK)
+                       SELECT P.ID, P.SKU, P.NAME, P.DESCRIPTION, P.CURRENT_STOCK
+                       FROM {STAGE_TABLE} S
+                       CROSS JOIN PRODUCTS P ON P.SKU = S.SKU"""
+
+PRODUCT_BYPASSED_WRITES = (
+    f"""INSERT INTO INVENTORY_LOG (
+            PRODUCT_ID, SKU, MOVEMENT_TYPE, QUANTITY_CHANGE, PREVIOUS_STOCK, NEW_STOCK, REASON, REFERENCE_TYPE
+        )
+        SELECT P.ID, P.SKU, 'ADJUSTMENT', P.CURRENT_STOCK - B.CURRENT_STOCK, B.CURRENT_STOCK, P.CURRENT_STOCK,
+               'CATALOG IMPORT', 'IMPORT'
+        FROM {BEFORE_TABLE} B
+        CROSS JOIN PRODUCTS P ON P.ID = B.ID
+        WHERE P.CURRENT_STOCK != B.CURRENT_STOCK""",
+    f"""INSERT INTO PRODUCTS_FTS (PRODUCTS_FTS, ROWID, NAME, SKU, DESCRIPTION)
+        SELECT 'delete', B.ID, B.NAME, B.SKU, B.DESCRIPTION
+        FROM {BEFORE_TABLE} B
+        CROSS JOIN PRODUCTS P ON P.ID = B.ID
+        WHERE (P.NAME, P.DESCRIPTION) IS NOT (B.NAME, B.DESCRIPTION)""",
+    f"""INSERT INTO PRODUCTS_FTS (ROWID, NAME, SKU, DESCRIPTION)
+        SELECT P.ID, P.NAME, P.SKU, P.DESCRIPTION
+        FROM {STAGE_TABLE} S
+        CROSS JOIN PRODUCTS P ON P.SKU = S.SKU
+        LEFT JOIN {BEFORE_TABLE} B ON B.ID = P.ID
+        WHERE B.ID IS NULL OR (P.NAME, P.DESCRIPTION) IS NOT (B.NAME, B.DESCRIPTION)""",
+)
+
+
+@dataclass
+class TransferStats:
+    """
+    Progress of an import or export run.
+    """
+    rows: int = 0
+    written: int = 0
+    rejected: int = 0
+    started: float = field(default_factory=time.perf_counter)
+    elapsed: float = 0.0
+
+    @property
+    def rows_per_sec(self) -> float:
+        return self.rows / self.elapsed if self.elapsed else 0.0
+
+    def tick(self) -> None:
+        self.elapsed = time.perf_counter() - self.started
+
+    def __str__(self) -> str:
+        return (f"{self.rows} rows, {self.written} written, {self.rejected} rejected "
+                f"in {self.elapsed:.2f}s ({self.rows_per_sec:,.0f} rows/sec)")
+
+
+def detect_format(path) -> str:
+    """
+    Return ``csv`` or ``jsonl`` from the file extension.
+    """
+    fmt = FORMATS.get(Path(path).suffix.lower())
+    if fmt is None:
+        raise ValueError(f"Unsupported catalog file type: {path} (expected .csv, .jsonl or .ndjson)")
+    return fmt
+
+
+def _read_records(handle, fmt: str):
+    """
+    Yield the upper-cased header, then each record's values in header order.
+
+    For JSON Lines the keys of the first record are the header.
+    """
+    if fmt == "csv":
+        reader = csv.reader(handle)
+        yield [name.strip().upper() for name in next(reader, [])]
+        for values in reader:
+            if values:
+                yield values
+    else:
+        header = None
+        for line in handle:
+            if not line.strip():
+                continue
+            record = {key.upper(): value for key, value in json.loads(line).items()}
+            if header is None:
+                header = list(record)
+                yield header
+            yield [
+                json.dumps(value) if isinstance(value, (dict, list)) else value
+                for value in (record.get(name) for name in header)
+            ]
+
+
+def _chunks(iterable, size: int):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class _ChunkWriter:
+    """
+    Stages raw records and merges them into the target table, one chunk per
+    write transaction.
+    """
+
+    def __init__(self, conn: sqlite3.Connection, kind: str, header: list) -> None:
+        self.conn = conn
+        fields = IMPORT_FIELDS[kind]
+        table, self.key, required, name_columns, id_column = IMPORT_TARGETS[kind]
+
+        present = set(header)
+        name_column = next((name for name in name_columns if name in present), None)
+        self.columns = [c for c in fields if c in present or (c == id_column and name_column)]
+        missing = [c for c in required if c not in self.columns]
+        if missing:
+            raise ValueError(f"missing required column(s): {', '.join(missing)}")
+        self.width = len(header)
+
+        # Records are bound as-is; each staged value picks its field by number,
+        # and blank or whitespace-only text becomes NULL.
+        staged, values = [], []
+        for column in self.columns + (["CATEGORY_NAME"] if name_column else []):
+            source = column if column != "CATEGORY_NAME" else name_column
+            sql_type = fields[column][0] if column in fields else "TEXT"
+            if source not in present:
+                value = "NULL"
+            elif sql_type == "BOOLEAN":
+                raw = f"NULLIF(TRIM(?{header.index(source) + 1}), '')"
+                value = f"CASE WHEN {raw} IS NULL THEN NULL WHEN LOWER({raw}) IN ('0', 'false', 'no', 'n') THEN 0 ELSE 1 END"
+            else:
+                value = f"NULLIF(TRIM(?{header.index(source) + 1}), '')"
+            staged.append(f"{column} {'INTEGER' if sql_type == 'BOOLEAN' else sql_type}")
+            values.append(value)
+
+        conn.execute(f"DROP TABLE IF EXISTS {STAGE_TABLE}")
+        conn.execute(f"CREATE TABLE {STAGE_TABLE} ({', '.join(staged)}, PRIMARY KEY ({self.key}))")
+        self.bypassed = ()
+        if table == "PRODUCTS":
+            conn.execute(f"DROP TABLE IF EXISTS {BEFORE_TABLE}")
+            conn.execute(f"CREATE TABLE {BEFORE_TABLE} (ID INTEGER PRIMARY KEY, SKU, NAME, DESCRIPTION, CURRENT_STOCK)")
+            self.bypassed = ("INVENTORY_LOG", "PRODUCTS_FTS")
+        conn.commit()
+        self.stage_insert = f"INSERT OR REPLACE INTO {STAGE_TABLE} VALUES ({', '.join(values)})"
+
+        checks = [f"{c} IS NOT NULL" for c in required]
+        checks += [f"typeof({c}) IN {VALID_TYPES[fields[c][0]]}" for c in self.columns if fields[c][0] in VALID_TYPES]
+        self.invalid = f"NOT ({' AND '.join(checks)})"
+        defaulted = [c for c in self.columns if fields[c][1] is not None]
+        self.has_blanks = (
+            f"SELECT 1 FROM {STAGE_TABLE} WHERE {' OR '.join(f'{c} IS NULL' for c in defaulted)} LIMIT 1"
+            if defaulted else None
+        )
+
+        select, assignments, blank_safe = [], [], []
+        for column in self.columns:
+            default = fields[column][1]
+            select.append(f"COALESCE(S.{column}, {default})" if default is not None else f"S.{column}")
+            if column == self.key:
+                continue
+            if default is None:
+                assignments.append((column, f"COALESCE(excluded.{column}, {column})"))
+            else:
+                assignments.append((column, f"excluded.{column}"))
+                blank_safe.append(column)
+
+        # Rows whose values did not change are left alone, so re-importing a
+        # catalog does not rewrite indexes or bump UPDATED_AT (and with it the
+        # catalog caches) for untouched SKUs.
+        fast_updates = (
+            ", ".join(f"{c} = {e}" for c, e in assignments) + ", UPDATED_AT = CURRENT_TIMESTAMP"
+            + f" WHERE ({', '.join(c for c, _ in assignments)}) IS NOT ({', '.join(e for _, e in assignments)})"
+            if assignments else "UPDATED_AT = CURRENT_TIMESTAMP"
+        )
+
+        # A blank value keeps the stored one on update. excluded.<column> already
+        # holds the insert default, so chunks with blanks in NOT NULL columns
+        # read those columns back from the staging row instead.
+        slow_updates = [f"{c} = {e}" for c, e in assignments if c not in blank_safe]
+        if blank_safe:
+            slow_updates.append(
+                f"({', '.join(blank_safe)}) = (SELECT "
+                f"{', '.join(f'COALESCE(B.{c}, {table}.{c})' for c in blank_safe)} "
+                f"FROM {STAGE_TABLE} B WHERE B.{self.key} = excluded.{self.key})"
+            )
+        slow_updates.append("UPDATED_AT = CURRENT_TIMESTAMP")
+
+        merge = (f"INSERT INTO {table} ({', '.join(self.columns)}) "
+                 f"SELECT {', '.join(select)} FROM {STAGE_TABLE} S WHERE {{where}} "
+                 f"ON CONFLICT({self.key}) DO UPDATE SET {{updates}}")
+        self.merges = {
+            blanks: {
+                where: merge.format(where=where, updates=", ".join(slow_updates) if blanks else fast_updates)
+                for where in ("true", "S.ROWID = ?")
+            }
+            for blanks in (False, True)
+        }
+
+        self.resolve = None
+        if name_column:
+            unresolved = f"{id_column} IS NULL AND CATEGORY_NAME IS NOT NULL"
+            self.resolve = (
+                f"INSERT OR IGNORE INTO CATEGORIES (NAME) SELECT DISTINCT CATEGORY_NAME FROM {STAGE_TABLE} WHERE {unresolved}",
+                f"UPDATE {STAGE_TABLE} SET {id_column} = "
+                f"(SELECT ID FROM CATEGORIES C WHERE C.NAME = CATEGORY_NAME) WHERE {unresolved}",
+            )
+
+    def write(self, records: list, stats: TransferStats) -> None:
+        """
+        Stage ``records`` and merge them in one write transaction.
+        """
+        conn = self.conn
+        width = self.width
+        rows = [values if len(values) == width else (list(values) + [None] * width)[:width] for values in records]
+
+        # The staging table lives in the temp database, so filling and
+        # validating it takes no lock on the main database file.
+        conn.execute(f"DELETE FROM {STAGE_TABLE}")
+        conn.executemany(self.stage_insert, rows)
+        rejected = conn.execute(f"SELECT {self.key} FROM {STAGE_TABLE} WHERE {self.invalid}").fetchall()
+        if rejected:
+            conn.execute(f"DELETE FROM {STAGE_TABLE} WHERE {self.invalid}")
+            stats.rejected += len(rejected)
+            logger.warning(f"Skipped {len(rejected)} invalid row(s), e.g. {rejected[0][0]!r}")
+        blanks = bool(self.has_blanks and conn.execute(self.has_blanks).fetchone())
+        conn.commit()
+        merges = self.merges[blanks]
+
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            with bypass_triggers(conn, *self.bypassed):
+                if self.resolve:
+                    for statement in self.resolve:
+                        conn.execute(statement)
+                if self.bypassed:
+                    conn.execute(f"DELETE FROM {BEFORE_TABLE}")
+                    conn.execute(PRODUCT_SNAPSHOT)
+                try:
+                    stats.written += conn.execute(merges["true"]).rowcount
+                except sqlite3.IntegrityError:
+                    # Rare: isolate the offending rows instead of dropping the chunk.
+                    for rowid, key in conn.execute(f"SELECT ROWID, {self.key} FROM {STAGE_TABLE}").fetchall():
+                        try:
+                            stats.written += conn.execute(merges["S.ROWID = ?"], (rowid,)).rowcount
+                        except sqlite3.IntegrityError as e:
+                            stats.rejected += 1
+                            logger.warning(f"Skipped {key!r}: {e}")
+                if self.bypassed:
+                    for statement in PRODUCT_BYPASSED_WRITES:
+                        conn.execute(statement)
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+
+
+def import_catalog(path, db_path=None, kind: str = "products", chunk_size: int = DEFAULT_CHUNK_SIZE,
+                   yield_seconds: float = DEFAULT_YIELD_SECONDS, progress=None) -> TransferStats:
+    """
+    Stream a CSV or JSON Lines file into PRODUCTS or CATEGORIES.
+
+    Products need SKU and NAME; a CATEGORY (name) column is resolved to
+    CATEGORY_ID, creating missing categories (PARENT likewise for categories).
+    Blank values keep what is stored. Rows that fail conversion or a
+    constraint are skipped and counted as rejected.
+
+    Args:
+        path: CSV (.csv) or JSON Lines (.jsonl/.ndjson) file
+        db_path: Database file, defaults to the app database
+        kind: ``products`` or ``categories``
+        chunk_size: Rows per write transaction
+        yield_seconds: Pause between chunks to let other writers in
+        progress: Optional callable receiving ``TransferStats`` after each chunk
+
+    Returns:
+        TransferStats: Final counts and throughput
+    """
+    fmt = detect_format(path)
+    stats = TransferStats()
+    conn = open_connection(db_path or products.DB_PATH)
+
+    try:
+        with open(path, newline="", encoding="utf-8-sig") as handle:
+            records = _read_records(handle, fmt)
+            header = next(records, None)
+            if not header:
+                raise ValueError(f"{path} is empty")
+            try:
+                writer = _ChunkWriter(conn, kind, header)
+            except ValueError as e:
+                raise ValueError(f"{path}: {e}") from None
+
+            for chunk in _chunks(records, chunk_size):
+                writer.write(chunk, stats)
+                stats.rows += len(chunk)
+
+                stats.tick()
+                if progress:
+                    progress(stats)
+                if yield_seconds:
+                    time.sleep(yield_seconds)
+    finally:
+        conn.close()
+        # Product imports create missing categories too, and log their stock updates.
+        changes.notify("PRODUCTS", "CATEGORIES", "INVENTORY_LOG")
+
+    stats.tick()
+    logger.info(f"Imported {kind} from {path}: {stats}")
+    return stats
+
+
+def export_catalog(path, db_path=None, kind: str = "products", progress=None) -> TransferStats:
+    """
+    Stream PRODUCTS or CATEGORIES to a CSV or JSON Lines file that
+    ``import_catalog`` can read back.
+
+    Rows are read in keyset-paginated chunks by ID, so no read transaction is
+    held open for the whole export.
+
+    Args:
+        path: Output file (.csv, .jsonl or .ndjson)
+        db_path: Database file, defaults to the app database
+        kind: ``products`` or ``categories``
+        progress: Optional callable receiving ``TransferStats`` after each chunk
+
+    Returns:
+        TransferStats: Final counts and throughput
+    """
+    fmt = detect_format(path)
+    columns = EXPORT_COLUMNS[kind]
+    query = EXPORT_QUERIES[kind]
+    stats = TransferStats()
+    conn = open_connection(db_path or products.DB_PATH)
+
+    try:
+        with open(path, "w", newline="", encoding="utf-8") as handle:
+            writer = csv.writer(handle) if fmt == "csv" else None
+            if writer:
+                writer.writerow(columns)
+
+            last_id = 0
+            while True:
+                rows = conn.execute(query, (last_id, EXPORT_CHUNK_SIZE)).fetchall()
+                if not rows:
+                    break
+                last_id = rows[-1][0]
+                if writer:
+                    writer.writerows(row[1:] for row in rows)
+                else:
+                    handle.writelines(json.dumps(dict(zip(columns, row[1:]))) + "\n" for row in rows)
+                stats.rows += len(rows)
+                stats.written += len(rows)
+                stats.tick()
+                if progress:
+                    progress(stats)
+    finally:
+        conn.close()
+
+    stats.tick()
+    logger.info(f"Exported {kind} to {path}: {stats}")
+    return stats
+
+
+def main():
+    """
+    Command line entry point for catalog import/export.
+    """
+    parser = argparse.ArgumentParser(description="Stream the product catalog in or out of the POS database.")
+    parser.add_argument("action", choices=["import", "export"])
+    parser.add_argument("path", help="CSV (.csv) or JSON Lines (.jsonl/.ndjson) file")
+    parser.add_argument("--kind", choices=["products", "categories"], default="products")
+    parser.add_argument("--db", default=None, help="database file (default: the app database)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    def report(stats):
+        print(f"\r{stats}", end="", file=sys.stderr, flush=True)
+
+    try:
+        if args.action == "import":
+            stats = import_catalog(args.path, args.db, args.kind, chunk_size=args.chunk_size, progress=report)
+        else:
+            stats = export_catalog(args.path, args.db, args.kind, progress=report)
+    except (OSError, ValueError, sqlite3.Error) as e:
+        print(f"\nCatalog {args.action} failed: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    print(f"\nCatalog {args.action} completed: {stats}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+In-process change notifications per table.
+
+Writers call ``notify`` after committing; screens remember the ``version`` of
+the tables they render and re-query only when it has moved, instead of
+reloading on every navigation.
+
+Writes by other processes never call ``notify``. ``poll_external`` watches
+``PRAGMA data_version`` for them. The pragma moves for commits from this
+process too, so every move is treated as possibly external: every table
+moves except those ``notify`` already moved since the last poll.
+"""
+
+import sqlite3
+import threading
+
+# Counter moved by writes from other processes; part of every version.
+# EXTERNAL + table counts the moves that table was spared.
+EXTERNAL = "*"
+
+_versions = {}
+_lock = threading.Lock()
+# str(db_path) -> [watcher connection, data_version, tables notified since that poll]
+_watchers = {}
+
+
+def notify(*tables: str) -> None:
+    """
+    Record that ``tables`` were changed by a committed write in this process.
+    """
+    with _lock:
+        for table in tables:
+            _versions[table] = _versions.get(table, 0) + 1
+        for watcher in _watchers.values():
+            watcher[2].update(tables)
+
+
+def version(*tables: str, at: dict = None) -> tuple:
+    """
+    Current change counters of ``tables``; compare with an earlier result to detect writes.
+
+    Args:
+        tables: Table names
+        at: A ``snapshot()`` to read the counters from instead of the current ones
+    """
+    counters = _versions if at is None else at
+    external = counters.get(EXTERNAL, 0)
+    return tuple((counters.get(table, 0), external - counters.get(EXTERNAL + table, 0)) for table in tables)
+
+
+def snapshot() -> dict:
+    """
+    Copy of every counter, for computing ``version(..., at=...)`` once the tables are known.
+    """
+    with _lock:
+        return dict(_versions)
+
+
+def poll_external(db_path) -> bool:
+    """
+    Check ``db_path`` for commits made outside this process since the last poll.
+
+    If the database changed, every table's version moves except the tables
+    this process notified since the last poll, which have moved already. An
+    entry read after such a local notify and before the poll can miss an
+    external write to the same table, so callers that cache should still
+    expire entries by age.
+
+    Returns:
+        bool: True if the database changed since the last poll (possibly by this process)
+    """
+    key = str(db_path)
+    with _lock:
+        watcher = _watchers.get(key)
+        if watcher is None:
+            conn = sqlite3.connect(key, check_same_thread=False)
+            _watchers[key] = [conn, conn.execute("PRAGMA data_version").fetchone()[0], set()]
+            return False
+
+        conn, seen, notified = watcher
+        current = conn.execute("PRAGMA data_version").fetchone()[0]
+        watcher[1:] = [current, set()]
+        if current == seen:
+            return False
+        _versions[EXTERNAL] = _versions.get(EXTERNAL, 0) + 1
+        for table in notified:
+            _versions[EXTERNAL + table] = _versions.get(EXTERNAL + table, 0) + 1
+        return True
@@ -0,0 +1,442 @@
+"""
+Pooled SQLite connections for the POS runtime.
+
+Opening a connection per statement throws away the page cache and the
+statement cache on every barcode lookup, and never applies the pragmas from
+``database_init.configurations``. This module keeps a small, bounded pool of
+connections per database file; each connection is configured once when it is
+opened and keeps its prepared statements for the life of the process.
+
+Reports, views such as PRODUCT_PERFORMANCE and assistant queries use a
+separate read-only ``ReaderPool``. Its read transactions are short snapshots
+with a time limit, large reads are fetched in keyset chunks (one snapshot
+each), and readers back off while a writer in this process is queued, so a
+report neither delays a checkout nor pins the WAL and stops checkpoints.
+"""
+
+import logging
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from app.data.database_init import configurations
+
+logger = logging.getLogger(__name__)
+
+# Connections handed out concurrently per database file. Flet runs sync event
+# handlers on a worker thread pool, so this bounds SQLite handles per process.
+DEFAULT_POOL_SIZE = 4
+
+# Prepared statements kept per connection (sqlite3 default is 128).
+STATEMENT_CACHE_SIZE = 256
+
+# Seconds a caller waits for a free connection before giving up.
+ACQUIRE_TIMEOUT = 5.0
+
+# Seconds SQLite's busy handler waits for a lock held by another connection.
+BUSY_TIMEOUT = 5.0
+
+# Read-only connections per database for reports and assistant queries.
+READER_POOL_SIZE = 2
+
+# Seconds an analytics snapshot (read transaction) may stay open.
+SNAPSHOT_TIMEOUT = 5.0
+
+# Rows per snapshot when scanning large results.
+SCAN_CHUNK_SIZE = 500
+
+# The reader progress handler runs every this many SQLite VM instructions.
+READER_PROGRESS_INTERVAL = 1000
+
+# While a writer is queued, a reader sleeps this long per progress tick, up to
+# READER_MAX_YIELD seconds per snapshot (or per wait between chunks).
+READER_YIELD = 0.0005
+READER_MAX_YIELD = 0.25
+
+# Pragmas for read-only connections; journal mode and syncing belong to writers.
+READER_CONFIG = {
+    "CACHE_SIZE": configurations["CACHE_SIZE"],
+    "TEMP_STORE": configurations["TEMP_STORE"],
+    "QUERY_ONLY": "PRAGMA QUERY_ONLY = ON",
+}
+
+
+def open_connection(db_path, config: dict = None) -> sqlite3.Connection:
+    """
+    Open a dedicated connection configured like the pooled ones.
+
+    For long-running jobs (bulk import, maintenance) that should not hold a
+    pool slot for their whole run.
+
+    Args:
+        db_path: Path to the database file
+        config: Dictionary of pragmas to apply, defaults to ``configurations``
+
+    Returns:
+        sqlite3.Connection: A configured connection owned by the caller
+    """
+    conn = sqlite3.connect(
+        str(db_path),
+        timeout=BUSY_TIMEOUT,
+        check_same_thread=False,
+        cached_statements=STATEMENT_CACHE_SIZE,
+    )
+    for pragma in (configurations if config is None else config).values():
+        conn.execute(pragma)
+    return conn
+
+
+@contextmanager
+def bypass_triggers(conn: sqlite3.Connection, *tables: str):
+    """
+    Stand down the triggers that maintain ``tables`` row by row, inside the
+    caller's open write transaction; the caller writes those rows itself.
+
+    The markers go into TRIGGER_BYPASS and are removed again on leaving the
+    block, before the caller commits, so no other connection sees them.
+
+    Args:
+        conn: Connection with a write transaction open (``BEGIN IMMEDIATE``)
+        tables: Names of the maintained tables, e.g. ``INVENTORY_LOG``
+    """
+    markers = [(table,) for table in tables]
+    conn.executemany("INSERT OR IGNORE INTO TRIGGER_BYPASS (NAME) VALUES (?)", markers)
+    try:
+        yield conn
+    finally:
+        if conn.in_transaction:
+            conn.executemany("DELETE FROM TRIGGER_BYPASS WHERE NAME = ?", markers)
+
+
+class ConnectionPool:
+    """
+    A bounded pool of pre-configured SQLite connections for one database file.
+    """
+
+    def __init__(self, db_path, size: int = DEFAULT_POOL_SIZE, config: dict = None, timeout: float = ACQUIRE_TIMEOUT) -> None:
+        """
+        Initialize the pool. Connections are opened lazily, up to ``size``.
+
+        Args:
+            db_path: Path to the database file
+            size: Maximum number of open connections
+            config: Dictionary of pragmas applied to every new connection
+            timeout: Seconds to wait for a free connection
+        """
+        self.db_path = str(db_path)
+        self.size = size
+        self.config = configurations if config is None else config
+        self.timeout = timeout
+        self._idle = []
+        self._opened = 0
+        self._available = threading.Condition(threading.Lock())
+        self._closed = False
+        # SQLite allows one writer at a time, so writers in this process queue
+        # here instead of each holding a pool slot while waiting for the lock.
+        self._write_lock = threading.Lock()
+        # Writers queued or writing; analytics readers back off while non-zero.
+        self.pending_writers = 0
+
+    def _open(self) -> sqlite3.Connection:
+        """
+        Open a new connection and apply the configured pragmas once.
+        """
+        conn = open_connection(self.db_path, self.config)
+        logger.debug(f"Opened pooled connection to {self.db_path}")
+        return conn
+
+    def acquire(self) -> sqlite3.Connection:
+        """
+        Take a connection from the pool, opening one if the pool is not full.
+
+        Returns:
+            sqlite3.Connection: A configured connection owned by the caller until released
+        """
+        deadline = None
+        with self._available:
+            while True:
+                if self._closed:
+                    raise RuntimeError(f"Connection pool for {self.db_path} is closed")
+                if self._idle:
+                    # Most recently used first, so its page cache is still warm.
+                    return self._idle.pop()
+                if self._opened < self.size:
+                    self._opened += 1
+                    break
+                if deadline is None:
+                    deadline = time.monotonic() + self.timeout
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self._available.wait(remaining):
+                    raise TimeoutError(f"No free connection to {self.db_path} after {self.timeout}s")
+
+        try:
+            return self._open()
+        except Exception:
+            with self._available:
+                self._opened -= 1
+                self._available.notify()
+            raise
+
+    def release(self, conn: sqlite3.Connection) -> None:
+        """
+        Return a connection to the pool, rolling back anything left open.
+        """
+        if conn.in_transaction:
+            conn.rollback()
+
+        with self._available:
+            if not self._closed:
+                self._idle.append(conn)
+                self._available.notify()
+                return
+            self._opened -= 1
+        conn.close()
+
+    @contextmanager
+    def connection(self):
+        """
+        Borrow a connection for the duration of a ``with`` block.
+
+        An exception inside the block rolls back the open transaction before the
+        connection goes back to the pool.
+        """
+        conn = self.acquire()
+        try:
+            yield conn
+        except BaseException:
+            if conn.in_transaction:
+                conn.rollback()
+            raise
+        finally:
+            self.release(conn)
+
+    @contextmanager
+    def writer(self):
+        """
+        Borrow a connection for a write transaction, one writer per process at a time.
+
+        Readers keep the remaining slots while writers wait their turn.
+        """
+        with self._available:
+            self.pending_writers += 1
+        try:
+            with self._write_lock:
+                with self.connection() as conn:
+                    yield conn
+        finally:
+            with self._available:
+                self.pending_writers -= 1
+
+    def close(self) -> None:
+        """
+        Close every idle connection. Connections in use are closed on release.
+        """
+        with self._available:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._opened -= len(idle)
+            self._available.notify_all()
+        for conn in idle:
+            conn.close()
+
+
+class ReaderPool(ConnectionPool):
+    """
+    A bounded pool of read-only connections for analytics, giving way to writers.
+    """
+
+    def __init__(self, db_path, writers: ConnectionPool, size: int = READER_POOL_SIZE,
+                 timeout: float = ACQUIRE_TIMEOUT) -> None:
+        """
+        Initialize the pool. Connections are opened lazily, up to ``size``.
+
+        Args:
+            db_path: Path to the database file
+            writers: The write pool of the same file, whose queued writers readers give way to
+            size: Maximum number of open connections
+            timeout: Seconds to wait for a free connection
+        """
+        super().__init__(db_path, size=size, config=READER_CONFIG, timeout=timeout)
+        self._writers = writers
+        self.snapshots = 0
+        self.interrupted = 0
+        self.yield_time = 0.0
+        self.longest_snapshot = 0.0
+        self._stats_lock = threading.Lock()
+
+    def _open(self) -> sqlite3.Connection:
+        """
+        Open a read-only connection (``mode=ro``) and apply the reader pragmas once.
+        """
+        conn = sqlite3.connect(
+            f"file:{self.db_path}?mode=ro",
+            uri=True,
+            timeout=BUSY_TIMEOUT,
+            check_same_thread=False,
+            cached_statements=STATEMENT_CACHE_SIZE,
+        )
+        for pragma in self.config.values():
+            conn.execute(pragma)
+        logger.debug(f"Opened read-only connection to {self.db_path}")
+        return conn
+
+    def wait_for_writers(self, limit: float = READER_MAX_YIELD) -> float:
+        """
+        Sleep while writers are queued, for at most ``limit`` seconds.
+
+        Returns:
+            float: Seconds waited
+        """
+        waited = 0.0
+        while self._writers.pending_writers and waited < limit:
+            time.sleep(READER_YIELD)
+            waited += READER_YIELD
+        if waited:
+            with self._stats_lock:
+                self.yield_time += waited
+        return waited
+
+    @contextmanager
+    def snapshot(self, timeout: float = SNAPSHOT_TIMEOUT, budget: int = None):
+        """
+        Borrow a read-only connection inside one read transaction.
+
+        A progress handler interrupts statements once the snapshot is older than
+        ``timeout`` or has run ``budget`` VM instructions (``sqlite3.OperationalError:
+        interrupted``), and pauses the reader while a writer is queued.
+
+        Args:
+            timeout: Seconds the snapshot may stay open
+            budget: Optional SQLite VM instruction limit
+        """
+        start = time.monotonic()
+        deadline = start + timeout
+        state = {"steps": 0, "yielded": 0.0}
+
+        def progress():
+            state["steps"] += READER_PROGRESS_INTERVAL
+            if budget is not None and state["steps"] > budget:
+                return 1
+            if self._writers.pending_writers and state["yielded"] < READER_MAX_YIELD:
+                time.sleep(READER_YIELD)
+                state["yielded"] += READER_YIELD
+            return time.monotonic() > deadline
+
+        with self.connection() as conn:
+            conn.set_progress_handler(progress, READER_PROGRESS_INTERVAL)
+            try:
+                conn.execute("BEGIN")
+                yield conn
+            except sqlite3.OperationalError as e:
+                if "interrupted" in str(e):
+                    with self._stats_lock:
+                        self.interrupted += 1
+                raise
+            finally:
+                if conn.in_transaction:
+                    conn.rollback()
+                conn.set_progress_handler(None, 0)
+                elapsed = time.monotonic() - start
+                with self._stats_lock:
+                    self.snapshots += 1
+                    self.yield_time += state["yielded"]
+                    self.longest_snapshot = max(self.longest_snapshot, elapsed)
+
+    def query(self, sql: str, params=(), timeout: float = SNAPSHOT_TIMEOUT) -> list:
+        """
+        Run one bounded query in its own snapshot and return all rows.
+        """
+        with self.snapshot(timeout) as conn:
+            return conn.execute(sql, params).fetchall()
+
+    def scan(self, sql: str, params=(), key: str = "ID", chunk_size: int = SCAN_CHUNK_SIZE,
+             timeout: float = SNAPSHOT_TIMEOUT):
+        """
+        Yield the rows of ``sql`` in chunks ordered by ``key``, one short snapshot per chunk.
+
+        Chunks may come from different snapshots, so a scan is not one
+        consistent read; use it for reports and exports, not for totals that
+        must balance.
+
+        Args:
+            sql: A SELECT whose result has a unique, sortable column ``key``
+            params: Parameters of ``sql``
+            key: Column to paginate on
+            chunk_size: Rows per chunk
+            timeout: Seconds each chunk's snapshot may stay open
+
+        Yields:
+            list: Up to ``chunk_size`` rows
+        """
+        last = None
+        paged = f"SELECT * FROM ({sql}) WHERE (? IS NULL OR {key} > ?) ORDER BY {key} LIMIT ?"
+        while True:
+            self.wait_for_writers()
+            with self.snapshot(timeout) as conn:
+                cursor = conn.execute(paged, (*params, last, last, chunk_size))
+                position = [column[0] for column in cursor.description].index(key)
+                rows = cursor.fetchall()
+            if rows:
+                yield rows
+            if len(rows) < chunk_size:
+                return
+            last = rows[-1][position]
+
+    def stats(self) -> dict:
+        """
+        Snapshot counters: taken, interrupted, longest (seconds) and time spent yielding to writers.
+        """
+        with self._stats_lock:
+            return {
+                "snapshots": self.snapshots,
+                "interrupted": self.interrupted,
+                "longest_snapshot": self.longest_snapshot,
+                "yield_time": self.yield_time,
+            }
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(db_path, size: int = DEFAULT_POOL_SIZE) -> ConnectionPool:
+    """
+    Return the process-wide pool for ``db_path``, creating it on first use.
+    """
+    # Keyed on the path as given: resolving it costs a filesystem call on
+    # every lookup, and callers pass the same module-level path each time.
+    key = str(db_path)
+    pool = _pools.get(key)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(key)
+            if pool is None:
+                pool = _pools[key] = ConnectionPool(Path(db_path).resolve(), size=size)
+    return pool
+
+
+def get_reader_pool(db_path, size: int = READER_POOL_SIZE) -> ReaderPool:
+    """
+    Return the process-wide read-only analytics pool for ``db_path``, creating it on first use.
+    """
+    key = f"ro:{db_path}"
+    pool = _pools.get(key)
+    if pool is None:
+        writers = get_pool(db_path)
+        with _pools_lock:
+            pool = _pools.get(key)
+            if pool is None:
+                pool = _pools[key] = ReaderPool(Path(db_path).resolve(), writers, size=size)
+    return pool
+
+
+def close_pools() -> None:
+    """
+    Close all process-wide pools, e.g. when the app shuts down.
+    """
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.close()
+        _pools.clear()
@@ -15,7 +15,15 @@ from pathlib import Path
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Version stamped in PRAGMA user_version by initialize_database; bump it with
+# each migration added to app/data/migrations.py.
+SCHEMA_VERSION = 9
+
 configurations = {
+    # Keep freed pages reclaimable with PRAGMA incremental_vacuum (takes effect
+    # only on new databases; existing ones need a full VACUUM to switch).
+    "AUTO_VACUUM": "PRAGMA AUTO_VACUUM = INCREMENTAL",
+    
     # Enable WAL mode for concurrent access.
     "JOURNAL_MODE": "PRAGMA JOURNAL_MODE = WAL",
     
@@ -124,6 +132,7 @@ tables = {
     # TRANSACTION_ITEMS table: Details the individual products included in 
     # each transaction. It links to a specific transaction and product, 
     # storing the quantity, unit price, and discount for that item, with a calculated line total.
+    # UNIT_COST is the product's COST_PRICE when it was sold, so later cost changes keep past profit.
     "TRANSACTION_ITEMS": """CREATE TABLE IF NOT EXISTS TRANSACTION_ITEMS
                             (
                                 ID INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -134,6 +143,7 @@ tables = {
                                 QUANTITY INTEGER NOT NULL DEFAULT 1,
                                 UNIT_PRICE DECIMAL(10,2) NOT NULL,
                                 DISCOUNT_AMOUNT DECIMAL(10,2) NOT NULL DEFAULT 0.00,
+                                UNIT_COST DECIMAL(10,2),
                                 LINE_TOTAL DECIMAL(10,2) GENERATED ALWAYS AS (
                                     (QUANTITY * UNIT_PRICE) - DISCOUNT_AMOUNT
                                 ) STORED,
@@ -167,19 +177,107 @@ tables = {
                                 CHECK (MOVEMENT_TYPE IN ('SALE', 'RESTOCK', 'ADJUSTMENT', 'DAMAGE', 'RETURN', 'TRANSFER')),
                                 CHECK (NEW_STOCK >= 0)
                             )
+                        """,    
+    # SALES_HOURLY table: Hourly totals of completed sales, kept up to date by the
+    # ROLLUP_SALE_* triggers, so reports read one row per hour instead of
+    # grouping TRANSACTIONS. PERIOD is the UTC hour ('2026-01-31 14:00:00').
+    "SALES_HOURLY":      """CREATE TABLE IF NOT EXISTS SALES_HOURLY
+                            (
+                                PERIOD TEXT PRIMARY KEY,
+                                TRANSACTION_COUNT INTEGER NOT NULL DEFAULT 0,
+                                TOTAL_SUBTOTAL DECIMAL(12,2) NOT NULL DEFAULT 0.00,
+                                TOTAL_TAX DECIMAL(12,2) NOT NULL DEFAULT 0.00,
+                                TOTAL_DISCOUNTS DECIMAL(12,2) NOT NULL DEFAULT 0.00,
+                                TOTAL_REVENUE DECIMAL(12,2) NOT NULL DEFAULT 0.00
+                            ) WITHOUT ROWID
+                        """,    
+    # SALES_DAILY table: Daily totals of completed sales, kept up to date by the
+    # ROLLUP_SALE_* triggers, so reports read one row per day instead of
+    # grouping TRANSACTIONS. PERIOD is the UTC day ('2026-01-31').
+    "SALES_DAILY":       """CREATE TABLE IF NOT EXISTS SALES_DAILY
+                            (
+                                PERIOD TEXT PRIMARY KEY,
+                                TRANSACTION_COUNT INTEGER NOT NULL DEFAULT 0,
+                                TOTAL_SUBTOTAL DECIMAL(12,2) NOT NULL DEFAULT 0.00,
+                                TOTAL_TAX DECIMAL(12,2) NOT NULL DEFAULT 0.00,
+                                TOTAL_DISCOUNTS DECIMAL(12,2) NOT NULL DEFAULT 0.00,
+                                TOTAL_REVENUE DECIMAL(12,2) NOT NULL DEFAULT 0.00
+                            ) WITHOUT ROWID
+                        """,    
+    # SALES_MONTHLY table: Monthly totals of completed sales, kept up to date by the
+    # ROLLUP_SALE_* triggers, so reports read one row per month instead of
+    # grouping TRANSACTIONS. PERIOD is the UTC month ('2026-01').
+    "SALES_MONTHLY":     """CREATE TABLE IF NOT EXISTS SALES_MONTHLY
+                            (
+                                PERIOD TEXT PRIMARY KEY,
+                                TRANSACTION_COUNT INTEGER NOT NULL DEFAULT 0,
+                                TOTAL_SUBTOTAL DECIMAL(12,2) NOT NULL DEFAULT 0.00,
+                                TOTAL_TAX DECIMAL(12,2) NOT NULL DEFAULT 0.00,
+                                TOTAL_DISCOUNTS DECIMAL(12,2) NOT NULL DEFAULT 0.00,
+                                TOTAL_REVENUE DECIMAL(12,2) NOT NULL DEFAULT 0.00
+                            ) WITHOUT ROWID
+                        """,
+    
+    # PRODUCT_SALES table: All-time sales of each product over completed transactions,
+    # kept up to date by the ROLLUP_ITEM_* and ROLLUP_PRODUCT_* triggers. Profit uses the
+    # unit cost captured at the time of sale. LAST_SOLD_AT is the latest sale ever made
+    # and is not moved back by voids or returns.
+    "PRODUCT_SALES":     """CREATE TABLE IF NOT EXISTS PRODUCT_SALES
+                            (
+                                PRODUCT_ID INTEGER PRIMARY KEY,
+                                TOTAL_QUANTITY_SOLD INTEGER NOT NULL DEFAULT 0,
+                                TOTAL_REVENUE DECIMAL(12,2) NOT NULL DEFAULT 0.00,
+                                TOTAL_COST DECIMAL(12,2) NOT NULL DEFAULT 0.00,
+                                TOTAL_PROFIT DECIMAL(12,2) NOT NULL DEFAULT 0.00,
+                                LAST_SOLD_AT TIMESTAMP,
+                                FOREIGN KEY (PRODUCT_ID) REFERENCES PRODUCTS(ID) ON DELETE CASCADE
+                            )
+                        """,
+
+    # PRODUCTS_FTS table: Full-text index of product NAME, SKU and DESCRIPTION for searching
+    # products by name (app/data/product_search.py). It has external content: it stores only
+    # the index, reads the text from PRODUCTS, and the PRODUCTS_FTS_* triggers keep it in step.
+    # prefix='2 3' also indexes 2- and 3-character prefixes, the terms a typeahead sees most.
+    "PRODUCTS_FTS":      """CREATE VIRTUAL TABLE IF NOT EXISTS PRODUCTS_FTS USING fts5
+                            (
+                                NAME, SKU, DESCRIPTION,
+                                content='PRODUCTS', content_rowid='ID', prefix='2 3'
+                            )
+                        """,
+
+    # PRODUCT_TOMBSTONES table: SKUs that no longer name a product, because the product was
+    # deleted or given another SKU, stamped by the PRODUCT_TOMBSTONE_* triggers. Caches keyed
+    # by SKU (app/data/catalog_cache.py) read it to drop them; UPDATED_AT cannot tell them.
+    "PRODUCT_TOMBSTONES": """CREATE TABLE IF NOT EXISTS PRODUCT_TOMBSTONES
+                            (
+                                SKU TEXT PRIMARY KEY,
+                                REMOVED_AT TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+                            ) WITHOUT ROWID
+                        """,
+
+    # TRIGGER_BYPASS table: Names the tables (INVENTORY_LOG, PRODUCTS_FTS, PRODUCT_SALES) whose
+    # rows the current write transaction writes itself, set-based, so the triggers that maintain
+    # them row by row stand down (app/data/connection.py, bypass_triggers). The writer removes its
+    # rows again before it commits, so other connections always find the table empty.
+    "TRIGGER_BYPASS":    """CREATE TABLE IF NOT EXISTS TRIGGER_BYPASS
+                            (
+                                NAME TEXT PRIMARY KEY
+                            ) WITHOUT ROWID
                         """
 }
 
 indexes = {
-    # Product table indexes.
-    "IDX_PRODUCTS_SKU": "CREATE INDEX IF NOT EXISTS IDX_PRODUCTS_SKU ON PRODUCTS(SKU)",
-    "IDX_PRODUCTS_CATEGORY": "CREATE INDEX IF NOT EXISTS IDX_PRODUCTS_CATEGORY ON PRODUCTS(CATEGORY_ID)",
+    # Product table indexes (SKU is indexed by its UNIQUE constraint). NAME and
+    # CATEGORY_ID, NAME serve the inventory browser's pages (app/data/product_pages.py);
+    # the latter also indexes the CATEGORY_ID foreign key.
+    "IDX_PRODUCTS_NAME": "CREATE INDEX IF NOT EXISTS IDX_PRODUCTS_NAME ON PRODUCTS(NAME)",
+    "IDX_PRODUCTS_CATEGORY_NAME": "CREATE INDEX IF NOT EXISTS IDX_PRODUCTS_CATEGORY_NAME ON PRODUCTS(CATEGORY_ID, NAME)",
     "IDX_PRODUCTS_SUPPLIER": "CREATE INDEX IF NOT EXISTS IDX_PRODUCTS_SUPPLIER ON PRODUCTS(SUPPLIER_ID)",
     "IDX_PRODUCTS_STOCK": "CREATE INDEX IF NOT EXISTS IDX_PRODUCTS_STOCK ON PRODUCTS(CURRENT_STOCK)",
     "IDX_PRODUCTS_ACTIVE": "CREATE INDEX IF NOT EXISTS IDX_PRODUCTS_ACTIVE ON PRODUCTS(IS_ACTIVE)",
+    "IDX_PRODUCTS_UPDATED": "CREATE INDEX IF NOT EXISTS IDX_PRODUCTS_UPDATED ON PRODUCTS(UPDATED_AT)",
     
-    # Transaction table indexes.
-    "IDX_TRANSACTIONS_NUMBER": "CREATE INDEX IF NOT EXISTS IDX_TRANSACTIONS_NUMBER ON TRANSACTIONS(TRANSACTION_NUMBER)",
+    # Transaction table indexes (TRANSACTION_NUMBER is indexed by its UNIQUE constraint).
     "IDX_TRANSACTIONS_DATE": "CREATE INDEX IF NOT EXISTS IDX_TRANSACTIONS_DATE ON TRANSACTIONS(CREATED_AT)",
     "IDX_TRANSACTIONS_STATUS": "CREATE INDEX IF NOT EXISTS IDX_TRANSACTIONS_STATUS ON TRANSACTIONS(STATUS)",
     "IDX_TRANSACTIONS_CASHIER": "CREATE INDEX IF NOT EXISTS IDX_TRANSACTIONS_CASHIER ON TRANSACTIONS(CASHIER_ID)",
@@ -195,6 +293,15 @@ indexes = {
     "IDX_INVENTORY_LOG_TYPE": "CREATE INDEX IF NOT EXISTS IDX_INVENTORY_LOG_TYPE ON INVENTORY_LOG(MOVEMENT_TYPE)",
     "IDX_INVENTORY_LOG_REFERENCE": "CREATE INDEX IF NOT EXISTS IDX_INVENTORY_LOG_REFERENCE ON INVENTORY_LOG(REFERENCE_TYPE, REFERENCE_ID)",
     
+    # Product sales indexes: top sellers by each metric, and slow movers.
+    "IDX_PRODUCT_SALES_QUANTITY": "CREATE INDEX IF NOT EXISTS IDX_PRODUCT_SALES_QUANTITY ON PRODUCT_SALES(TOTAL_QUANTITY_SOLD)",
+    "IDX_PRODUCT_SALES_REVENUE": "CREATE INDEX IF NOT EXISTS IDX_PRODUCT_SALES_REVENUE ON PRODUCT_SALES(TOTAL_REVENUE)",
+    "IDX_PRODUCT_SALES_PROFIT": "CREATE INDEX IF NOT EXISTS IDX_PRODUCT_SALES_PROFIT ON PRODUCT_SALES(TOTAL_PROFIT)",
+    "IDX_PRODUCT_SALES_LAST_SOLD": "CREATE INDEX IF NOT EXISTS IDX_PRODUCT_SALES_LAST_SOLD ON PRODUCT_SALES(LAST_SOLD_AT)",
+    
+    # Product tombstones index: SKUs removed since a cache last synced.
+    "IDX_PRODUCT_TOMBSTONES_REMOVED": "CREATE INDEX IF NOT EXISTS IDX_PRODUCT_TOMBSTONES_REMOVED ON PRODUCT_TOMBSTONES(REMOVED_AT)",
+    
     # Categories table indexes.
     "IDX_CATEGORIES_PARENT": "CREATE INDEX IF NOT EXISTS IDX_CATEGORIES_PARENT ON CATEGORIES(PARENT_ID)"
 }
@@ -202,24 +309,25 @@ indexes = {
 views = {
     # DAILY_SALES_SUMMARY view: Provides a daily summary of sales transactions, 
     # including total revenue, tax, discounts, and average transaction value for completed transactions.
+    # Reads the SALES_DAILY rollup, one row per day, rather than grouping TRANSACTIONS.
     "DAILY_SALES_SUMMARY":  """CREATE VIEW IF NOT EXISTS DAILY_SALES_SUMMARY AS
                                 SELECT 
-                                    DATE(CREATED_AT) as SALE_DATE,
-                                    COUNT(*) as TRANSACTION_COUNT,
-                                    SUM(SUBTOTAL) as TOTAL_SUBTOTAL,
-                                    SUM(TAX_AMOUNT) as TOTAL_TAX,
-                                    SUM(DISCOUNT_AMOUNT) as TOTAL_DISCOUNTS,
-                                    SUM(TOTAL_AMOUNT) as TOTAL_REVENUE,
-                                    AVG(TOTAL_AMOUNT) as AVERAGE_TRANSACTION_VALUE
-                                FROM TRANSACTIONS 
-                                WHERE STATUS = 'COMPLETED'
-                                GROUP BY DATE(CREATED_AT)
+                                    PERIOD as SALE_DATE,
+                                    TRANSACTION_COUNT,
+                                    TOTAL_SUBTOTAL,
+                                    TOTAL_TAX,
+                                    TOTAL_DISCOUNTS,
+                                    TOTAL_REVENUE,
+                                    ROUND(TOTAL_REVENUE / TRANSACTION_COUNT, 2) as AVERAGE_TRANSACTION_VALUE
+                                FROM SALES_DAILY 
+                                WHERE TRANSACTION_COUNT > 0
                                 ORDER BY SALE_DATE DESC
                             """,
     
     # PRODUCT_PERFORMANCE view: Combines product details with sales performance metrics,
     # such as total quantity sold, total revenue, and profit. It also indicates stock status 
     # based on current stock levels and reorder thresholds.
+    # Sales figures come from the PRODUCT_SALES aggregate instead of grouping TRANSACTION_ITEMS.
     "PRODUCT_PERFORMANCE":  """CREATE VIEW IF NOT EXISTS PRODUCT_PERFORMANCE AS
                                 SELECT 
                                     P.ID,
@@ -231,29 +339,19 @@ views = {
                                     P.REORDER_LEVEL,
                                     P.COST_PRICE,
                                     P.SELLING_PRICE,
-                                    COALESCE(SALES.TOTAL_QUANTITY_SOLD, 0) AS TOTAL_QUANTITY_SOLD,
-                                    COALESCE(SALES.TOTAL_REVENUE, 0) AS TOTAL_REVENUE,
-                                    COALESCE(SALES.TOTAL_PROFIT, 0) AS TOTAL_PROFIT,
+                                    COALESCE(PS.TOTAL_QUANTITY_SOLD, 0) AS TOTAL_QUANTITY_SOLD,
+                                    COALESCE(PS.TOTAL_REVENUE, 0) AS TOTAL_REVENUE,
+                                    COALESCE(PS.TOTAL_PROFIT, 0) AS TOTAL_PROFIT,
                                     CASE 
                                         WHEN P.CURRENT_STOCK <= P.REORDER_LEVEL THEN 'LOW_STOCK'
                                         WHEN P.CURRENT_STOCK = 0 THEN 'OUT_OF_STOCK'
                                         ELSE 'IN_STOCK'
-                                    END AS STOCK_STATUS
+                                    END AS STOCK_STATUS,
+                                    PS.LAST_SOLD_AT
                                 FROM PRODUCTS P
                                 LEFT JOIN CATEGORIES C ON P.CATEGORY_ID = C.ID
                                 LEFT JOIN SUPPLIERS S ON P.SUPPLIER_ID = S.ID
-                                LEFT JOIN (
-                                    SELECT 
-                                        TI.PRODUCT_ID,
-                                        SUM(TI.QUANTITY) AS TOTAL_QUANTITY_SOLD,
-                                        SUM(TI.LINE_TOTAL) AS TOTAL_REVENUE,
-                                        SUM(TI.LINE_TOTAL - (TI.QUANTITY * P2.COST_PRICE)) AS TOTAL_PROFIT
-                                    FROM TRANSACTION_ITEMS TI
-                                    JOIN TRANSACTIONS T ON TI.TRANSACTION_ID = T.ID
-                                    JOIN PRODUCTS P2 ON TI.PRODUCT_ID = P2.ID
-                                    WHERE T.STATUS = 'COMPLETED'
-                                    GROUP BY TI.PRODUCT_ID
-                                ) SALES ON P.ID = SALES.PRODUCT_ID
+                                LEFT JOIN PRODUCT_SALES PS ON PS.PRODUCT_ID = P.ID
                                 WHERE P.IS_ACTIVE = 1
                             """,
     
@@ -284,12 +382,79 @@ views = {
                             """
 }
 
+# Period of a TRANSACTIONS row in each rollup table; {row} is NEW or OLD.
+rollup_periods = {
+    "SALES_HOURLY": "STRFTIME('%Y-%m-%d %H:00:00', {row}.CREATED_AT)",
+    "SALES_DAILY": "DATE({row}.CREATED_AT)",
+    "SALES_MONTHLY": "STRFTIME('%Y-%m', {row}.CREATED_AT)",
+}
+
+
+def _rollup_upserts(row: str, sign: str) -> str:
+    """
+    Trigger body statements adding (``sign`` "+") or removing ("-") transaction ``row`` in every rollup.
+    """
+    return "\n".join(
+        f"""INSERT INTO {table} (
+                PERIOD, TRANSACTION_COUNT, TOTAL_SUBTOTAL, TOTAL_TAX, TOTAL_DISCOUNTS, TOTAL_REVENUE
+            ) VALUES (
+                {period.format(row=row)}, {sign}1, {sign}{row}.SUBTOTAL, {sign}{row}.TAX_AMOUNT,
+                {sign}{row}.DISCOUNT_AMOUNT, {sign}{row}.TOTAL_AMOUNT
+            ) ON CONFLICT (PERIOD) DO UPDATE SET
+                TRANSACTION_COUNT = TRANSACTION_COUNT + EXCLUDED.TRANSACTION_COUNT,
+                TOTAL_SUBTOTAL = ROUND(TOTAL_SUBTOTAL + EXCLUDED.TOTAL_SUBTOTAL, 2),
+                TOTAL_TAX = ROUND(TOTAL_TAX + EXCLUDED.TOTAL_TAX, 2),
+                TOTAL_DISCOUNTS = ROUND(TOTAL_DISCOUNTS + EXCLUDED.TOTAL_DISCOUNTS, 2),
+                TOTAL_REVENUE = ROUND(TOTAL_REVENUE + EXCLUDED.TOTAL_REVENUE, 2);"""
+        for table, period in rollup_periods.items()
+    )
+
+
+def product_sales_upsert(source: str, sign: str, sold_at: str) -> str:
+    """
+    Statement adding (``sign`` "+") or removing ("-") item rows in PRODUCT_SALES, for a trigger
+    body or for checkout, which adds a sale's items in one go.
+
+    Args:
+        source: FROM/WHERE clause yielding the item rows as ``I``
+        sign: "+" or "-"
+        sold_at: Sale time expression for LAST_SOLD_AT
+    """
+    return f"""INSERT INTO PRODUCT_SALES (
+                   PRODUCT_ID, TOTAL_QUANTITY_SOLD, TOTAL_REVENUE, TOTAL_COST, TOTAL_PROFIT, LAST_SOLD_AT
+               )
+               SELECT I.PRODUCT_ID, {sign}SUM(I.QUANTITY), {sign}SUM(I.LINE_TOTAL),
+                      {sign}SUM(I.QUANTITY * COALESCE(I.UNIT_COST, 0)),
+                      {sign}SUM(I.LINE_TOTAL - I.QUANTITY * COALESCE(I.UNIT_COST, 0)),
+                      {"NULL" if sign == "-" else sold_at}
+               {source}
+               GROUP BY I.PRODUCT_ID
+               ON CONFLICT (PRODUCT_ID) DO UPDATE SET
+                   TOTAL_QUANTITY_SOLD = TOTAL_QUANTITY_SOLD + EXCLUDED.TOTAL_QUANTITY_SOLD,
+                   TOTAL_REVENUE = ROUND(TOTAL_REVENUE + EXCLUDED.TOTAL_REVENUE, 2),
+                   TOTAL_COST = ROUND(TOTAL_COST + EXCLUDED.TOTAL_COST, 2),
+                   TOTAL_PROFIT = ROUND(TOTAL_PROFIT + EXCLUDED.TOTAL_PROFIT, 2),
+                   LAST_SOLD_AT = COALESCE(MAX(LAST_SOLD_AT, EXCLUDED.LAST_SOLD_AT), LAST_SOLD_AT,
+                                           EXCLUDED.LAST_SOLD_AT);"""
+
+
+# Status of the transaction an item row belongs to.
+_ITEM_STATUS = "(SELECT STATUS FROM TRANSACTIONS WHERE ID = {row}.TRANSACTION_ID)"
+
+# Trigger condition: the current write transaction does not write {table} rows itself.
+_NOT_BYPASSED = "NOT EXISTS (SELECT 1 FROM TRIGGER_BYPASS WHERE NAME = '{table}')"
+
+# Columns whose change moves a transaction between or within rollup periods.
+_ROLLUP_COLUMNS = "STATUS, SUBTOTAL, TAX_AMOUNT, DISCOUNT_AMOUNT, TOTAL_AMOUNT, CREATED_AT"
+
 triggers = {
     # UPDATE_PRODUCT_TIMESTAMP trigger: To automatically update the UPDATED_AT timestamp on PRODUCTS, 
-    # CATEGORIES, and SUPPLIERS when they are modified.
+    # CATEGORIES, and SUPPLIERS when they are modified. Updates that set UPDATED_AT themselves
+    # (bulk imports, checkout) skip the second write.
     "UPDATE_PRODUCT_TIMESTAMP": """CREATE TRIGGER IF NOT EXISTS UPDATE_PRODUCT_TIMESTAMP
                                     AFTER UPDATE ON PRODUCTS
                                     FOR EACH ROW
+                                    WHEN NEW.UPDATED_AT IS OLD.UPDATED_AT
                                     BEGIN
                                         UPDATE PRODUCTS SET UPDATED_AT = CURRENT_TIMESTAMP WHERE ID = NEW.ID;
                                     END
@@ -299,6 +464,7 @@ triggers = {
     "UPDATE_CATEGORY_TIMESTAMP": """CREATE TRIGGER IF NOT EXISTS UPDATE_CATEGORY_TIMESTAMP
                                     AFTER UPDATE ON CATEGORIES
                                     FOR EACH ROW
+                                    WHEN NEW.UPDATED_AT IS OLD.UPDATED_AT
                                     BEGIN
                                         UPDATE CATEGORIES SET UPDATED_AT = CURRENT_TIMESTAMP WHERE ID = NEW.ID;
                                     END
@@ -308,6 +474,7 @@ triggers = {
     "UPDATE_SUPPLIER_TIMESTAMP": """CREATE TRIGGER IF NOT EXISTS UPDATE_SUPPLIER_TIMESTAMP
                                     AFTER UPDATE ON SUPPLIERS
                                     FOR EACH ROW
+                                    WHEN NEW.UPDATED_AT IS OLD.UPDATED_AT
                                     BEGIN
                                         UPDATE SUPPLIERS SET UPDATED_AT = CURRENT_TIMESTAMP WHERE ID = NEW.ID;
                                     END
@@ -316,10 +483,12 @@ triggers = {
     # LOG_INVENTORY_CHANGES trigger: To automatically log any changes to product 
     # stock levels in the INVENTORY_LOG table, capturing the previous and new stock levels,
     # the reason for the change, and the type of movement (e.g., SALE, RESTOCK, ADJUSTMENT).
-    "LOG_INVENTORY_CHANGES":     """CREATE TRIGGER IF NOT EXISTS LOG_INVENTORY_CHANGES
+    # Writers that log their own movements (catalog imports, checkout) bypass it.
+    "LOG_INVENTORY_CHANGES":     f"""CREATE TRIGGER IF NOT EXISTS LOG_INVENTORY_CHANGES
                                     AFTER UPDATE OF CURRENT_STOCK ON PRODUCTS
                                     FOR EACH ROW
                                     WHEN OLD.CURRENT_STOCK != NEW.CURRENT_STOCK
+                                         AND {_NOT_BYPASSED.format(table="INVENTORY_LOG")}
                                     BEGIN
                                         INSERT INTO INVENTORY_LOG (
                                             PRODUCT_ID, SKU, MOVEMENT_TYPE, QUANTITY_CHANGE, 
@@ -331,6 +500,171 @@ triggers = {
                                             'STOCK LEVEL UPDATED', 'MANUAL'
                                         );
                                     END
+                                """,
+    
+    # ROLLUP_SALE_* triggers: Keep SALES_HOURLY, SALES_DAILY and SALES_MONTHLY in step with
+    # TRANSACTIONS. Only COMPLETED transactions count: a sale is added when it is inserted or
+    # becomes COMPLETED, and taken out again when it is VOIDED, RETURNED, edited or deleted.
+    "ROLLUP_SALE_INSERT":        f"""CREATE TRIGGER IF NOT EXISTS ROLLUP_SALE_INSERT
+                                    AFTER INSERT ON TRANSACTIONS
+                                    FOR EACH ROW
+                                    WHEN NEW.STATUS = 'COMPLETED'
+                                    BEGIN
+                                        {_rollup_upserts("NEW", "+")}
+                                    END
+                                """,
+    
+    "ROLLUP_SALE_REMOVE":        f"""CREATE TRIGGER IF NOT EXISTS ROLLUP_SALE_REMOVE
+                                    AFTER UPDATE OF {_ROLLUP_COLUMNS} ON TRANSACTIONS
+                                    FOR EACH ROW
+                                    WHEN OLD.STATUS = 'COMPLETED'
+                                    BEGIN
+                                        {_rollup_upserts("OLD", "-")}
+                                    END
+                                """,
+    
+    "ROLLUP_SALE_ADD":           f"""CREATE TRIGGER IF NOT EXISTS ROLLUP_SALE_ADD
+                                    AFTER UPDATE OF {_ROLLUP_COLUMNS} ON TRANSACTIONS
+                                    FOR EACH ROW
+                                    WHEN NEW.STATUS = 'COMPLETED'
+                                    BEGIN
+                                        {_rollup_upserts("NEW", "+")}
+                                    END
+                                """,
+    
+    "ROLLUP_SALE_DELETE":        f"""CREATE TRIGGER IF NOT EXISTS ROLLUP_SALE_DELETE
+                                    AFTER DELETE ON TRANSACTIONS
+                                    FOR EACH ROW
+                                    WHEN OLD.STATUS = 'COMPLETED'
+                                    BEGIN
+                                        {_rollup_upserts("OLD", "-")}
+                                    END
+                                """,
+    
+    # ROLLUP_ITEM_* and ROLLUP_PRODUCT_* triggers: Keep PRODUCT_SALES in step with the items of
+    # COMPLETED transactions. Items count when inserted into a completed sale (checkout writes the
+    # header first), and all of a transaction's items leave or rejoin when it is voided, returned
+    # or completed. A deleted completed transaction takes its items out before the cascade.
+    # Checkout adds all of a sale's items at once and bypasses ROLLUP_ITEM_INSERT.
+    "ROLLUP_ITEM_INSERT":        f"""CREATE TRIGGER IF NOT EXISTS ROLLUP_ITEM_INSERT
+                                    AFTER INSERT ON TRANSACTION_ITEMS
+                                    FOR EACH ROW
+                                    WHEN {_NOT_BYPASSED.format(table="PRODUCT_SALES")}
+                                         AND {_ITEM_STATUS.format(row="NEW")} = 'COMPLETED'
+                                    BEGIN
+                                        {product_sales_upsert("FROM TRANSACTION_ITEMS I WHERE I.ID = NEW.ID", "+",
+                                                               "(SELECT CREATED_AT FROM TRANSACTIONS WHERE ID = NEW.TRANSACTION_ID)")}
+                                    END
+                                """,
+    
+    "ROLLUP_ITEM_UPDATE":        f"""CREATE TRIGGER IF NOT EXISTS ROLLUP_ITEM_UPDATE
+                                    AFTER UPDATE OF PRODUCT_ID, QUANTITY, UNIT_PRICE, DISCOUNT_AMOUNT, UNIT_COST
+                                    ON TRANSACTION_ITEMS
+                                    FOR EACH ROW
+                                    WHEN {_ITEM_STATUS.format(row="NEW")} = 'COMPLETED'
+                                    BEGIN
+                                        {product_sales_upsert(
+                                            "FROM (SELECT OLD.PRODUCT_ID AS PRODUCT_ID, OLD.QUANTITY AS QUANTITY, "
+                                            "OLD.LINE_TOTAL AS LINE_TOTAL, OLD.UNIT_COST AS UNIT_COST) I WHERE 1", "-", "NULL")}
+                                        {product_sales_upsert("FROM TRANSACTION_ITEMS I WHERE I.ID = NEW.ID", "+", "NULL")}
+                                    END
+                                """,
+    
+    "ROLLUP_ITEM_DELETE":        f"""CREATE TRIGGER IF NOT EXISTS ROLLUP_ITEM_DELETE
+                                    AFTER DELETE ON TRANSACTION_ITEMS
+                                    FOR EACH ROW
+                                    WHEN {_ITEM_STATUS.format(row="OLD")} = 'COMPLETED'
+                                    BEGIN
+                                        {product_sales_upsert(
+                                            "FROM (SELECT OLD.PRODUCT_ID AS PRODUCT_ID, OLD.QUANTITY AS QUANTITY, "
+                                            "OLD.LINE_TOTAL AS LINE_TOTAL, OLD.UNIT_COST AS UNIT_COST) I WHERE 1", "-", "NULL")}
+                                    END
+                                """,
+    
+    "ROLLUP_PRODUCT_REMOVE":     f"""CREATE TRIGGER IF NOT EXISTS ROLLUP_PRODUCT_REMOVE
+                                    AFTER UPDATE OF STATUS ON TRANSACTIONS
+                                    FOR EACH ROW
+                                    WHEN OLD.STATUS = 'COMPLETED' AND NEW.STATUS != 'COMPLETED'
+                                    BEGIN
+                                        {product_sales_upsert("FROM TRANSACTION_ITEMS I WHERE I.TRANSACTION_ID = NEW.ID", "-", "NULL")}
+                                    END
+                                """,
+    
+    "ROLLUP_PRODUCT_ADD":        f"""CREATE TRIGGER IF NOT EXISTS ROLLUP_PRODUCT_ADD
+                                    AFTER UPDATE OF STATUS ON TRANSACTIONS
+                                    FOR EACH ROW
+                                    WHEN OLD.STATUS != 'COMPLETED' AND NEW.STATUS = 'COMPLETED'
+                                    BEGIN
+                                        {product_sales_upsert("FROM TRANSACTION_ITEMS I WHERE I.TRANSACTION_ID = NEW.ID", "+",
+                                                               "NEW.CREATED_AT")}
+                                    END
+                                """,
+    
+    "ROLLUP_PRODUCT_DELETE":     f"""CREATE TRIGGER IF NOT EXISTS ROLLUP_PRODUCT_DELETE
+                                    BEFORE DELETE ON TRANSACTIONS
+                                    FOR EACH ROW
+                                    WHEN OLD.STATUS = 'COMPLETED'
+                                    BEGIN
+                                        {product_sales_upsert("FROM TRANSACTION_ITEMS I WHERE I.TRANSACTION_ID = OLD.ID", "-", "NULL")}
+                                    END
+                                """,
+    
+    # PRODUCTS_FTS_* triggers: Keep the product search index in step with PRODUCTS. An
+    # external-content FTS5 table removes a row given its old values (the 'delete' command);
+    # stock, price and timestamp updates, and rewrites of the same text, do not touch it.
+    # Catalog imports index their chunks themselves and bypass them.
+    "PRODUCTS_FTS_INSERT":       f"""CREATE TRIGGER IF NOT EXISTS PRODUCTS_FTS_INSERT
+                                    AFTER INSERT ON PRODUCTS
+                                    FOR EACH ROW
+                                    WHEN {_NOT_BYPASSED.format(table="PRODUCTS_FTS")}
+                                    BEGIN
+                                        INSERT INTO PRODUCTS_FTS (ROWID, NAME, SKU, DESCRIPTION)
+                                        VALUES (NEW.ID, NEW.NAME, NEW.SKU, NEW.DESCRIPTION);
+                                    END
+                                """,
+    
+    "PRODUCTS_FTS_DELETE":       """CREATE TRIGGER IF NOT EXISTS PRODUCTS_FTS_DELETE
+                                    AFTER DELETE ON PRODUCTS
+                                    FOR EACH ROW
+                                    BEGIN
+                                        INSERT INTO PRODUCTS_FTS (PRODUCTS_FTS, ROWID, NAME, SKU, DESCRIPTION)
+                                        VALUES ('delete', OLD.ID, OLD.NAME, OLD.SKU, OLD.DESCRIPTION);
+                                    END
+                                """,
+    
+    "PRODUCTS_FTS_UPDATE":       f"""CREATE TRIGGER IF NOT EXISTS PRODUCTS_FTS_UPDATE
+                                    AFTER UPDATE OF ID, NAME, SKU, DESCRIPTION ON PRODUCTS
+                                    FOR EACH ROW
+                                    WHEN (NEW.ID, NEW.NAME, NEW.SKU, NEW.DESCRIPTION)
+                                         IS NOT (OLD.ID, OLD.NAME, OLD.SKU, OLD.DESCRIPTION)
+                                         AND {_NOT_BYPASSED.format(table="PRODUCTS_FTS")}
+                                    BEGIN
+                                        INSERT INTO PRODUCTS_FTS (PRODUCTS_FTS, ROWID, NAME, SKU, DESCRIPTION)
+                                        VALUES ('delete', OLD.ID, OLD.NAME, OLD.SKU, OLD.DESCRIPTION);
+                                        INSERT INTO PRODUCTS_FTS (ROWID, NAME, SKU, DESCRIPTION)
+                                        VALUES (NEW.ID, NEW.NAME, NEW.SKU, NEW.DESCRIPTION);
+                                    END
+                                """,
+    
+    # PRODUCT_TOMBSTONE_* triggers: Record the SKU of a deleted product, and the old SKU of a
+    # product given a new one, in PRODUCT_TOMBSTONES.
+    "PRODUCT_TOMBSTONE_DELETE":  """CREATE TRIGGER IF NOT EXISTS PRODUCT_TOMBSTONE_DELETE
+                                    AFTER DELETE ON PRODUCTS
+                                    FOR EACH ROW
+                                    BEGIN
+                                        INSERT OR REPLACE INTO PRODUCT_TOMBSTONES (SKU, REMOVED_AT)
+                                        VALUES (OLD.SKU, CURRENT_TIMESTAMP);
+                                    END
+                                """,
+    
+    "PRODUCT_TOMBSTONE_SKU":     """CREATE TRIGGER IF NOT EXISTS PRODUCT_TOMBSTONE_SKU
+                                    AFTER UPDATE OF SKU ON PRODUCTS
+                                    FOR EACH ROW
+                                    WHEN NEW.SKU IS NOT OLD.SKU
+                                    BEGIN
+                                        INSERT OR REPLACE INTO PRODUCT_TOMBSTONES (SKU, REMOVED_AT)
+                                        VALUES (OLD.SKU, CURRENT_TIMESTAMP);
+                                    END
                                 """
 }
 
@@ -375,22 +709,30 @@ class DatabaseInitializer:
             if self.db_dir:
                 Path(self.db_dir).mkdir(parents=True, exist_ok=True)
             
-            # Configure SQLite for optimal performance
+            # Configure SQLite for optimal performance (outside the
+            # transaction: journal_mode and auto_vacuum cannot change in one)
             self._configure_sqlite()
-            
-            # Create all tables
-            self._create_tables()
-            
-            # Create indexes for performance
-            self._create_indexes()
-            
-            # Create views for AI queries
-            self._create_views()
-            
-            # Create triggers for audit trail
-            self._create_triggers()
-            
-            self.conn.commit()
+
+            # Create the whole schema in one transaction, stamped with its version
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Create all tables
+                self._create_tables()
+
+                # Create indexes for performance
+                self._create_indexes()
+
+                # Create views for AI queries
+                self._create_views()
+
+                # Create triggers for audit trail
+                self._create_triggers()
+
+                self.conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+                self.conn.commit()
+            except Exception:
+                self.conn.rollback()
+                raise
             self.conn.close()
             
             logger.info(f"Database initialized successfully at {self.db_path}")
@@ -411,7 +753,7 @@ class DatabaseInitializer:
         
         for key, pragma in self.config.items():
             cursor.execute(f"{pragma}")
-            logger.info(f"Applied pragma: {key} as {pragma}")
+            logger.debug(f"Applied pragma: {key} as {pragma}")
     
     def _create_tables(self) -> None:
         """
@@ -424,7 +766,7 @@ class DatabaseInitializer:
         
         for table_name, create_statement in self.table.items():
             cursor.execute(create_statement)
-            logger.info(f"Table '{table_name}' created successfully")
+            logger.debug(f"Table '{table_name}' created successfully")
     
     def _create_indexes(self) -> None:
         """
@@ -437,7 +779,7 @@ class DatabaseInitializer:
 
         for index_name, create_statement in self.index.items():
             cursor.execute(create_statement)
-            logger.info(f"Index '{index_name}' created successfully")
+            logger.debug(f"Index '{index_name}' created successfully")
     
     def _create_views(self) -> None:
         """
@@ -450,7 +792,7 @@ class DatabaseInitializer:
 
         for view_name, create_statement in self.view.items():
             cursor.execute(create_statement)
-            logger.info(f"View '{view_name}' created successfully")
+            logger.debug(f"View '{view_name}' created successfully")
     
     def _create_triggers(self) -> None:
         """
@@ -463,7 +805,7 @@ class DatabaseInitializer:
 
         for trigger_name, create_statement in self.trigger.items():
             cursor.execute(create_statement)
-            logger.info(f"Trigger '{trigger_name}' created successfully")
+            logger.debug(f"Trigger '{trigger_name}' created successfully")
     
     def verify_database(self, conn) -> bool:
         """
@@ -524,11 +866,19 @@ def main():
     """
     Main function to initialize the database.
     """
+    from app.data.migrations import MigrationError, migrate
+
     db_path = "database/posai.db"
-    connection = sqlite3.connect(db_path)
-    initializer = DatabaseInitializer(db_path=db_path, conn=connection, config=configurations, table=tables, index=indexes, view=views, trigger=triggers)
+    initializer = DatabaseInitializer(db_path=db_path, config=configurations, table=tables, index=indexes, view=views, trigger=triggers)
     
-    if initializer.initialize_database():
+    try:
+        migrate(db_path)
+        initialized = True
+    except (MigrationError, sqlite3.Error) as e:
+        logger.error(f"Database initialization failed: {e}")
+        initialized = False
+
+    if initialized:
         verification_connection = sqlite3.connect(db_path)
         if initializer.verify_database(verification_connection):
             print("Database initialization completed successfully!")
@@ -10,20 +10,8 @@ DATA_DIR.mkdir(parents=True, exist_ok=True)
 
 print(f"Initializing database at {DB_PATH}...")
 
-# EXAMPLE MIGRATION QUERY TO CHANGE TABLE STRUCTURE WITHOUT LOSING DATA:
-
-# BEGIN;
-# CREATE TABLE users_new (
-#   id INTEGER PRIMARY KEY AUTOINCREMENT,
-#   name TEXT NOT NULL,
-#   email TEXT NOT NULL UNIQUE
-#   -- ...new constraints/columns...
-# );
-# INSERT INTO users_new (id, name, email)
-#   SELECT id, name, COALESCE(email, '') FROM users;
-# DROP TABLE users;
-# ALTER TABLE users_new RENAME TO users;
-# COMMIT;
+# Schema changes to existing databases are versioned migrations in
+# app/data/migrations.py (python -m app.data.migrations).
 
 SCHEMA = """
 PRAGMA foreign_keys = ON;
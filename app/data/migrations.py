@@ -0,0 +1,463 @@
+"""
+Versioned schema migrations driven by ``PRAGMA user_version``.
+
+``migrate`` is called once at startup. When the database is current it costs
+one ``PRAGMA user_version`` read. A new database is created at the latest
+version straight from the ``database_init`` definitions. Older ones (including
+unversioned databases, version 0, made by ``db_init.py`` or an earlier
+``database_init``) run each pending migration in order:
+
+- an ordinary migration runs in one ``BEGIN IMMEDIATE`` transaction that also
+  sets ``user_version``, so it is applied entirely or not at all
+- a table rebuild (``rebuild_table``) copies rows in batches of
+  ``REBUILD_BATCH_SIZE``, committing between batches so checkouts keep
+  writing; changes made to copied rows meanwhile are captured by temporary
+  triggers and re-copied in the short final transaction that swaps the
+  tables and sets ``user_version``
+- a backfill (migration 3 costing existing sale items) likewise updates rows
+  by ID range, one short transaction per batch, before the triggers that
+  would react to those updates exist
+
+To change the schema, edit the ``database_init`` definitions (new databases)
+and append a migration here (existing ones), then bump ``SCHEMA_VERSION``.
+Migrations are meant to be run by one process at a time.
+
+    python -m app.data.migrations [--db database/posai.db] [--status]
+"""
+
+import argparse
+import logging
+import re
+import sqlite3
+import sys
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+from app.data import products
+from app.data.connection import get_pool, open_connection
+from app.data.database_init import (
+    SCHEMA_VERSION, DatabaseInitializer, configurations, indexes, tables, triggers, views
+)
+from app.data.rollups import add_unit_cost, backfill_rollups, backfill_unit_costs
+
+logger = logging.getLogger(__name__)
+
+# Rows copied per transaction by a table rebuild.
+REBUILD_BATCH_SIZE = 5000
+
+# Seconds a rebuild pauses between batches so queued writers get the lock.
+REBUILD_BATCH_PAUSE = 0.01
+
+# Suffix of a table being rebuilt and of the indexes built on it.
+_STAGED = "__MIGRATING"
+
+# Objects added after the first versioned schema; migration 1 leaves them to later ones.
+# TRIGGER_BYPASS is not among them: the base triggers, as now defined, consult it.
+_LATER_OBJECTS = re.compile(r"^(SALES_|PRODUCT_SALES|IDX_PRODUCT_SALES_|ROLLUP_|DAILY_SALES_SUMMARY$|PRODUCT_PERFORMANCE$"
+                            r"|IDX_PRODUCTS_NAME$|IDX_PRODUCTS_CATEGORY_NAME$|PRODUCTS_FTS|PRODUCT_TOMBSTONE|IDX_PRODUCT_TOMBSTONES_)")
+
+
+class MigrationError(Exception):
+    """
+    A migration could not be applied; the database stays at its previous version.
+    """
+
+
+@dataclass(frozen=True)
+class Migration:
+    """
+    One schema step. ``apply(conn)`` runs inside the migration's transaction;
+    a ``batched`` one is called as ``apply(db_path)`` instead, manages its own
+    transactions and sets ``user_version`` in its last.
+    """
+    version: int
+    description: str
+    apply: object
+    batched: bool = False
+
+
+def _normalized(sql: str) -> str:
+    sql = re.sub(r"\bIF NOT EXISTS\b", "", sql or "", flags=re.I)
+    return re.sub(r'[\s"]+', "", sql).upper()
+
+
+def _schema_objects(conn, table: str) -> list:
+    """
+    (type, name, sql) of the views and triggers that mention ``table`` and the indexes on it.
+    """
+    rows = conn.execute(
+        "SELECT TYPE, NAME, SQL FROM sqlite_master WHERE SQL IS NOT NULL AND "
+        "((TYPE = 'index' AND TBL_NAME = ?) OR TYPE IN ('view', 'trigger'))", (table,)
+    ).fetchall()
+    mentions = re.compile(rf"\b{table}\b", re.I)
+    return [(kind, name, sql) for kind, name, sql in rows if kind == "index" or mentions.search(sql)]
+
+
+def _write(conn: sqlite3.Connection, *statements: tuple) -> list:
+    """
+    Run ``(sql, params)`` statements in one ``BEGIN IMMEDIATE`` transaction; returns the last one's rows.
+    """
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        rows = [conn.execute(sql, params).fetchall() for sql, params in statements][-1]
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    return rows
+
+
+def _checkpoint(pool) -> None:
+    """
+    Copy the WAL back to the database now, outside the writer slot, rather
+    than in the auto-checkpoint of whichever checkout commits next.
+    """
+    with pool.connection() as conn:
+        conn.execute("PRAGMA wal_checkpoint(PASSIVE)")
+
+
+def _staged_index(sql: str, name: str, table: str) -> str:
+    """
+    ``CREATE INDEX`` statement of index ``name`` on ``table``, built on the staging table under a staged name.
+    """
+    sql = re.sub(rf'\bON\s+"?{table}\b"?', f"ON {table}{_STAGED}", sql, count=1, flags=re.I)
+    return re.sub(rf"\b{name}\b", f"{name}{_STAGED}", sql, count=1)
+
+
+def _finish_indexes(db_path, table: str) -> None:
+    """
+    Give the indexes a rebuild built on its staging table their own names, one short transaction each.
+    """
+    pool = get_pool(db_path)
+    with pool.connection() as conn:
+        staged = conn.execute(
+            "SELECT NAME, SQL FROM sqlite_master WHERE TYPE = 'index' AND TBL_NAME = ? AND NAME LIKE ?",
+            (table, f"%{_STAGED}")
+        ).fetchall()
+    for name, sql in staged:
+        with pool.writer() as conn:
+            _write(conn, (sql.replace(name, name[:-len(_STAGED)], 1), ()), (f"DROP INDEX {name}", ()))
+        time.sleep(REBUILD_BATCH_PAUSE)
+
+
+def rebuild_table(db_path, table: str, definition: str, version: int, batch_size: int = REBUILD_BATCH_SIZE) -> int:
+    """
+    Rebuild ``table`` to ``definition`` in batches, then swap it in and set ``user_version``.
+
+    Every step runs under the pool's writer slot, so checkouts in this process
+    queue between batches rather than behind the whole copy. The table's
+    indexes are built on the staging table as it fills and renamed one by one
+    after the swap, which keeps index builds out of the swap transaction.
+    Columns present in both definitions are copied; the table must have an
+    integer ``ID`` key.
+
+    Returns:
+        int: Rows copied
+    """
+    staging, changed = f"{table}{_STAGED}", f"{table}__CHANGED"
+    events = (("INSERT", "NEW"), ("UPDATE", "NEW"), ("DELETE", "OLD"))
+    capture = [f"{table}__CAPTURE_{event}" for event, _ in events]
+    pool = get_pool(db_path)
+
+    _checkpoint(pool)
+    # Leftovers of an interrupted rebuild: the original table is untouched
+    # unless the swap committed, in which case only the index names remain.
+    _finish_indexes(db_path, table)
+    with pool.writer() as conn:
+        old_columns = [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+        table_indexes = conn.execute(
+            "SELECT NAME, SQL FROM sqlite_master WHERE TYPE = 'index' AND TBL_NAME = ? AND SQL IS NOT NULL", (table,)
+        ).fetchall()
+        _write(
+            conn,
+            *[(f"DROP TRIGGER IF EXISTS {trigger}", ()) for trigger in capture],
+            (f"DROP TABLE IF EXISTS {staging}", ()),
+            (f"DROP TABLE IF EXISTS {changed}", ()),
+            (re.sub(rf"\b{table}\b", staging, definition, count=1), ()),
+            *[(_staged_index(sql, name, table), ()) for name, sql in table_indexes],
+            (f"CREATE TABLE {changed} (ID INTEGER PRIMARY KEY)", ()),
+            *[(f"CREATE TRIGGER {trigger} AFTER {event} ON {table} BEGIN "
+               f"INSERT OR IGNORE INTO {changed} (ID) VALUES ({row}.ID); END", ())
+              for trigger, (event, row) in zip(capture, events)],
+        )
+        new_columns = {row[1] for row in conn.execute(f"PRAGMA table_info({staging})")}
+        # Rows inserted from here on are captured, so the copy need not chase them.
+        high = conn.execute(f"SELECT COALESCE(MAX(ID), 0) FROM {table}").fetchone()[0]
+    columns = ", ".join(column for column in old_columns if column in new_columns)
+
+    copied, last = 0, 0
+    while True:
+        with pool.writer() as conn:
+            rows = _write(conn, (f"INSERT OR REPLACE INTO {staging} ({columns}) "
+                                 f"SELECT {columns} FROM {table} WHERE ID > ? AND ID <= ? ORDER BY ID LIMIT ? RETURNING ID",
+                                 (last, high, batch_size)))
+        if not rows:
+            break
+        copied += len(rows)
+        last = max(row[0] for row in rows)
+        logger.debug(f"Rebuilding {table}: {copied} rows copied")
+        _checkpoint(pool)
+        time.sleep(REBUILD_BATCH_PAUSE)
+
+    with pool.writer() as conn:
+        # Views and triggers that name the table would fail the rename; they are
+        # dropped and recreated from their stored SQL.
+        dependents = [item for item in _schema_objects(conn, table) if item[0] != "index" and item[1] not in capture]
+        conn.execute("PRAGMA foreign_keys = OFF")
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(f"DELETE FROM {staging} WHERE ID IN (SELECT ID FROM {changed})")
+            conn.execute(f"INSERT INTO {staging} ({columns}) SELECT {columns} FROM {table} "
+                         f"WHERE ID IN (SELECT ID FROM {changed})")
+            for kind, name, _ in dependents:
+                conn.execute(f"DROP {kind.upper()} {name}")
+            conn.execute(f"DROP TABLE {table}")
+            conn.execute(f"DROP TABLE {changed}")
+            conn.execute(f"ALTER TABLE {staging} RENAME TO {table}")
+            for kind, _, sql in sorted(dependents, key=lambda item: item[0] != "view"):
+                conn.execute(sql)
+
+            problems = conn.execute(f"PRAGMA foreign_key_check({table})").fetchall()
+            if problems:
+                raise MigrationError(f"Rebuilt {table} breaks {len(problems)} foreign key reference(s)")
+            conn.execute(f"PRAGMA user_version = {version}")
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            conn.execute("PRAGMA foreign_keys = ON")
+
+    _finish_indexes(db_path, table)
+    return copied
+
+
+def base_schema(conn: sqlite3.Connection) -> None:
+    """
+    Create every table, index, view and trigger of the first versioned schema that is missing.
+    """
+    for definitions in (tables, indexes, views, triggers):
+        for name, statement in definitions.items():
+            if not _LATER_OBJECTS.match(name):
+                conn.execute(statement)
+
+
+def canonical_products(db_path) -> None:
+    """
+    Rebuild PRODUCTS if it differs from its definition, e.g. a ``db_init.py``
+    table whose COST_PRICE and SELLING_PRICE have no default.
+    """
+    with get_pool(db_path).writer() as conn:
+        current = conn.execute("SELECT SQL FROM sqlite_master WHERE TYPE = 'table' AND NAME = 'PRODUCTS'").fetchone()
+        if current is not None and _normalized(current[0]) == _normalized(tables["PRODUCTS"]):
+            _write(conn, ("PRAGMA user_version = 2", ()))
+            return
+    rebuild_table(db_path, "PRODUCTS", tables["PRODUCTS"], version=2)
+
+
+def sales_rollups(db_path, batch_size: int = REBUILD_BATCH_SIZE) -> None:
+    """
+    Add UNIT_COST and cost the existing items by ID range, one short
+    transaction per batch and before the ROLLUP_* triggers exist; then add the
+    period and product rollups with their triggers, backfill them and set
+    ``user_version``.
+    """
+    pool = get_pool(db_path)
+    with pool.writer() as conn:
+        add_unit_cost(conn)
+        high = conn.execute("SELECT COALESCE(MAX(ID), 0) FROM TRANSACTION_ITEMS").fetchone()[0]
+
+    costed = 0
+    for last in range(0, high, batch_size):
+        with pool.writer() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                costed += backfill_unit_costs(conn, after=last, upto=min(last + batch_size, high))
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+        logger.debug(f"Costing sale items: {min(last + batch_size, high)} of {high}")
+        _checkpoint(pool)
+        time.sleep(REBUILD_BATCH_PAUSE)
+
+    with pool.writer() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Items sold meanwhile are costed here, before the rollups are computed.
+            backfill_rollups(conn, costed_upto=high)
+            conn.execute("PRAGMA user_version = 3")
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+    logger.debug(f"Costed {costed} sale item(s) without a unit cost")
+
+
+def drop_redundant_indexes(conn: sqlite3.Connection) -> None:
+    """
+    Drop the plain indexes on SKU and TRANSACTION_NUMBER; their UNIQUE constraints already index them.
+    """
+    conn.execute("DROP INDEX IF EXISTS IDX_PRODUCTS_SKU")
+    conn.execute("DROP INDEX IF EXISTS IDX_TRANSACTIONS_NUMBER")
+
+
+def browse_indexes(conn: sqlite3.Connection) -> None:
+    """
+    Index PRODUCTS by NAME and by CATEGORY_ID, NAME for the inventory browser;
+    the latter replaces the plain CATEGORY_ID index.
+    """
+    conn.execute(indexes["IDX_PRODUCTS_NAME"])
+    conn.execute(indexes["IDX_PRODUCTS_CATEGORY_NAME"])
+    conn.execute("DROP INDEX IF EXISTS IDX_PRODUCTS_CATEGORY")
+
+
+def product_search(conn: sqlite3.Connection) -> None:
+    """
+    Add the full-text product search index with its triggers and fill it from PRODUCTS.
+    """
+    conn.execute(tables["PRODUCTS_FTS"])
+    for name, statement in triggers.items():
+        if name.startswith("PRODUCTS_FTS_"):
+            conn.execute(statement)
+    conn.execute("INSERT INTO PRODUCTS_FTS (PRODUCTS_FTS) VALUES ('rebuild')")
+
+
+def product_tombstones(conn: sqlite3.Connection) -> None:
+    """
+    Add PRODUCT_TOMBSTONES and the triggers that record deleted and replaced SKUs in it.
+    """
+    conn.execute(tables["PRODUCT_TOMBSTONES"])
+    conn.execute(indexes["IDX_PRODUCT_TOMBSTONES_REMOVED"])
+    for name, statement in triggers.items():
+        if name.startswith("PRODUCT_TOMBSTONE_"):
+            conn.execute(statement)
+
+
+def _replace_triggers(conn: sqlite3.Connection, *names: str) -> None:
+    """
+    Drop triggers ``names`` and create them again from their current definitions.
+    """
+    for name in names:
+        conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+        conn.execute(triggers[name])
+
+
+def bulk_write_triggers(conn: sqlite3.Connection) -> None:
+    """
+    Let bulk writers stamp UPDATED_AT and write INVENTORY_LOG and PRODUCTS_FTS
+    rows themselves (TRIGGER_BYPASS) instead of paying for the per-row triggers.
+    """
+    conn.execute(tables["TRIGGER_BYPASS"])
+    _replace_triggers(conn, "UPDATE_PRODUCT_TIMESTAMP", "UPDATE_CATEGORY_TIMESTAMP", "UPDATE_SUPPLIER_TIMESTAMP",
+                      "LOG_INVENTORY_CHANGES", "PRODUCTS_FTS_INSERT", "PRODUCTS_FTS_UPDATE")
+
+
+def checkout_rollup_trigger(conn: sqlite3.Connection) -> None:
+    """
+    Let checkout add a sale's items to PRODUCT_SALES in one statement instead of one per item.
+    """
+    _replace_triggers(conn, "ROLLUP_ITEM_INSERT")
+
+
+MIGRATIONS = [
+    Migration(1, "Base schema: tables, indexes, views and triggers", base_schema),
+    Migration(2, "PRODUCTS matches its definition (price defaults)", canonical_products, batched=True),
+    Migration(3, "Sales rollups and per-product sales with unit cost", sales_rollups, batched=True),
+    Migration(4, "Drop indexes duplicated by UNIQUE constraints", drop_redundant_indexes),
+    Migration(5, "Product browser indexes on NAME and CATEGORY_ID, NAME", browse_indexes),
+    Migration(6, "Full-text product search (PRODUCTS_FTS)", product_search),
+    Migration(7, "Tombstones of deleted and replaced SKUs (PRODUCT_TOMBSTONES)", product_tombstones),
+    Migration(8, "Bulk writers bypass per-row timestamp, inventory log and search triggers", bulk_write_triggers),
+    Migration(9, "Checkout writes PRODUCT_SALES per sale instead of per item", checkout_rollup_trigger),
+]
+
+assert MIGRATIONS[-1].version == SCHEMA_VERSION, "bump database_init.SCHEMA_VERSION with each migration"
+
+
+def schema_version(db_path) -> int:
+    """
+    ``user_version`` of ``db_path``, read through the pool.
+    """
+    with get_pool(db_path).connection() as conn:
+        return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(db_path=None) -> int:
+    """
+    Bring ``db_path`` to ``SCHEMA_VERSION``.
+
+    Args:
+        db_path: Database file, defaults to the app database
+
+    Returns:
+        int: The schema version now in place
+
+    Raises:
+        MigrationError: A migration failed; earlier ones stay applied
+    """
+    db_path = db_path or products.DB_PATH
+    Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+    with get_pool(db_path).connection() as conn:
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        if version == SCHEMA_VERSION:
+            return version
+        empty = not conn.execute("SELECT 1 FROM sqlite_master WHERE TYPE = 'table'").fetchone()
+    if version > SCHEMA_VERSION:
+        raise MigrationError(f"{db_path} is at schema version {version}, newer than this app ({SCHEMA_VERSION})")
+
+    if empty:
+        initializer = DatabaseInitializer(db_path=str(db_path), conn=open_connection(db_path), config=configurations,
+                                          table=tables, index=indexes, view=views, trigger=triggers)
+        if not initializer.initialize_database():
+            raise MigrationError(f"Could not create the schema in {db_path}")
+        logger.info(f"Created {db_path} at schema version {SCHEMA_VERSION}")
+        return SCHEMA_VERSION
+
+    for migration in MIGRATIONS[version:]:
+        start = time.perf_counter()
+        try:
+            if migration.batched:
+                migration.apply(db_path)
+            else:
+                with get_pool(db_path).writer() as conn:
+                    conn.execute("BEGIN IMMEDIATE")
+                    try:
+                        migration.apply(conn)
+                        conn.execute(f"PRAGMA user_version = {migration.version}")
+                        conn.commit()
+                    except BaseException:
+                        conn.rollback()
+                        raise
+        except sqlite3.Error as e:
+            raise MigrationError(f"Migration {migration.version} ({migration.description}) failed: {e}") from e
+        logger.info(f"Applied migration {migration.version} to {db_path} ({migration.description}) "
+                    f"in {time.perf_counter() - start:.2f}s")
+    return SCHEMA_VERSION
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Apply pending schema migrations.")
+    parser.add_argument("--db", default=None, help="database file (default: the app database)")
+    parser.add_argument("--status", action="store_true", help="only print the schema version")
+    args = parser.parse_args()
+    db_path = Path(args.db) if args.db else products.DB_PATH
+
+    try:
+        if args.status:
+            version = schema_version(db_path)
+            pending = [m for m in MIGRATIONS if m.version > version]
+            print(f"{db_path}: schema version {version} of {SCHEMA_VERSION}, {len(pending)} pending")
+            for migration in pending:
+                print(f"  {migration.version}: {migration.description}")
+            return
+        print(f"{db_path}: schema version {migrate(db_path)}")
+    except (MigrationError, sqlite3.Error) as e:
+        print(f"Migration failed: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Keyset pagination over the product catalog, for the inventory browser.
+
+``LIMIT ... OFFSET`` reads and throws away every row before the page, so the
+thousandth page of a 200k-SKU catalog costs a thousand pages of work. Here a
+page continues from the sort key of the row it starts after (or ends before):
+SQLite seeks into the index of the sort column and reads ``limit`` entries, at
+any depth. ID (the rowid, and the last column of every index) breaks ties
+between equal names, stock levels or times. A page after ``(NAME, ID)`` is
+written as the rest of that name's run (``NAME = ? AND ID > ?``) merged with
+the names beyond it (``NAME > ?``) rather than ``(NAME, ID) > (?, ?)``, whose
+index search only bounds NAME and so reads through every tied row first: a
+bulk import stamps thousands of rows with the same UPDATED_AT.
+
+Each sort walks its own index: NAME (IDX_PRODUCTS_NAME, or
+IDX_PRODUCTS_CATEGORY_NAME within one category), SKU (its UNIQUE
+constraint), CURRENT_STOCK (IDX_PRODUCTS_STOCK) and UPDATED_AT
+(IDX_PRODUCTS_UPDATED, newest first). The other filters are checked on the
+rows the walk reaches; their columns are written with a unary ``+`` so the
+planner never trades the sort index for a filter index and a temporary sort.
+A rare filter therefore reads further to fill a page, and the last page of
+one reads on to the end of the index.
+
+Every statement is built once at import (``PAGE_SQL``), so the connection's
+statement cache prepares each a single time and
+``benchmarks/check_query_plans.py`` checks their plans.
+"""
+
+from app.data import products
+from app.data.connection import get_reader_pool
+
+# Rows per page.
+PAGE_SIZE = 100
+
+# Sort column and whether it runs newest/highest first, by sort name.
+SORTS = {
+    "name": ("NAME", False),
+    "sku": ("SKU", False),
+    "stock": ("CURRENT_STOCK", False),
+    "updated": ("UPDATED_AT", True),
+}
+
+# Stock statuses a page can be filtered on; they do not overlap.
+STOCK_STATUSES = ("in", "low", "out")
+
+COLUMNS = ("ID", "SKU", "NAME", "CATEGORY_ID", "CURRENT_STOCK", "REORDER_LEVEL", "SELLING_PRICE", "IS_ACTIVE",
+           "UPDATED_AT")
+
+# Filters every page statement checks; a NULL parameter switches one off.
+FILTERS = """(:stock IS NULL
+                 OR :stock = 'out' AND +CURRENT_STOCK = 0
+                 OR :stock = 'low' AND +CURRENT_STOCK > 0 AND +CURRENT_STOCK <= REORDER_LEVEL
+                 OR :stock = 'in' AND +CURRENT_STOCK > REORDER_LEVEL)
+             AND (:active IS NULL OR +IS_ACTIVE = :active)"""
+
+
+def _page_sql(sort: str, backward: bool, keyed: bool, category: bool) -> str:
+    column, descending = SORTS[sort]
+    # Paging backward walks the index the other way; the rows are put back in order after.
+    reverse = descending != backward
+    direction, beyond = ("DESC", "<") if reverse else ("ASC", ">")
+    where = FILTERS
+    if category:
+        # Only the name sort has an index that starts with CATEGORY_ID.
+        where += f" AND {'' if sort == 'name' else '+'}CATEGORY_ID = :category"
+    select = f"SELECT {', '.join(COLUMNS)} FROM PRODUCTS WHERE {where}"
+    order = f"ORDER BY {column} {direction}, ID {direction} LIMIT :limit"
+    if not keyed:
+        return f"{select} {order}"
+    # The rest of the key's run of equal values, then the values beyond it, merged.
+    return (f"{select} AND {column} = :key AND ID {beyond} :id "
+            f"UNION ALL {select} AND {column} {beyond} :key {order}")
+
+
+# Page statements by (sort, backward, has a key to continue from, filtered by category).
+PAGE_SQL = {
+    (sort, backward, keyed, category): _page_sql(sort, backward, keyed, category)
+    for sort in SORTS for backward in (False, True) for keyed in (False, True) for category in (False, True)
+}
+
+
+def row_key(sort: str, row: tuple) -> tuple:
+    """
+    Keyset position of ``row`` in ``sort`` order, to continue a page from.
+    """
+    return row[COLUMNS.index(SORTS[sort][0])], row[0]
+
+
+def browse_products(sort: str = "name", key: tuple = None, backward: bool = False, category_id: int = None,
+                    stock: str = None, active: bool = None, limit: int = PAGE_SIZE, db_path=None) -> list:
+    """
+    One page of products in ``sort`` order.
+
+    Args:
+        sort: A key of ``SORTS``
+        key: ``row_key`` of the row the page continues from; None starts at
+            the first row (or, with ``backward``, the last)
+        backward: Return the rows before ``key`` instead of after it
+        category_id: Only products of this category
+        stock: Only products with this stock status (see ``STOCK_STATUSES``):
+            ``out`` at zero, ``low`` at or below the reorder level, ``in`` above it
+        active: Only active (True) or inactive (False) products
+        limit: Rows per page
+        db_path: Database file, defaults to the app database
+
+    Returns:
+        list: Up to ``limit`` rows of ``COLUMNS``, in ``sort`` order either way
+
+    Raises:
+        ValueError: Unknown sort or stock status
+    """
+    if sort not in SORTS:
+        raise ValueError(f"Unknown sort {sort!r}; expected one of {', '.join(SORTS)}")
+    if stock is not None and stock not in STOCK_STATUSES:
+        raise ValueError(f"Unknown stock status {stock!r}; expected one of {', '.join(STOCK_STATUSES)}")
+
+    sql = PAGE_SQL[(sort, backward, key is not None, category_id is not None)]
+    params = {
+        "stock": stock,
+        "active": None if active is None else int(active),
+        "category": category_id,
+        "key": key[0] if key else None,
+        "id": key[1] if key else None,
+        "limit": limit,
+    }
+    rows = get_reader_pool(db_path or products.DB_PATH).query(sql, params)
+    return rows[::-1] if backward else rows
@@ -0,0 +1,119 @@
+"""
+Ranked product search by name, SKU or description, for typeahead.
+
+Scanning with a barcode finds a product by its exact SKU; loose produce,
+damaged labels and service items have to be found by name instead. A
+``LIKE '%x%'`` over PRODUCTS reads every row of the catalog per keystroke.
+Instead, PRODUCTS_FTS (``database_init``) holds an FTS5 index of NAME, SKU
+and DESCRIPTION, which triggers keep in step with PRODUCTS.
+
+Each word typed must match a word of the product, and the word still being
+typed matches the words it starts: "amul fresh mi" finds "Amul Fresh Milk
+500ml". Matches are ranked with bm25 and a hit in the name counts most.
+Four things keep a search to a few milliseconds on a 200k-SKU catalog:
+
+- FTS5 ranks every match before sorting them, so only the first
+  ``SEARCH_CANDIDATES`` matches are ranked. A query with fewer matches is
+  ranked exactly; a broader one gets the best of those candidates, and the
+  next keystroke narrows it.
+- A prefix reads the matches of every indexed word it starts, in full,
+  where a whole word can skip through its matches. Only the last word is a
+  prefix; the words before it are complete once a space follows them.
+- One letter starts dozens of common words, so single-character words are
+  left out until the next keystroke.
+- Every product has its own SKU, so a prefix of one starts up to 200k words.
+  Long numbers (``CODE_LENGTH`` digits or more) are therefore matched whole
+  in the index, and input that could be the start of a SKU is also looked up
+  in the SKU's UNIQUE index; those products come first.
+"""
+
+import re
+
+from app.data import products
+from app.data.connection import get_reader_pool
+
+# Results returned per search.
+SEARCH_LIMIT = 10
+
+# Matches ranked per search; bounds the cost of short, common prefixes.
+SEARCH_CANDIDATES = 500
+
+# Shorter input returns no results; a single letter matches most of the catalog.
+MIN_QUERY_LENGTH = 2
+
+# Numbers at least this long are matched as whole words (SKUs, codes), not prefixes.
+CODE_LENGTH = 5
+
+# bm25 weights of NAME, SKU and DESCRIPTION.
+RANK_WEIGHTS = "10.0, 5.0, 1.0"
+
+SEARCH_SQL = f"""SELECT P.SKU, P.NAME, P.SELLING_PRICE, P.CURRENT_STOCK, P.IS_ACTIVE
+                 FROM (SELECT ROWID AS ID, bm25(PRODUCTS_FTS, {RANK_WEIGHTS}) AS SCORE
+                       FROM PRODUCTS_FTS
+                       WHERE PRODUCTS_FTS MATCH :query
+                       LIMIT :candidates) M
+                 JOIN PRODUCTS P ON P.ID = M.ID
+                 WHERE :active IS NULL OR +P.IS_ACTIVE = :active
+                 ORDER BY M.SCORE, P.ID
+                 LIMIT :limit"""
+
+# Products whose SKU starts with the typed text, in SKU order.
+SKU_PREFIX_SQL = """SELECT SKU, NAME, SELLING_PRICE, CURRENT_STOCK, IS_ACTIVE
+                    FROM PRODUCTS
+                    WHERE SKU >= :sku AND SKU < :sku || char(1114111)
+                      AND (:active IS NULL OR +IS_ACTIVE = :active)
+                    ORDER BY SKU
+                    LIMIT :limit"""
+
+# Runs of letters and digits: the words FTS5's default tokenizer indexes.
+_WORD = re.compile(r"[^\W_]+")
+
+
+def match_query(text: str) -> str:
+    """
+    FTS5 query for typed ``text``: every word in full, and the one still being
+    typed (the last, unless a space follows it) as a prefix.
+
+    Every word is quoted, so input such as ``AND``, ``*`` or ``"`` is searched
+    for rather than read as query syntax. Single characters are skipped and
+    long numbers must match whole. Returns "" when no word is left.
+    """
+    words = _WORD.findall(text)
+    typing = bool(text) and not text[-1].isspace()
+    terms = []
+    for i, word in enumerate(words):
+        if len(word) < 2:
+            continue
+        prefix = typing and i == len(words) - 1 and not (word.isdigit() and len(word) >= CODE_LENGTH)
+        terms.append(f'"{word}"*' if prefix else f'"{word}"')
+    return " ".join(terms)
+
+
+def search_products(text: str, limit: int = SEARCH_LIMIT, active: bool = None, db_path=None) -> list:
+    """
+    The products best matching ``text``, best first.
+
+    Args:
+        text: What was typed so far
+        limit: Rows to return
+        active: Only active (True) or inactive (False) products
+        db_path: Database file, defaults to the app database
+
+    Returns:
+        list: Up to ``limit`` rows of (SKU, NAME, SELLING_PRICE, CURRENT_STOCK, IS_ACTIVE)
+    """
+    query = match_query(text)
+    text = text.strip()
+    if len(text) < MIN_QUERY_LENGTH:
+        return []
+    active = None if active is None else int(active)
+
+    with get_reader_pool(db_path or products.DB_PATH).snapshot() as conn:
+        rows = []
+        if not any(character.isspace() for character in text):
+            rows = conn.execute(SKU_PREFIX_SQL, {"sku": text, "active": active, "limit": limit}).fetchall()
+        if query and len(rows) < limit:
+            found = {row[0] for row in rows}
+            params = {"query": query, "candidates": max(SEARCH_CANDIDATES, limit), "active": active, "limit": limit}
+            rows += [row for row in conn.execute(SEARCH_SQL, params).fetchall() if row[0] not in found]
+    return rows[:limit]
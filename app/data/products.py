@@ -1,76 +1,77 @@
-import sqlite3
 from pathlib import Path
 
+from app.data import changes
+from app.data.catalog_cache import get_catalog_cache
+from app.data.connection import get_pool
+
 DB_PATH = Path(__file__).resolve().parents[2] / "database" / "posai.db"
 
 def get_db_connection():
-    return sqlite3.connect(str(DB_PATH))
+    # Borrow a pooled, pre-configured connection; use it as a context manager.
+    return get_pool(DB_PATH).connection()
+
+def get_db_writer():
+    # Pooled connection for writes; writers in this process take turns.
+    return get_pool(DB_PATH).writer()
 
 def get_categories():
     try:
-        conn = get_db_connection()
-        cur = conn.cursor()
-        cur.execute("SELECT ID, NAME FROM CATEGORIES ORDER BY NAME")
-        rows = cur.fetchall()
-        conn.close()
-        return rows
+        with get_db_connection() as conn:
+            return conn.execute("SELECT ID, NAME FROM CATEGORIES ORDER BY NAME").fetchall()
     except:
         return []
 
 def get_recent_products():
     try:
-        conn = get_db_connection()
-        cur = conn.cursor()
-        cur.execute("""SELECT SKU, NAME, CURRENT_STOCK, SELLING_PRICE 
-                        FROM PRODUCTS ORDER BY UPDATED_AT DESC LIMIT 3""")
-        rows = cur.fetchall()
-        conn.close()
-        return rows
+        with get_db_connection() as conn:
+            return conn.execute("""SELECT SKU, NAME, CURRENT_STOCK, SELLING_PRICE 
+                                    FROM PRODUCTS ORDER BY UPDATED_AT DESC LIMIT 3""").fetchall()
     except:
         return []
 
+def warm_catalog_cache(limit=5000):
+    try:
+        return get_catalog_cache(DB_PATH).warm(limit)
+    except:
+        return 0
+
 def find_product_by_sku(sku):
-    conn = get_db_connection()
-    cur = conn.cursor()
-    cur.execute("""SELECT NAME, CATEGORY_ID, COST_PRICE, SELLING_PRICE, CURRENT_STOCK, REORDER_LEVEL 
-                    FROM PRODUCTS WHERE SKU = ?""", (sku,))
-    res = cur.fetchone()
-    conn.close()
-    return res
+    # (NAME, CATEGORY_ID, COST_PRICE, SELLING_PRICE, CURRENT_STOCK, REORDER_LEVEL)
+    row = get_catalog_cache(DB_PATH).get(sku)
+    return row[2:] if row else None
 
 def upsert_product(sku, name, category_id, cost, sell, stock, reorder):
-    conn = get_db_connection()
-    cur = conn.cursor()
-    cur.execute("SELECT ID FROM PRODUCTS WHERE SKU = ?", (sku,))
-    exists = cur.fetchone()
-
     params = (name, category_id, cost, sell, stock, reorder, sku)
 
-    if exists:
-        cur.execute("""UPDATE PRODUCTS SET NAME=?, CATEGORY_ID=?, COST_PRICE=?, 
-                        SELLING_PRICE=?, CURRENT_STOCK=?, REORDER_LEVEL=?, UPDATED_AT=CURRENT_TIMESTAMP 
-                        WHERE SKU=?""", params)
-    else:
-        cur.execute("""INSERT INTO PRODUCTS (NAME, CATEGORY_ID, COST_PRICE, SELLING_PRICE, 
-                        CURRENT_STOCK, REORDER_LEVEL, SKU) VALUES (?,?,?,?,?,?,?)""", params)
-    
-    conn.commit()
-    conn.close()
+    with get_db_writer() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT ID FROM PRODUCTS WHERE SKU = ?", (sku,))
+        exists = cur.fetchone()
+
+        if exists:
+            cur.execute("""UPDATE PRODUCTS SET NAME=?, CATEGORY_ID=?, COST_PRICE=?, 
+                            SELLING_PRICE=?, CURRENT_STOCK=?, REORDER_LEVEL=?, UPDATED_AT=CURRENT_TIMESTAMP 
+                            WHERE SKU=?""", params)
+        else:
+            cur.execute("""INSERT INTO PRODUCTS (NAME, CATEGORY_ID, COST_PRICE, SELLING_PRICE, 
+                            CURRENT_STOCK, REORDER_LEVEL, SKU) VALUES (?,?,?,?,?,?,?)""", params)
+        
+        conn.commit()
+    get_catalog_cache(DB_PATH).invalidate(sku)
+    # Stock changes are logged to INVENTORY_LOG by trigger.
+    changes.notify("PRODUCTS", "INVENTORY_LOG")
     return True
 
 
 def get_product_by_sku(sku):
-    conn = get_db_connection()
-    cur = conn.cursor()
-    cur.execute("SELECT NAME, SELLING_PRICE AS PRICE FROM PRODUCTS WHERE SKU = ?", (sku,))
-    res = cur.fetchone()
-    conn.close()
-    return res if res else None
+    # (NAME, PRICE)
+    row = get_catalog_cache(DB_PATH).get(sku)
+    return (row[2], row[5]) if row else None
 
 
 def add_product_from_sale(sku: str, name: str, price: float) -> None:
-    conn = get_db_connection()
-    cur = conn.cursor()
-    cur.execute("INSERT INTO PRODUCTS (SKU, NAME, SELLING_PRICE) VALUES (?, ?, ?)", (sku, name, price))
-    conn.commit()
-    conn.close()
+    with get_db_writer() as conn:
+        conn.execute("INSERT INTO PRODUCTS (SKU, NAME, SELLING_PRICE) VALUES (?, ?, ?)", (sku, name, price))
+        conn.commit()
+    get_catalog_cache(DB_PATH).invalidate(sku)
+    changes.notify("PRODUCTS")
@@ -0,0 +1,222 @@
+"""
+Sales rollups: totals per period and per product.
+
+SALES_HOURLY, SALES_DAILY and SALES_MONTHLY hold the totals of completed
+sales per UTC period, and PRODUCT_SALES the all-time quantity, revenue, cost
+and profit of each product (at the unit cost captured on each sale). The
+ROLLUP_* triggers in ``database_init`` keep them current as transactions are
+inserted, completed, voided, returned, edited or deleted, so the checkout
+path needs no extra code and reports over years of history read one row per
+period or product instead of grouping TRANSACTIONS and TRANSACTION_ITEMS.
+
+Schema migration 3 adds them to databases created before they existed,
+costing the existing items in batches first; ``rebuild_rollups`` recomputes
+them from the sales at any time:
+
+    python -m app.data.rollups [--db database/posai.db]
+"""
+
+import argparse
+import logging
+import sqlite3
+import sys
+import time
+from datetime import datetime, timedelta
+
+from app.data import changes, products
+from app.data.connection import get_pool
+from app.data.database_init import indexes, rollup_periods, tables, triggers, views
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_TABLES = tuple(rollup_periods) + ("PRODUCT_SALES",)
+
+# Views that read a rollup, and the table their current definition mentions.
+ROLLUP_VIEWS = {"DAILY_SALES_SUMMARY": "SALES_DAILY", "PRODUCT_PERFORMANCE": "PRODUCT_SALES"}
+
+BACKFILL = """INSERT INTO {table} (
+                  PERIOD, TRANSACTION_COUNT, TOTAL_SUBTOTAL, TOTAL_TAX, TOTAL_DISCOUNTS, TOTAL_REVENUE
+              )
+              SELECT {period}, COUNT(*), ROUND(SUM(SUBTOTAL), 2), ROUND(SUM(TAX_AMOUNT), 2),
+                     ROUND(SUM(DISCOUNT_AMOUNT), 2), ROUND(SUM(TOTAL_AMOUNT), 2)
+              FROM TRANSACTIONS T
+              WHERE STATUS = 'COMPLETED'
+              GROUP BY 1"""
+
+# Sales made before UNIT_COST was recorded are costed at today's COST_PRICE,
+# a range of item IDs at a time.
+BACKFILL_UNIT_COST = """UPDATE TRANSACTION_ITEMS
+                        SET UNIT_COST = (SELECT COST_PRICE FROM PRODUCTS WHERE ID = TRANSACTION_ITEMS.PRODUCT_ID)
+                        WHERE ID > ? AND ID <= ? AND UNIT_COST IS NULL"""
+
+BACKFILL_PRODUCTS = """INSERT INTO PRODUCT_SALES (
+                           PRODUCT_ID, TOTAL_QUANTITY_SOLD, TOTAL_REVENUE, TOTAL_COST, TOTAL_PROFIT, LAST_SOLD_AT
+                       )
+                       SELECT I.PRODUCT_ID, SUM(I.QUANTITY), ROUND(SUM(I.LINE_TOTAL), 2),
+                              ROUND(SUM(I.QUANTITY * COALESCE(I.UNIT_COST, 0)), 2),
+                              ROUND(SUM(I.LINE_TOTAL - I.QUANTITY * COALESCE(I.UNIT_COST, 0)), 2),
+                              MAX(T.CREATED_AT)
+                       FROM TRANSACTION_ITEMS I
+                       JOIN TRANSACTIONS T ON T.ID = I.TRANSACTION_ID
+                       WHERE T.STATUS = 'COMPLETED'
+                       GROUP BY I.PRODUCT_ID"""
+
+# Totals of the whole hours inside a range, from the hourly rollup.
+HOURLY_TOTALS = """SELECT COALESCE(SUM(TRANSACTION_COUNT), 0), COALESCE(SUM(TOTAL_SUBTOTAL), 0),
+                          COALESCE(SUM(TOTAL_TAX), 0), COALESCE(SUM(TOTAL_DISCOUNTS), 0),
+                          COALESCE(SUM(TOTAL_REVENUE), 0)
+                   FROM SALES_HOURLY
+                   WHERE PERIOD >= ? AND PERIOD < ?"""
+
+# Totals of a part of an hour, from TRANSACTIONS through IDX_TRANSACTIONS_DATE. The
+# unary + keeps the planner off IDX_TRANSACTIONS_STATUS, which matches nearly every row.
+RAW_TOTALS = """SELECT COUNT(*), COALESCE(SUM(SUBTOTAL), 0), COALESCE(SUM(TAX_AMOUNT), 0),
+                       COALESCE(SUM(DISCOUNT_AMOUNT), 0), COALESCE(SUM(TOTAL_AMOUNT), 0)
+                FROM TRANSACTIONS
+                WHERE +STATUS = 'COMPLETED' AND CREATED_AT >= ? AND CREATED_AT < ?"""
+
+_TIMESTAMP = "%Y-%m-%d %H:%M:%S"
+
+
+def add_unit_cost(conn: sqlite3.Connection) -> None:
+    """
+    Add TRANSACTION_ITEMS.UNIT_COST if it is missing.
+    """
+    item_columns = {row[1] for row in conn.execute("PRAGMA table_xinfo(TRANSACTION_ITEMS)")}
+    if "UNIT_COST" not in item_columns:
+        conn.execute("ALTER TABLE TRANSACTION_ITEMS ADD COLUMN UNIT_COST DECIMAL(10,2)")
+
+
+def backfill_unit_costs(conn: sqlite3.Connection, after: int = 0, upto: int = None) -> int:
+    """
+    Cost the items with ``after`` < ID <= ``upto`` (default: the last item) that have no UNIT_COST.
+
+    Returns:
+        int: Items costed
+    """
+    if upto is None:
+        upto = conn.execute("SELECT COALESCE(MAX(ID), 0) FROM TRANSACTION_ITEMS").fetchone()[0]
+    return conn.execute(BACKFILL_UNIT_COST, (after, upto)).rowcount
+
+
+def ensure_rollups(conn: sqlite3.Connection) -> None:
+    """
+    Create missing rollup tables, indexes and triggers, and point the reporting views at the rollups.
+    """
+    add_unit_cost(conn)
+    for table in ROLLUP_TABLES:
+        conn.execute(tables[table])
+    for name, statement in indexes.items():
+        if name.startswith("IDX_PRODUCT_SALES_"):
+            conn.execute(statement)
+    for name, statement in triggers.items():
+        if name.startswith("ROLLUP_"):
+            conn.execute(statement)
+    for view, table in ROLLUP_VIEWS.items():
+        current = conn.execute("SELECT SQL FROM sqlite_master WHERE TYPE = 'view' AND NAME = ?", (view,)).fetchone()
+        if current is None or table not in current[0]:
+            conn.execute(f"DROP VIEW IF EXISTS {view}")
+            conn.execute(views[view])
+
+
+def backfill_rollups(conn: sqlite3.Connection, costed_upto: int = 0) -> dict:
+    """
+    Create missing rollup objects and recompute every rollup inside the caller's write transaction.
+
+    Items recorded before unit costs were captured get the product's current
+    COST_PRICE first, before the ROLLUP_* triggers exist on a new rollup
+    database; items up to ID ``costed_upto`` are taken as costed already.
+
+    Returns:
+        dict: Rows written per rollup table
+    """
+    add_unit_cost(conn)
+    backfill_unit_costs(conn, after=costed_upto)
+    ensure_rollups(conn)
+    counts = {}
+    for table in ROLLUP_TABLES:
+        conn.execute(f"DELETE FROM {table}")
+        if table in rollup_periods:
+            conn.execute(BACKFILL.format(table=table, period=rollup_periods[table].format(row="T")))
+        else:
+            conn.execute(BACKFILL_PRODUCTS)
+        counts[table] = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+    return counts
+
+
+def rebuild_rollups(db_path=None) -> dict:
+    """
+    Recompute every rollup from the sales in one write transaction.
+
+    Sales committed meanwhile wait for the write lock, so the rollups match
+    the sales exactly when it is released.
+
+    Args:
+        db_path: Database file, defaults to the app database
+
+    Returns:
+        dict: Rows written per rollup table, and ``seconds`` taken
+    """
+    db_path = db_path or products.DB_PATH
+    start = time.perf_counter()
+    with get_pool(db_path).writer() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            counts = backfill_rollups(conn)
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+
+    changes.notify("TRANSACTION_ITEMS", *ROLLUP_TABLES)
+    counts["seconds"] = time.perf_counter() - start
+    logger.info(f"Rebuilt sales rollups of {db_path} in {counts['seconds']:.2f}s: "
+                f"{', '.join(f'{table} {counts[table]}' for table in ROLLUP_TABLES)} rows")
+    return counts
+
+
+def sales_totals(conn: sqlite3.Connection, start: str, end: str) -> tuple:
+    """
+    Totals of completed sales with CREATED_AT in [``start``, ``end``) (UTC text).
+
+    Whole hours come from SALES_HOURLY; only the partial hours at either end
+    (e.g. local midnight at half past in UTC+05:30) are read from
+    TRANSACTIONS, so the cost does not grow with the length of the range.
+
+    Returns:
+        tuple: (count, subtotal, tax, discounts, revenue)
+    """
+    first = datetime.strptime(start, _TIMESTAMP)
+    last = datetime.strptime(end, _TIMESTAMP)
+    hours_from = first.replace(minute=0, second=0)
+    if hours_from < first:
+        hours_from += timedelta(hours=1)
+    hours_to = max(last.replace(minute=0, second=0), hours_from)
+
+    if hours_from >= last:
+        return conn.execute(RAW_TOTALS, (start, end)).fetchone()
+    parts = [
+        conn.execute(HOURLY_TOTALS, (hours_from.strftime(_TIMESTAMP), hours_to.strftime(_TIMESTAMP))).fetchone(),
+        conn.execute(RAW_TOTALS, (start, hours_from.strftime(_TIMESTAMP))).fetchone(),
+        conn.execute(RAW_TOTALS, (hours_to.strftime(_TIMESTAMP), end)).fetchone(),
+    ]
+    return (sum(part[0] for part in parts),) + tuple(round(sum(part[i] for part in parts), 2) for i in range(1, 5))
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Rebuild the sales rollups (per period and per product).")
+    parser.add_argument("--db", default=None, help="database file (default: the app database)")
+    args = parser.parse_args()
+
+    try:
+        counts = rebuild_rollups(args.db)
+    except sqlite3.Error as e:
+        print(f"Rollup rebuild failed: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    print(f"Rollups rebuilt in {counts.pop('seconds'):.2f}s: {counts}")
+
+
+if __name__ == "__main__":
+    main()
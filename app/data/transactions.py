@@ -0,0 +1,219 @@
+"""
+Checkout commit engine.
+
+A sale is written as one ``BEGIN IMMEDIATE`` transaction: the TRANSACTIONS
+header, every TRANSACTION_ITEMS line and every stock decrement (audited in
+INVENTORY_LOG as a SALE movement). Line items and stock updates are applied
+with set-based ``executemany`` statements rather than one round trip per
+line, and the sale's INVENTORY_LOG rows and PRODUCT_SALES totals are written
+by one statement each in place of the per-row triggers, so even a 200-line
+wholesale basket commits in a few milliseconds.
+"""
+
+import logging
+import random
+import secrets
+import sqlite3
+import time
+from dataclasses import dataclass
+from datetime import datetime
+
+from app.data import changes, products
+from app.data.catalog_cache import get_catalog_cache
+from app.data.connection import BUSY_TIMEOUT, bypass_triggers, get_pool
+from app.data.database_init import product_sales_upsert
+from app.data.rollups import ROLLUP_TABLES
+
+logger = logging.getLogger(__name__)
+
+# Bounded backoff while another writer (a second lane, a bulk import) holds the
+# write lock: first retry after BUSY_BACKOFF_MIN, doubling up to BUSY_BACKOFF_MAX,
+# giving up after BUSY_DEADLINE seconds.
+BUSY_BACKOFF_MIN = 0.001
+BUSY_BACKOFF_MAX = 0.025
+BUSY_DEADLINE = 3.0
+
+# PAYMENT_METHOD values allowed by the TRANSACTIONS check constraint; anything
+# else (e.g. UPI) is stored as OTHER with the original method in NOTES.
+PAYMENT_METHODS = {"CASH", "CARD", "CHECK", "OTHER"}
+
+INSERT_HEADER = """INSERT INTO TRANSACTIONS (
+                       TRANSACTION_NUMBER, SUBTOTAL, TAX_AMOUNT, DISCOUNT_AMOUNT, TOTAL_AMOUNT,
+                       PAYMENT_METHOD, STATUS, CASHIER_ID, NOTES, COMPLETED_AT
+                   ) VALUES (?, ?, ?, ?, ?, ?, 'COMPLETED', ?, ?, CURRENT_TIMESTAMP)"""
+
+# PRODUCT_ID and the unit cost at the time of sale are resolved from the SKU
+# inside the insert itself.
+INSERT_ITEM = """INSERT INTO TRANSACTION_ITEMS (
+                     TRANSACTION_ID, PRODUCT_ID, SKU, PRODUCT_NAME, QUANTITY, UNIT_PRICE, DISCOUNT_AMOUNT, UNIT_COST
+                 ) SELECT ?, ID, SKU, ?, ?, ?, ?, COST_PRICE FROM PRODUCTS WHERE SKU = ?"""
+
+# Stock never goes below zero (CHECK constraint); a sale is not refused
+# because the shelf count was wrong. UPDATED_AT is stamped here so the
+# timestamp trigger does not write the row a second time.
+DECREMENT_STOCK = """UPDATE PRODUCTS SET CURRENT_STOCK = MAX(CURRENT_STOCK - ?, 0), UPDATED_AT = CURRENT_TIMESTAMP
+                     WHERE SKU = ?"""
+
+# One SALE movement per product of the transaction, written before the stock
+# is decremented (LOG_INVENTORY_CHANGES is bypassed). Products already at zero
+# do not change, so like the trigger they get no row.
+LOG_SALE_MOVEMENTS = """INSERT INTO INVENTORY_LOG (
+                            PRODUCT_ID, SKU, MOVEMENT_TYPE, QUANTITY_CHANGE, PREVIOUS_STOCK, NEW_STOCK,
+                            REASON, REFERENCE_TYPE, REFERENCE_ID, USER_ID
+                        )
+                        SELECT P.ID, P.SKU, 'SALE', -MIN(I.QUANTITY, P.CURRENT_STOCK), P.CURRENT_STOCK,
+                               MAX(P.CURRENT_STOCK - I.QUANTITY, 0), 'SALE', 'TRANSACTION', :transaction_id, :user_id
+                        FROM (SELECT PRODUCT_ID, SUM(QUANTITY) AS QUANTITY
+                              FROM TRANSACTION_ITEMS
+                              WHERE TRANSACTION_ID = :transaction_id
+                              GROUP BY PRODUCT_ID) I
+                        JOIN PRODUCTS P ON P.ID = I.PRODUCT_ID
+                        WHERE P.CURRENT_STOCK > 0"""
+
+# The sale's items added to PRODUCT_SALES at once (ROLLUP_ITEM_INSERT is bypassed).
+ADD_PRODUCT_SALES = product_sales_upsert(
+    "FROM TRANSACTION_ITEMS I WHERE I.TRANSACTION_ID = :transaction_id", "+",
+    "(SELECT CREATED_AT FROM TRANSACTIONS WHERE ID = :transaction_id)"
+)
+
+
+class CheckoutError(Exception):
+    """
+    Raised when a sale cannot be committed; nothing was written.
+    """
+
+
+@dataclass(frozen=True)
+class SaleLine:
+    """
+    One line of a sale as written to TRANSACTION_ITEMS. Amounts are in rupees.
+    """
+    sku: str
+    name: str
+    quantity: int
+    unit_price: float
+    discount: float = 0.0
+
+
+def new_transaction_number() -> str:
+    """
+    Human-readable, unique-enough transaction number, e.g. ``TXN-20260101-093015-1A2B3C``.
+    """
+    return f"TXN-{datetime.now():%Y%m%d-%H%M%S}-{secrets.token_hex(3).upper()}"
+
+
+def _begin_immediate(conn: sqlite3.Connection, deadline: float = BUSY_DEADLINE) -> int:
+    """
+    Take the write lock, retrying SQLITE_BUSY with bounded, jittered backoff.
+
+    Returns:
+        int: Number of retries it took
+    """
+    # Poll in Python rather than through SQLite's busy handler, whose sleeps grow
+    # to 100 ms and can keep missing the short gaps a bulk import leaves open.
+    conn.execute("PRAGMA busy_timeout = 0")
+    try:
+        retries = 0
+        delay = BUSY_BACKOFF_MIN
+        give_up = time.monotonic() + deadline
+        while True:
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                return retries
+            except sqlite3.OperationalError as e:
+                if "locked" not in str(e) and "busy" not in str(e):
+                    raise
+                if time.monotonic() + delay > give_up:
+                    raise CheckoutError(f"Database busy for {deadline:.1f}s, sale not recorded") from e
+                time.sleep(delay * random.uniform(0.5, 1.0))
+                delay = min(delay * 2, BUSY_BACKOFF_MAX)
+                retries += 1
+    finally:
+        conn.execute(f"PRAGMA busy_timeout = {int(BUSY_TIMEOUT * 1000)}")
+
+
+def commit_sale(lines, payment_method: str = "CASH", cashier_id: str = None, tax_amount: float = 0.0,
+                notes: str = None, db_path=None) -> str:
+    """
+    Record a completed sale atomically and return its transaction number.
+
+    Args:
+        lines: Iterable of ``SaleLine``; lines with the same SKU and unit price are merged,
+            the same SKU at different prices stays on separate lines
+        payment_method: CASH, CARD, CHECK, OTHER, or any other label (stored as OTHER)
+        cashier_id: Optional cashier identifier
+        tax_amount: Tax added on top of the line totals
+        notes: Optional free-text note
+        db_path: Database file, defaults to the app database
+
+    Returns:
+        str: The TRANSACTION_NUMBER of the committed sale
+
+    Raises:
+        CheckoutError: Empty basket, unknown SKU, or the database stayed busy
+    """
+    merged = {}
+    for line in lines:
+        if line.quantity <= 0:
+            raise CheckoutError(f"Invalid quantity {line.quantity} for {line.sku}")
+        key = (line.sku, line.unit_price)
+        previous = merged.get(key)
+        merged[key] = line if previous is None else SaleLine(
+            line.sku, previous.name, previous.quantity + line.quantity,
+            line.unit_price, previous.discount + line.discount
+        )
+    if not merged:
+        raise CheckoutError("Cannot check out an empty cart")
+    quantities = {}
+    for line in merged.values():
+        quantities[line.sku] = quantities.get(line.sku, 0) + line.quantity
+
+    method = payment_method.upper()
+    if method not in PAYMENT_METHODS:
+        notes = f"{method}: {notes}" if notes else method
+        method = "OTHER"
+
+    subtotal = round(sum(line.quantity * line.unit_price for line in merged.values()), 2)
+    discount = round(sum(line.discount for line in merged.values()), 2)
+    total = round(subtotal - discount + tax_amount, 2)
+    items = [(line.name, line.quantity, line.unit_price, line.discount, line.sku) for line in merged.values()]
+    decrements = [(quantity, sku) for sku, quantity in quantities.items()]
+
+    db_path = db_path or products.DB_PATH
+    with get_pool(db_path).writer() as conn:
+        for attempt in range(3):
+            number = new_transaction_number()
+            _begin_immediate(conn)
+            try:
+                with bypass_triggers(conn, "INVENTORY_LOG", "PRODUCT_SALES"):
+                    cur = conn.execute(INSERT_HEADER, (number, subtotal, tax_amount, discount, total, method,
+                                                       cashier_id, notes))
+                    transaction_id = cur.lastrowid
+
+                    cur = conn.executemany(INSERT_ITEM, [(transaction_id,) + item for item in items])
+                    if cur.rowcount != len(items):
+                        known = {sku for (sku,) in conn.execute(
+                            f"SELECT SKU FROM PRODUCTS WHERE SKU IN ({', '.join('?' * len(quantities))})", list(quantities)
+                        )}
+                        raise CheckoutError(f"Unknown SKU(s): {', '.join(sorted(set(quantities) - known))}")
+
+                    sale = {"transaction_id": transaction_id, "user_id": cashier_id}
+                    conn.execute(LOG_SALE_MOVEMENTS, sale)
+                    conn.executemany(DECREMENT_STOCK, decrements)
+                    conn.execute(ADD_PRODUCT_SALES, sale)
+                conn.commit()
+                break
+            except sqlite3.IntegrityError as e:
+                conn.rollback()
+                # A clashing TRANSACTION_NUMBER is retried with a fresh one.
+                if "TRANSACTION_NUMBER" not in str(e) or attempt == 2:
+                    raise CheckoutError(f"Sale rejected by the database: {e}") from e
+            except BaseException:
+                conn.rollback()
+                raise
+
+    get_catalog_cache(db_path).invalidate(*quantities)
+    # The sales rollups were updated in the same transaction.
+    changes.notify("TRANSACTIONS", "TRANSACTION_ITEMS", "PRODUCTS", "INVENTORY_LOG", *ROLLUP_TABLES)
+    logger.info(f"Committed sale {number}: {len(items)} line(s), total {total}")
+    return number
@@ -0,0 +1,170 @@
+"""
+Scanner-aware barcode input pipeline.
+
+A USB/Bluetooth barcode scanner is a keyboard that types a whole code within
+a few milliseconds and usually finishes with Enter. Looking the SKU up on
+every ``on_change`` costs one query and one UI round trip per character, so
+this pipeline classifies keystrokes instead:
+
+* a complete scan (Enter, or a burst of fast keystrokes that stops) is handed
+  to ``on_scan`` exactly once;
+* manual typing is debounced and handed to ``on_preview`` once the cashier
+  pauses.
+
+The pipeline knows nothing about Flet; the sale view supplies the callbacks.
+Callbacks may run on a timer thread, so they must guard any state they share
+with the page's event handlers.
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+# Keystrokes closer together than this are taken to come from a scanner.
+SCANNER_KEY_GAP = 0.035
+
+# A burst needs at least this many characters to count as a scan (EAN-8 and up).
+MIN_SCAN_LENGTH = 8
+
+# A scanner burst without a terminating Enter is complete after this much silence.
+SCAN_IDLE = 0.08
+
+# Manual typing is looked up once the cashier pauses this long.
+DEBOUNCE_SECONDS = 0.25
+
+# Scan-to-cart latencies kept for stats().
+LATENCY_SAMPLES = 1000
+
+
+class BarcodePipeline:
+    """
+    Turn raw barcode field changes into one preview per pause or one scan per code.
+    """
+
+    def __init__(self, on_scan, on_preview, debounce: float = DEBOUNCE_SECONDS,
+                 key_gap: float = SCANNER_KEY_GAP, min_scan_length: int = MIN_SCAN_LENGTH,
+                 scan_idle: float = SCAN_IDLE) -> None:
+        """
+        Initialize the pipeline.
+
+        Args:
+            on_scan: Called as ``on_scan(sku)`` for a complete scan or Enter
+            on_preview: Called as ``on_preview(sku)`` after manual typing pauses; "" when cleared
+            debounce: Seconds of silence before a manual preview
+            key_gap: Maximum seconds between scanner keystrokes
+            min_scan_length: Minimum length of a burst treated as a scan
+            scan_idle: Seconds of silence that end a burst without Enter
+        """
+        self.on_scan = on_scan
+        self.on_preview = on_preview
+        self.debounce = debounce
+        self.key_gap = key_gap
+        self.min_scan_length = min_scan_length
+        self.scan_idle = scan_idle
+        self.scans = 0
+        self.previews = 0
+        self.keystrokes = 0
+        self.latencies = deque(maxlen=LATENCY_SAMPLES)
+        self._lock = threading.Lock()
+        self._timer = None
+        self._last_key_at = 0.0
+        self._started_at = None
+        self._manual = False
+
+    def key(self, value: str) -> None:
+        """
+        Feed the field's current text; wire to the TextField's ``on_change``.
+        """
+        now = time.monotonic()
+        value = value.strip()
+        with self._lock:
+            self.keystrokes += 1
+            self._cancel_timer()
+            if not value:
+                self._reset()
+                self._schedule(0, self._preview, "")
+                return
+
+            if self._started_at is None:
+                # The first character (or a whole pasted code) cannot be judged by timing.
+                self._started_at = now
+            elif now - self._last_key_at > self.key_gap:
+                self._manual = True
+            self._last_key_at = now
+
+            if not self._manual and len(value) >= self.min_scan_length:
+                self._schedule(self.scan_idle, self._scan, value)
+            else:
+                self._schedule(self.debounce, self._preview, value)
+
+    def submit(self, value: str) -> None:
+        """
+        Complete the current code; wire to the TextField's ``on_submit`` (Enter).
+        """
+        value = value.strip()
+        with self._lock:
+            self._cancel_timer()
+        if value:
+            self._scan(value)
+
+    def cancel(self) -> None:
+        """
+        Drop any pending lookup, e.g. when the view goes away.
+        """
+        with self._lock:
+            self._cancel_timer()
+            self._reset()
+
+    def _scan(self, value: str) -> None:
+        with self._lock:
+            # Measured from the last keystroke: the scanner's own typing time is not ours.
+            last_key_at = self._last_key_at or time.monotonic()
+            scanned = not self._manual
+            self._timer = None
+            self._reset()
+        self.scans += 1
+        self.on_scan(value)
+        # Typed codes finished with Enter would only measure the cashier's typing.
+        if scanned:
+            latency = time.monotonic() - last_key_at
+            self.latencies.append(latency)
+            logger.debug(f"Scan {value} reached the cart in {latency * 1e3:.1f} ms")
+
+    def _preview(self, value: str) -> None:
+        with self._lock:
+            self._timer = None
+        self.previews += 1
+        self.on_preview(value)
+
+    def _schedule(self, delay: float, callback, value: str) -> None:
+        self._timer = threading.Timer(delay, callback, args=(value,))
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _cancel_timer(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def _reset(self) -> None:
+        self._started_at = None
+        self._manual = False
+        self._last_key_at = 0.0
+
+    def stats(self) -> dict:
+        """
+        Counters and scan-to-cart latency percentiles (seconds), for logging and benchmarks.
+        """
+        ordered = sorted(self.latencies)
+        pick = lambda pct: ordered[min(len(ordered) - 1, int(pct / 100 * len(ordered)))] if ordered else 0.0
+        return {
+            "keystrokes": self.keystrokes,
+            "scans": self.scans,
+            "previews": self.previews,
+            "latency_samples": len(ordered),
+            "latency_p50": pick(50),
+            "latency_p99": pick(99),
+        }
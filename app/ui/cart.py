@@ -0,0 +1,120 @@
+"""
+Cart model for the sale and checkout screens.
+
+Lines are indexed by SKU and money is held in integer paise, so merging a
+scan into an existing line and keeping the grand total current are O(1) and
+never round-trip through the text shown in the DataTable.
+"""
+
+from dataclasses import dataclass
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+
+from app.data.transactions import SaleLine
+
+
+def to_paise(amount) -> int:
+    """
+    Convert a rupee amount (str, int, float or Decimal) to integer paise.
+
+    Raises:
+        ValueError: If ``amount`` is not a number
+    """
+    try:
+        rupees = Decimal(str(amount).replace("₹", "").strip() or "0")
+    except InvalidOperation as e:
+        raise ValueError(f"Not an amount: {amount!r}") from e
+    return int((rupees * 100).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+def format_paise(paise: int) -> str:
+    """
+    Format paise for display, e.g. ``12550`` -> ``"₹ 125.50"``.
+    """
+    sign = "-" if paise < 0 else ""
+    rupees, paise = divmod(abs(paise), 100)
+    return f"₹ {sign}{rupees}.{paise:02d}"
+
+
+@dataclass
+class CartLine:
+    """
+    One SKU in the cart. ``unit_price`` and ``total`` are in paise.
+    """
+    sku: str
+    name: str
+    quantity: int
+    unit_price: int
+
+    @property
+    def total(self) -> int:
+        return self.quantity * self.unit_price
+
+
+class Cart:
+    """
+    Lines keyed by SKU in scan order, with an incrementally maintained total.
+    """
+
+    def __init__(self) -> None:
+        self._lines = {}
+        self.total = 0
+
+    def add(self, sku: str, name: str, quantity: int, unit_price: int) -> tuple:
+        """
+        Add ``quantity`` of a SKU, merging into its existing line.
+
+        A re-scan at a different price reprices the whole line, as the last
+        price keyed in by the cashier is the one charged.
+
+        Args:
+            sku: Product SKU
+            name: Product name, used when the line is new
+            quantity: Units to add, must be positive
+            unit_price: Price per unit in paise
+
+        Returns:
+            tuple: (CartLine, True if a new line was created)
+        """
+        if quantity <= 0:
+            raise ValueError(f"Quantity must be positive, got {quantity}")
+        line = self._lines.get(sku)
+        if line is None:
+            line = self._lines[sku] = CartLine(sku, name, quantity, unit_price)
+            self.total += line.total
+            return line, True
+
+        self.total -= line.total
+        line.quantity += quantity
+        line.unit_price = unit_price
+        self.total += line.total
+        return line, False
+
+    def remove(self, sku: str) -> None:
+        line = self._lines.pop(sku, None)
+        if line is not None:
+            self.total -= line.total
+
+    def clear(self) -> None:
+        self._lines.clear()
+        self.total = 0
+
+    def get(self, sku: str):
+        return self._lines.get(sku)
+
+    def __contains__(self, sku: str) -> bool:
+        return sku in self._lines
+
+    def __iter__(self):
+        return iter(self._lines.values())
+
+    def __len__(self) -> int:
+        return len(self._lines)
+
+    def to_sale_lines(self) -> list:
+        """
+        The cart as ``SaleLine`` objects (rupee amounts) for ``commit_sale``.
+        """
+        return [
+            SaleLine(line.sku, line.name, line.quantity, line.unit_price / 100)
+            for line in self._lines.values()
+        ]
@@ -1,20 +1,122 @@
+import threading
 import flet as ft
-from app.ai.ai_assistant import ask_pos_ai
+from app.ai.ai_assistant import CANCELLED, submit_question
+from app.ai.sql_sandbox import PAGE_SIZE
+from app.ui.render import get_scheduler
+from app.ui.session import session_key
 
-def ask_pos_ai_formatted(page: ft.Page, user_input: ft.TextField, query_result: ft.Column) -> None:
-    query_result.controls.clear()
-    page.update()
-    
+# Cancel events of the questions in flight, per session.
+_runs = {}
+_runs_lock = threading.Lock()
+
+
+def cancel_chat(page: ft.Page) -> None:
+    """
+    Cancel the question ``page`` is waiting on, if any (e.g. when its session closes).
+    """
+    with _runs_lock:
+        cancel = _runs.pop(session_key(page), None)
+    if cancel is not None:
+        cancel.set()
+
+
+def result_table(page: ft.Page, result) -> ft.Column:
+    """
+    A query result shown one page of rows at a time.
+    """
+    current = {"page": 0}
+    table = ft.DataTable(
+        columns=[ft.DataColumn(ft.Text(column)) for column in result.columns],
+        rows=[],
+        border=ft.border.all(1, "BLACK"),
+    )
+    position = ft.Text(size=12)
+    previous_button = ft.TextButton(content=ft.Text("< Prev"))
+    next_button = ft.TextButton(content=ft.Text("Next >"))
+
+    def show(number: int) -> None:
+        current["page"] = max(0, min(result.pages() - 1, number))
+        table.rows = [
+            ft.DataRow(cells=[ft.DataCell(ft.Text("" if value is None else str(value))) for value in row])
+            for row in result.page(current["page"])
+        ]
+        more = "+" if result.truncated else ""
+        position.value = f"Page {current['page'] + 1} of {result.pages()} ({len(result.rows)}{more} rows)"
+        previous_button.disabled = current["page"] == 0
+        next_button.disabled = current["page"] >= result.pages() - 1
+
+    def turn(step: int) -> None:
+        show(current["page"] + step)
+        get_scheduler(page).request(container)
+
+    previous_button.on_click = lambda e: turn(-1)
+    next_button.on_click = lambda e: turn(1)
+    show(0)
+
+    pager = ft.Row(controls=[previous_button, position, next_button], visible=len(result.rows) > PAGE_SIZE)
+    container = ft.Column(controls=[ft.Row(controls=[table], scroll="auto"), pager])
+    return container
+
+
+def ask_pos_ai_formatted(page: ft.Page, user_input: ft.TextField, query_result: ft.Column,
+                         search_button: ft.Button, cancel_button: ft.TextButton) -> None:
     query = user_input.value.strip()
-    result = ask_pos_ai(query)
-    if query:
-        query_result.controls.append(
-            ft.Text(
-                result
-            )
-        )
-        user_input.value = ""
-        page.update()
+    if not query:
+        return
+
+    cancel = threading.Event()
+    # Read once: ``finished`` may run after the session has closed.
+    key = session_key(page)
+    with _runs_lock:
+        # One question at a time per session.
+        if key in _runs:
+            return
+        _runs[key] = cancel
+
+    updates = get_scheduler(page)
+    steps = ft.Column(spacing=2)
+    answer = ft.Text("", selectable=True)
+    query_result.controls[:] = [ft.Text(query, weight=ft.FontWeight.BOLD), steps, answer]
+    user_input.value = ""
+    search_button.disabled = True
+    cancel_button.visible = True
+    updates.request()
+
+    # Runs on the AI worker; the scheduler sends at most one update per frame.
+    def on_event(kind: str, payload) -> None:
+        if kind == "token":
+            answer.value += payload
+        elif kind == "table":
+            # The rows are paged here; the model only saw the first few as text.
+            steps.controls.append(result_table(page, payload))
+        else:
+            steps.controls.append(ft.Text(payload, size=12, italic=True, color=ft.Colors.WHITE_54))
+            # Tokens before a tool call were the model's working, not the answer.
+            answer.value = ""
+        updates.request(query_result)
+
+    def finished(future) -> None:
+        with _runs_lock:
+            if _runs.get(key) is cancel:
+                del _runs[key]
+        try:
+            answer.value = CANCELLED if cancel.is_set() else future.result()
+        except Exception as e:
+            answer.value = f"AI Error: {str(e)}"
+        search_button.disabled = False
+        cancel_button.visible = False
+        updates.request()
+
+    submit_question(query, on_event=on_event, cancel=cancel).add_done_callback(finished)
+
+
+def cancel_question(page: ft.Page, cancel_button: ft.TextButton) -> None:
+    with _runs_lock:
+        cancel = _runs.get(session_key(page))
+    if cancel is not None:
+        cancel.set()
+        cancel_button.visible = False
+        get_scheduler(page).request(cancel_button)
 
 
 def back_home(page: ft.Page) -> None:
@@ -28,11 +130,14 @@ def chat_container(page: ft.Page) -> ft.Container:
         weight=ft.FontWeight.BOLD
     )
     
+    updates = get_scheduler(page)
+
     user_input = ft.TextField(
         label="Enter Your Question",
         width=900,
         height = 50,
-        align=ft.Alignment.CENTER
+        align=ft.Alignment.CENTER,
+        on_submit=updates.handler(lambda e: ask_pos_ai_formatted(page, user_input, query_result, search_button, cancel_button))
     )
     
     search_button = ft.Button(
@@ -41,13 +146,24 @@ def chat_container(page: ft.Page) -> ft.Container:
             size=16, 
             weight=ft.FontWeight.BOLD,
         ),
-        on_click=lambda e: ask_pos_ai_formatted(page, user_input, query_result),
+        on_click=updates.handler(lambda e: ask_pos_ai_formatted(page, user_input, query_result, search_button, cancel_button)),
         width=150,
         height=50,
         bgcolor=ft.Colors.BLACK_38,
         color=ft.Colors.WHITE
     )
     
+    cancel_button = ft.TextButton(
+        content=ft.Text(
+            value="Cancel",
+            size=16,
+            weight=ft.FontWeight.BOLD
+        ),
+        on_click=lambda e: cancel_question(page, cancel_button),
+        visible=False,
+        height=50
+    )
+    
     query_result = ft.Column(
         scroll="auto",
         height=400, 
@@ -70,7 +186,10 @@ def chat_container(page: ft.Page) -> ft.Container:
             controls=[
                 title,
                 user_input,
-                search_button,
+                ft.Row(
+                    controls=[search_button, cancel_button],
+                    alignment=ft.MainAxisAlignment.CENTER
+                ),
                 query_result,
                 back_button
             ],
@@ -6,7 +6,12 @@ from pathlib import Path
 DATA_DIR = Path(__file__).resolve().parents[2] / "database"
 DB_PATH = DATA_DIR / "posai.db"
 
+from app.data import changes
 from app.data import products as db
+from app.ui.product_browser import ProductBrowser
+from app.ui.render import get_scheduler
+from app.ui.typeahead import ProductTypeahead
+from app.ui.views import get_views
 
 
 def back_home(page: ft.Page) -> None:
@@ -14,6 +19,8 @@ def back_home(page: ft.Page) -> None:
 
 
 def inventory_container(page: ft.Page) -> ft.Container:
+    updates = get_scheduler(page)
+
     # --- UI Components ---
     barcode_input = ft.TextField(label="Barcode (SKU)", prefix_icon="qr_code", autofocus=True)
     product_name = ft.TextField(label="Product Name", expand=True)
@@ -22,21 +29,16 @@ def inventory_container(page: ft.Page) -> ft.Container:
     stock = ft.TextField(label="Current Stock", value="0", expand=1)
     reorder = ft.TextField(label="Reorder Level", value="10", expand=1)
     
+    categories = db.get_categories()
     category_dropdown = ft.Dropdown(
         label="Category",
-        options=[ft.dropdown.Option(key=str(c[0]), text=c[1]) for c in db.get_categories()],
+        options=[ft.dropdown.Option(key=str(c[0]), text=c[1]) for c in categories],
         expand=True
     )
 
-    recent_table = ft.DataTable(
-        columns=[
-            ft.DataColumn(ft.Text("SKU")),
-            ft.DataColumn(ft.Text("Product")),
-            ft.DataColumn(ft.Text("Stock")),
-            ft.DataColumn(ft.Text("Price")),
-        ],
-        rows=[]
-    )
+    # The catalog, a page at a time; clicking a product loads it into the form.
+    browser = ProductBrowser(page, categories, on_select=lambda sku: load_product(sku))
+    product_search = ProductTypeahead(page, on_pick=lambda sku: load_product(sku), label="Search by name or SKU")
 
     # --- Logic Functions ---
     def clear_fields(e):
@@ -48,16 +50,27 @@ def inventory_container(page: ft.Page) -> ft.Container:
         reorder.value = "10"
         category_dropdown.value = None
         barcode_input.focus()
-        page.update()
+        updates.request()
+
+    # Table versions the dropdown and the product list were last loaded at. The
+    # first poll only sets the baseline for writes made by other processes.
+    changes.poll_external(db.DB_PATH)
+    loaded = {"CATEGORIES": changes.version("CATEGORIES"), "PRODUCTS": None}
 
-    def update_recent_list():
-        recent_table.rows.clear()
-        rows = db.get_recent_products()
-        for row in rows:
-            recent_table.rows.append(
-                ft.DataRow(cells=[ft.DataCell(ft.Text(str(c))) for c in row])
-            )
-        page.update()
+    def update_categories():
+        loaded["CATEGORIES"] = changes.version("CATEGORIES")
+        categories = db.get_categories()
+        category_dropdown.options = [ft.dropdown.Option(key=str(c[0]), text=c[1]) for c in categories]
+        browser.set_categories(categories)
+        updates.request(category_dropdown)
+
+    def update_product_list():
+        loaded["PRODUCTS"] = changes.version("PRODUCTS")
+        browser.reload()
+
+    def load_product(sku):
+        barcode_input.value = sku
+        search_product(None)
 
     def search_product(e):
         sku = barcode_input.value.strip()
@@ -82,14 +95,14 @@ def inventory_container(page: ft.Page) -> ft.Container:
             page.snack_bar = ft.SnackBar(ft.Text("New SKU detected."))
         
         page.snack_bar.open = True
-        page.update()
+        updates.request()
 
     def save_product(e):
         sku = barcode_input.value.strip()
         if not sku or not product_name.value:
             page.snack_bar = ft.SnackBar(ft.Text("SKU and Name are required!"), bgcolor="red700")
             page.snack_bar.open = True
-            page.update()
+            updates.request()
             return
 
         db.upsert_product(
@@ -97,14 +110,24 @@ def inventory_container(page: ft.Page) -> ft.Container:
             cost_price.value, sell_price.value, stock.value, reorder.value
         )
         
-        update_recent_list()
+        update_product_list()
         page.snack_bar = ft.SnackBar(ft.Text("Inventory Updated!"), bgcolor="blue700")
         page.snack_bar.open = True
         clear_fields(None)
 
+    def refresh_data():
+        # Re-query only what was written since this view last loaded it, in
+        # this process or (data_version) in another one.
+        changes.poll_external(db.DB_PATH)
+        if loaded["CATEGORIES"] != changes.version("CATEGORIES"):
+            update_categories()
+        if loaded["PRODUCTS"] != changes.version("PRODUCTS"):
+            update_product_list()
+
     # --- Setup Events ---
-    barcode_input.on_submit = search_product
-    update_recent_list()
+    barcode_input.on_submit = updates.handler(search_product)
+    update_product_list()
+    get_views(page).on_show("/inventory", refresh_data)
 
     back_button = ft.TextButton(
         content=ft.Text(
@@ -133,12 +156,13 @@ def inventory_container(page: ft.Page) -> ft.Container:
                 ft.Row([product_name, category_dropdown]),
                 ft.Row([cost_price, sell_price, stock, reorder]),
                 ft.Row([
-                    ft.ElevatedButton("Save/Update Item", icon="save", on_click=save_product, bgcolor="blue700", color="white"),
-                    ft.OutlinedButton("Clear Form", icon="clear", on_click=clear_fields)
+                    ft.ElevatedButton("Save/Update Item", icon="save", on_click=updates.handler(save_product), bgcolor="blue700", color="white"),
+                    ft.OutlinedButton("Clear Form", icon="clear", on_click=updates.handler(clear_fields))
                 ]),
                 ft.Divider(),
-                ft.Text("Recently Updated", size=10, weight="bold"),
-                recent_table,
+                ft.Text("Products", size=10, weight="bold"),
+                product_search.control,
+                browser.control,
                 back_button_row
             ],
             scroll="adaptive",
@@ -0,0 +1,222 @@
+"""
+Product browser for the inventory screen: the whole catalog in a windowed list.
+
+A ``DataTable`` of every product would hold one control per row. Here rows
+are read a page at a time (``app/data/product_pages.py``) when the list is
+scrolled near either end, and at most ``WINDOW_PAGES`` pages are held as
+controls: loading a page at one end drops the rows beyond the window at the
+other and moves the scroll position by their height, so the rows in view stay
+put. Memory, query time and the size of each update stay the same however far
+a 200k-SKU catalog is scrolled. Rows have a fixed height (``item_extent``),
+so the client lays out only the ones on screen.
+"""
+
+import threading
+
+import flet as ft
+
+from app.data.product_pages import PAGE_SIZE, browse_products, row_key
+from app.ui.render import get_scheduler
+
+# Pages of rows held as controls at a time.
+WINDOW_PAGES = 3
+
+# Height of a row in pixels; every row is the same height.
+ROW_HEIGHT = 40
+
+# Rows the list shows at once.
+VISIBLE_ROWS = 10
+
+# The next page is loaded when the list is scrolled this close to either end.
+PRELOAD_PIXELS = ROW_HEIGHT * 20
+
+SORT_LABELS = {
+    "updated": "Recently updated",
+    "name": "Name",
+    "sku": "SKU",
+    "stock": "Stock (lowest first)",
+}
+STOCK_LABELS = {"any": "Any stock", "in": "In stock", "low": "Low stock", "out": "Out of stock"}
+ACTIVE_LABELS = {"any": "Active and inactive", "active": "Active", "inactive": "Inactive"}
+
+# Column widths of the row layout (None: takes the remaining width).
+COLUMN_WIDTHS = {"SKU": 140, "Product": None, "Category": 140, "Stock": 70, "Price": 90}
+
+
+def _options(labels: dict) -> list:
+    return [ft.dropdown.Option(key=key, text=text) for key, text in labels.items()]
+
+
+def _cells(values: list, color: str = None, weight: str = None) -> list:
+    return [
+        ft.Text(value, width=width, expand=width is None, color=color, weight=weight,
+                max_lines=1, overflow=ft.TextOverflow.ELLIPSIS)
+        for value, width in zip(values, COLUMN_WIDTHS.values())
+    ]
+
+
+class ProductBrowser:
+    """
+    Sortable, filterable list of the catalog that keeps a bounded window of rows.
+    """
+
+    def __init__(self, page: ft.Page, categories: list, on_select=None) -> None:
+        """
+        Initialize the browser; call ``reload`` to show the first page.
+
+        Args:
+            page: The Flet page the browser is on
+            categories: (ID, NAME) rows of the categories
+            on_select: Called as ``on_select(sku)`` when a row is clicked
+        """
+        self.page = page
+        self.on_select = on_select
+        self.updates = get_scheduler(page)
+        self.rows = []
+        self.at_start = True
+        self.at_end = True
+        self.category_names = {}
+        # Held from a page load until its scroll correction is sent, so the
+        # scroll events in between do not load again.
+        self._loading = threading.Lock()
+
+        self.sort = ft.Dropdown(label="Sort by", value="updated", options=_options(SORT_LABELS), width=200, dense=True)
+        self.category = ft.Dropdown(label="Category", value="all", width=200, dense=True)
+        self.stock = ft.Dropdown(label="Stock", value="any", options=_options(STOCK_LABELS), width=160, dense=True)
+        self.active = ft.Dropdown(label="Status", value="any", options=_options(ACTIVE_LABELS), width=190, dense=True)
+        for dropdown in (self.sort, self.category, self.stock, self.active):
+            dropdown.on_select = self.updates.handler(lambda e: self.reload())
+        self.set_categories(categories)
+
+        self.status = ft.Text(size=12)
+        self.list_view = ft.ListView(
+            controls=[],
+            item_extent=ROW_HEIGHT,
+            height=ROW_HEIGHT * VISIBLE_ROWS,
+            on_scroll=self._on_scroll,
+        )
+        header = ft.Row(controls=_cells(list(COLUMN_WIDTHS), weight="bold"))
+        self.control = ft.Column(controls=[
+            ft.Row(controls=[self.sort, self.category, self.stock, self.active], wrap=True),
+            header,
+            self.list_view,
+            self.status,
+        ])
+
+    def set_categories(self, categories: list) -> None:
+        """
+        Replace the category filter's options and the names shown in rows.
+        """
+        self.category_names = {category_id: name for category_id, name in categories}
+        self.category.options = [ft.dropdown.Option(key="all", text="All categories")] + [
+            ft.dropdown.Option(key=str(category_id), text=name) for category_id, name in categories
+        ]
+        if self.category.value not in (None, "all") and int(self.category.value) not in self.category_names:
+            self.category.value = "all"
+        self.updates.request(self.category)
+
+    def _filters(self) -> dict:
+        return {
+            "sort": self.sort.value or "updated",
+            "category_id": None if self.category.value in (None, "all") else int(self.category.value),
+            "stock": None if self.stock.value in (None, "any") else self.stock.value,
+            "active": None if self.active.value in (None, "any") else self.active.value == "active",
+        }
+
+    def _row(self, row: tuple) -> ft.Container:
+        _, sku, name, category_id, stock, reorder, price, active, _ = row
+        color = "red400" if stock == 0 else "orange400" if stock <= reorder else None
+        values = [sku, name, self.category_names.get(category_id, ""), str(stock), f"₹. {price}"]
+        cells = _cells(values)
+        cells[3].color = color
+        if not active:
+            cells[1].value = f"{name} (inactive)"
+            cells[1].italic = True
+        return ft.Container(
+            content=ft.Row(controls=cells),
+            height=ROW_HEIGHT,
+            ink=True,
+            on_click=self.updates.handler(lambda e: self.on_select(sku)) if self.on_select else None,
+        )
+
+    def _show_status(self) -> None:
+        if not self.rows:
+            self.status.value = "No products match."
+        else:
+            more = "" if self.at_end else ", scroll for more"
+            self.status.value = f"Showing {len(self.rows)} products{more}"
+        self.updates.request(self.status)
+
+    def reload(self) -> None:
+        """
+        Show the first page for the current sort and filters.
+        """
+        with self._loading:
+            # Before the first load the list is not on the page yet and has nothing to scroll.
+            shown = bool(self.list_view.controls)
+            self.rows = browse_products(**self._filters())
+            self.at_start, self.at_end = True, len(self.rows) < PAGE_SIZE
+            self.list_view.controls = [self._row(row) for row in self.rows]
+            self.updates.request(self.list_view)
+            self._show_status()
+        if shown:
+            self.page.run_task(self.list_view.scroll_to, offset=0)
+
+    def _load(self, backward: bool) -> float:
+        """
+        Load the page past one end of the window and drop the rows beyond the
+        other end; return the scroll change that keeps the visible rows in place.
+        """
+        filters = self._filters()
+        edge = self.rows[0] if backward else self.rows[-1]
+        rows = browse_products(key=row_key(filters["sort"], edge), backward=backward, **filters)
+        if len(rows) < PAGE_SIZE:
+            if backward:
+                self.at_start = True
+            else:
+                self.at_end = True
+        if not rows:
+            return 0
+
+        controls = self.list_view.controls
+        excess = max(0, len(self.rows) + len(rows) - WINDOW_PAGES * PAGE_SIZE)
+        if backward:
+            self.rows[:0] = rows
+            controls[:0] = [self._row(row) for row in rows]
+            if excess:
+                del self.rows[-excess:], controls[-excess:]
+                self.at_end = False
+            shift = len(rows)
+        else:
+            self.rows.extend(rows)
+            controls.extend(self._row(row) for row in rows)
+            if excess:
+                del self.rows[:excess], controls[:excess]
+                self.at_start = False
+            shift = -excess
+        return shift * ROW_HEIGHT
+
+    def _on_scroll(self, e: ft.OnScrollEvent) -> None:
+        if e.pixels >= e.max_scroll_extent - PRELOAD_PIXELS and not self.at_end:
+            backward = False
+        elif e.pixels <= e.min_scroll_extent + PRELOAD_PIXELS and not self.at_start:
+            backward = True
+        else:
+            return
+        if not self.rows or not self._loading.acquire(blocking=False):
+            return
+
+        try:
+            with self.updates.batch():
+                delta = self._load(backward)
+                self.updates.request(self.list_view)
+                self._show_status()
+        except Exception:
+            self._loading.release()
+            raise
+        if not delta:
+            self._loading.release()
+            return
+        # Sent after the rows, so the view moves back onto the rows it showed.
+        correction = self.page.run_task(self.list_view.scroll_to, delta=delta)
+        correction.add_done_callback(lambda _: self._loading.release())
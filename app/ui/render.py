@@ -0,0 +1,187 @@
+"""
+Coalesced UI updates for Flet pages.
+
+Every ``page.update()`` diffs the control tree and sends the patch to the
+client, which over a shop LAN in web mode costs a round trip each. Handlers
+used to call it several times per user action. Here they only mark what
+changed; the scheduler flushes once when the outermost handler returns, or
+at most once per frame for updates from timers and background threads.
+Wrapped handlers turn off Flet's own update after each event, so that
+flush is the only one sent.
+"""
+
+import logging
+import threading
+from contextlib import contextmanager
+from functools import wraps
+
+import flet as ft
+
+from app.ui.session import session_key
+
+logger = logging.getLogger(__name__)
+
+# Seconds between flushes of updates requested outside a handler (~60 fps).
+FRAME_SECONDS = 1 / 60
+
+
+def _disable_auto_update() -> None:
+    """
+    Stop Flet from updating the page after the event being handled.
+    """
+    try:
+        ft.context.page
+    except RuntimeError:
+        # Not inside a Flet event (e.g. a benchmark lane); there is no auto-update to skip.
+        return
+    ft.context.disable_auto_update()
+
+
+class UpdateScheduler:
+    """
+    Collects dirty controls for one page and flushes them in as few updates as possible.
+    """
+
+    def __init__(self, page, frame: float = FRAME_SECONDS) -> None:
+        """
+        Initialize the scheduler.
+
+        Args:
+            page: The Flet page to update
+            frame: Seconds to wait before flushing updates requested outside a batch
+        """
+        self.page = page
+        self.frame = frame
+        self.requests = 0
+        self.flushes = 0
+        self._dirty = {}
+        self._page_dirty = False
+        self._timer = None
+        self._closed = False
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def request(self, *controls) -> None:
+        """
+        Mark controls (or, with no arguments, the whole page) as needing an update.
+
+        Ignored once the scheduler is closed: work that outlives its session
+        (an AI answer, a scanner timer) must not update a destroyed page.
+        """
+        with self._lock:
+            if self._closed:
+                return
+            self.requests += 1
+            if controls:
+                for control in controls:
+                    self._dirty[id(control)] = control
+            else:
+                self._page_dirty = True
+
+            if getattr(self._local, "depth", 0) or self._timer is not None:
+                return
+            self._timer = threading.Timer(self.frame, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    @contextmanager
+    def batch(self):
+        """
+        Defer updates until the outermost batch on this thread exits, then flush once.
+        """
+        self._local.depth = getattr(self._local, "depth", 0) + 1
+        try:
+            yield self
+        finally:
+            self._local.depth -= 1
+            if not self._local.depth:
+                self.flush()
+
+    def handler(self, func):
+        """
+        Wrap an event handler so everything it requests goes out in one update.
+
+        The handler must request every control it changes: Flet's update after
+        the event is turned off, or each event would be diffed twice.
+        """
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            _disable_auto_update()
+            with self.batch():
+                return func(*args, **kwargs)
+        return wrapper
+
+    def flush(self) -> None:
+        """
+        Send pending updates now: one ``page.update()``, or one update per dirty control.
+        """
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            page_dirty, self._page_dirty = self._page_dirty, False
+            dirty, self._dirty = self._dirty, {}
+        if not page_dirty and not dirty:
+            return
+
+        self.flushes += 1
+        if not page_dirty:
+            try:
+                for control in dirty.values():
+                    control.update()
+                return
+            except Exception as e:
+                # E.g. a control not (or no longer) on the page; fall back to a full update.
+                logger.debug(f"Control update failed, updating the page: {e}")
+        self.page.update()
+
+    def close(self) -> None:
+        """
+        Drop pending updates without sending them, and ignore any requested later.
+        """
+        with self._lock:
+            self._closed = True
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            self._page_dirty = False
+            self._dirty = {}
+
+    def stats(self) -> dict:
+        """
+        Update counters: requests made, flushes sent and requests coalesced away.
+        """
+        return {
+            "requests": self.requests,
+            "flushes": self.flushes,
+            "coalesced": self.requests - self.flushes,
+        }
+
+
+_schedulers = {}
+_schedulers_lock = threading.Lock()
+
+
+def get_scheduler(page) -> UpdateScheduler:
+    """
+    Return the update scheduler of ``page``, creating it on first use.
+    """
+    key = session_key(page)
+    scheduler = _schedulers.get(key)
+    if scheduler is None:
+        with _schedulers_lock:
+            scheduler = _schedulers.get(key)
+            if scheduler is None:
+                scheduler = _schedulers[key] = UpdateScheduler(page)
+    return scheduler
+
+
+def drop_scheduler(page) -> None:
+    """
+    Forget the scheduler of ``page``, e.g. when its session closes.
+    """
+    with _schedulers_lock:
+        scheduler = _schedulers.pop(session_key(page), None)
+    if scheduler is not None:
+        scheduler.close()
+        logger.debug(f"Update scheduler closed: {scheduler.stats()}")
@@ -1,15 +1,21 @@
 import flet as ft
 from app.data.products import get_product_by_sku, add_product_from_sale
-cart = []
+from app.data.transactions import CheckoutError, commit_sale
+from app.ui.barcode import BarcodePipeline
+from app.ui.cart import Cart, CartLine, format_paise, to_paise
+from app.ui.render import get_scheduler
+from app.ui.session import get_sale_session
+from app.ui.typeahead import ProductTypeahead
+from app.ui.views import get_views
 
 
-def back_home(page: ft.Page, product_history: ft.DataTable) -> None:
-    if product_history.rows:
+def back_home(page: ft.Page, cart: Cart, product_history: ft.DataTable, rendered: dict, customer_total: ft.Text) -> None:
+    if cart:
         popup_menu = ft.PopupMenuButton(
         items=[
                 ft.PopupMenuItem(
                     content=ft.Text("Click to Clear Cart before going back!"),
-                    on_click=lambda e: product_history.rows.clear()
+                    on_click=get_sale_session(page).locked(lambda e: clear_cart(page, cart, product_history, rendered, customer_total))
                 )
             ],
         )
@@ -21,81 +27,101 @@ def back_home(page: ft.Page, product_history: ft.DataTable) -> None:
                 ]
             )
         )
-        page.update()
+        get_scheduler(page).request()
         return
     page.go("/home")
 
 
-def to_checkout(page: ft.Page, product_history: ft.DataTable, cart: list) -> None:
-    if product_history.rows:
-        cart.clear()
-        for row in product_history.rows:
-            row_data = [cell.content.value for cell in row.cells]
-            cart.append(row_data)
-        
-        # product_history.rows.clear()
-        # page.update()
-    else:
+def clear_cart(page: ft.Page, cart: Cart, product_history: ft.DataTable, rendered: dict, customer_total: ft.Text) -> None:
+    cart.clear()
+    rendered.clear()
+    product_history.rows.clear()
+    customer_total.value = format_paise(cart.total)
+    get_scheduler(page).request()
+
+
+def to_checkout(page: ft.Page, cart: Cart) -> None:
+    if not cart:
         return
-    
     page.go("/checkout")
 
 
-def log_product_to_cart(page: ft.Page, barcode_input: ft.TextField, product_name: ft.TextField, product_quantity: ft.TextField, product_price: ft.TextField, product_history: ft.DataTable, customer_total: ft.TextField) -> None:
-    new_barcode = barcode_input.value.strip()
-    qty_to_add = int(product_quantity.value.strip())
-    price_per_unit = float(product_price.value.strip())
-    new_item_total = qty_to_add * price_per_unit
-    
-    found_row = None
-    for row in product_history.rows:
-        if row.cells[0].content.value == new_barcode:
-            found_row = row
-            break
-    
-    if found_row:
-        current_qty = int(found_row.cells[2].content.value)
-        updated_qty = current_qty + qty_to_add
-        found_row.cells[2].content.value = str(updated_qty)
-
-        updated_total = updated_qty * price_per_unit
-        found_row.cells[4].content.value = f"₹ {updated_total}"
-    elif (not found_row) and new_barcode and qty_to_add > 0 and price_per_unit > 0 and product_name.value.strip() and get_product_by_sku(new_barcode) is None:
-        row = ft.DataRow(
-            cells=[
-                ft.DataCell(ft.Text(new_barcode)),
-                ft.DataCell(ft.Text(product_name.value.strip())),
-                ft.DataCell(ft.Text(str(qty_to_add))),
-                ft.DataCell(ft.Text(f"₹ {price_per_unit}")),
-                ft.DataCell(ft.Text(f"₹ {new_item_total}"))
-            ]
-        )
-        product_history.rows.append(row)
-        add_product_from_sale(new_barcode, product_name.value.strip(), float(price_per_unit))
-    elif (not found_row) and new_barcode and qty_to_add > 0 and price_per_unit > 0 and product_name.value.strip() and get_product_by_sku(new_barcode):
-        row = ft.DataRow(
-            cells=[
-                ft.DataCell(ft.Text(new_barcode)),
-                ft.DataCell(ft.Text(product_name.value.strip())),
-                ft.DataCell(ft.Text(str(qty_to_add))),
-                ft.DataCell(ft.Text(f"₹ {price_per_unit}")),
-                ft.DataCell(ft.Text(f"₹ {new_item_total}"))
-            ]
-        )
+def cart_row(line: CartLine) -> ft.DataRow:
+    return ft.DataRow(
+        cells=[
+            ft.DataCell(ft.Text(line.sku)),
+            ft.DataCell(ft.Text(line.name)),
+            ft.DataCell(ft.Text(str(line.quantity))),
+            ft.DataCell(ft.Text(format_paise(line.unit_price))),
+            ft.DataCell(ft.Text(format_paise(line.total)))
+        ]
+    )
+
+
+def refresh_cart_row(row: ft.DataRow, line: CartLine) -> None:
+    row.cells[2].content.value = str(line.quantity)
+    row.cells[3].content.value = format_paise(line.unit_price)
+    row.cells[4].content.value = format_paise(line.total)
+
+
+def add_cart_line(cart: Cart, rendered: dict, product_history: ft.DataTable, customer_total: ft.Text, sku: str, name: str, quantity: int, unit_price: int) -> None:
+    line, created = cart.add(sku, name, quantity, unit_price)
+    if created:
+        row = rendered[sku] = cart_row(line)
         product_history.rows.append(row)
-    
-    current_grand_total = float(customer_total.value.replace('₹ ', ''))
-    customer_total.value = f"₹ {current_grand_total + new_item_total}"
-    
+    else:
+        refresh_cart_row(rendered[sku], line)
+    customer_total.value = format_paise(cart.total)
+
+
+def reset_inputs(barcode_input: ft.TextField, product_name: ft.TextField, product_quantity: ft.TextField, product_price: ft.TextField) -> None:
     barcode_input.value = ""
     product_name.value = ""
     product_quantity.value = "0"
     product_price.value = "0"
-    page.update()
 
 
-def on_barcode_change(e: ft.ControlEvent, page: ft.Page, barcode_input: ft.TextField, product_name: ft.TextField, product_price: ft.TextField, product_quantity: ft.TextField) -> None:
-    sku = barcode_input.value.strip()
+def log_product_to_cart(page: ft.Page, cart: Cart, rendered: dict, barcode_input: ft.TextField, product_name: ft.TextField, product_quantity: ft.TextField, product_price: ft.TextField, product_history: ft.DataTable, customer_total: ft.TextField) -> None:
+    new_barcode = barcode_input.value.strip()
+    name = product_name.value.strip()
+    try:
+        qty_to_add = int(product_quantity.value.strip())
+        price_per_unit = to_paise(product_price.value)
+    except ValueError:
+        return
+    if not (new_barcode and name and qty_to_add > 0 and price_per_unit > 0):
+        return
+
+    if new_barcode not in cart and get_product_by_sku(new_barcode) is None:
+        add_product_from_sale(new_barcode, name, price_per_unit / 100)
+
+    add_cart_line(cart, rendered, product_history, customer_total, new_barcode, name, qty_to_add, price_per_unit)
+    reset_inputs(barcode_input, product_name, product_quantity, product_price)
+    get_scheduler(page).request()
+
+
+def scan_to_cart(page: ft.Page, cart: Cart, rendered: dict, sku: str, barcode_input: ft.TextField, product_name: ft.TextField, product_quantity: ft.TextField, product_price: ft.TextField, product_history: ft.DataTable, customer_total: ft.Text) -> None:
+    # One lookup and one update per scan; a known SKU goes straight into the cart.
+    product = get_product_by_sku(sku)
+    if product is None:
+        # Unknown SKU: the cashier enters name and price and adds it with the cart button.
+        barcode_input.value = sku
+        product_name.value = ""
+        product_price.value = "0"
+        product_quantity.value = "1"
+        get_scheduler(page).request()
+        return
+
+    try:
+        quantity = max(int(product_quantity.value.strip()), 1)
+    except ValueError:
+        quantity = 1
+    add_cart_line(cart, rendered, product_history, customer_total, sku, product[0], quantity, to_paise(product[1]))
+    reset_inputs(barcode_input, product_name, product_quantity, product_price)
+    get_scheduler(page).request()
+
+
+def preview_barcode(page: ft.Page, sku: str, product_name: ft.TextField, product_price: ft.TextField, product_quantity: ft.TextField) -> None:
     if sku:
         product = get_product_by_sku(sku)
         if product:
@@ -108,38 +134,53 @@ def on_barcode_change(e: ft.ControlEvent, page: ft.Page, barcode_input: ft.TextF
     else:
         product_name.value = ""
         product_price.value = "0"
-    page.update()
+    get_scheduler(page).request(product_name, product_price, product_quantity)
 
 
-def on_cash_change(e: ft.ControlEvent, page: ft.Page, cash_amount: ft.TextField, change_amount: ft.TextField, customer_total: ft.TextField) -> None:
+def on_cash_change(e: ft.ControlEvent, page: ft.Page, cash_amount: ft.TextField, change_amount: ft.TextField, cart: Cart) -> None:
     cash = cash_amount.value.strip()
     if cash:
         change_amount.visible = True
-        change = float(cash) - float(customer_total.value.replace('₹ ', ''))
-        change_amount.value = f"Change: ₹ {change}"
+        try:
+            change_amount.value = f"Change: {format_paise(to_paise(cash) - cart.total)}"
+        except ValueError:
+            change_amount.value = ""
     else:
         change_amount.value = ""
-    page.update()
+    get_scheduler(page).request(change_amount)
 
 
-def payment_type_choice(page: ft.Page, type: str, cash_amount: ft.TextField, change_amount: ft.TextField, finalise_button: ft.Button) -> None:
+def payment_type_choice(page: ft.Page, type: str, cash_amount: ft.TextField, change_amount: ft.TextField, finalise_button: ft.Button, payment: dict) -> None:
+    payment["method"] = type
     if type == "UPI":
         cash_amount.visible = False
         finalise_button.visible = True
         change_amount.visible = False
-        page.update()
+        get_scheduler(page).request()
     elif type == "CASH":
         cash_amount.visible = True
         finalise_button.visible = True
         change_amount.visible = True
-        page.update()
+        get_scheduler(page).request()
 
 
-def log_payment():
-    pass
+def log_payment(page: ft.Page, cart: Cart, payment: dict) -> None:
+    try:
+        transaction_number = commit_sale(cart.to_sale_lines(), payment_method=payment.get("method", "CASH"))
+    except CheckoutError as e:
+        page.show_dialog(ft.SnackBar(ft.Text(f"Sale not recorded: {e}"), bgcolor=ft.Colors.RED))
+        return
+
+    cart.clear()
+    page.show_dialog(ft.SnackBar(ft.Text(f"Sale recorded: {transaction_number}")))
+    page.go("/sale")
 
 
 def sale_container(page: ft.Page) -> ft.Container:
+    session = get_sale_session(page)
+    cart = session.cart
+    updates = get_scheduler(page)
+
     title = ft.Text(
         "POS.AI", 
         size=24, 
@@ -152,7 +193,9 @@ def sale_container(page: ft.Page) -> ft.Container:
         width=300,
         height = 50,
         align=ft.Alignment.CENTER_LEFT,
-        on_change=lambda e: on_barcode_change(e, page, barcode_input, product_name, product_price, product_quantity)
+        autofocus=True,
+        on_change=lambda e: barcode_pipeline.key(barcode_input.value),
+        on_submit=updates.handler(lambda e: barcode_pipeline.submit(barcode_input.value))
     )
     
     product_quantity = ft.TextField(
@@ -177,6 +220,22 @@ def sale_container(page: ft.Page) -> ft.Container:
         height = 50
     )
     
+    barcode_pipeline = BarcodePipeline(
+        on_scan=session.locked(lambda sku: scan_to_cart(
+            page,
+            cart,
+            rendered,
+            sku,
+            barcode_input,
+            product_name,
+            product_quantity,
+            product_price,
+            product_history,
+            customer_total
+        )),
+        on_preview=session.locked(lambda sku: preview_barcode(page, sku, product_name, product_price, product_quantity))
+    )
+    
     input_row = ft.Row(
         controls=[
             barcode_input,
@@ -188,6 +247,26 @@ def sale_container(page: ft.Page) -> ft.Container:
         spacing=20
     )
     
+    # Items without a readable barcode are found by name; picking one adds it like a scan.
+    product_search = ProductTypeahead(
+        page,
+        on_pick=session.locked(lambda sku: scan_to_cart(
+            page,
+            cart,
+            rendered,
+            sku,
+            barcode_input,
+            product_name,
+            product_quantity,
+            product_price,
+            product_history,
+            customer_total
+        )),
+        active=True,
+        label="Search by name",
+        width=500
+    )
+    
     add_to_cart_label = ft.Text(
         value="Add to Cart",
         size=20, 
@@ -202,15 +281,17 @@ def sale_container(page: ft.Page) -> ft.Container:
             weight=ft.FontWeight.BOLD,
             color=ft.Colors.BLACK
         ),
-        on_click=lambda e: log_product_to_cart(
+        on_click=updates.handler(session.locked(lambda e: log_product_to_cart(
             page,
+            cart,
+            rendered,
             barcode_input,
             product_name,
             product_quantity,
             product_price,
             product_history,
             customer_total
-        ),
+        ))),
         width=80,
         height=50,
         bgcolor=ft.Colors.BLACK_38,
@@ -226,6 +307,9 @@ def sale_container(page: ft.Page) -> ft.Container:
         spacing=20
     )
     
+    # Rows already on screen, keyed by SKU, so a re-scan updates its row in place.
+    rendered = {line.sku: cart_row(line) for line in cart}
+    
     product_history = ft.DataTable(
         columns=[
             ft.DataColumn(ft.Text("SKU")),
@@ -234,7 +318,7 @@ def sale_container(page: ft.Page) -> ft.Container:
             ft.DataColumn(ft.Text("MRP")),
             ft.DataColumn(ft.Text("Total"))
         ],
-        rows=[],
+        rows=list(rendered.values()),
         border=ft.border.all(1, "BLACK"),
         divider_thickness=2,
         width = 800
@@ -249,7 +333,7 @@ def sale_container(page: ft.Page) -> ft.Container:
     )
     
     customer_total = ft.Text(
-        value="₹ 0",
+        value=format_paise(cart.total),
         size=16,
         align=ft.Alignment.BOTTOM_RIGHT,
         color=ft.Colors.RED
@@ -284,7 +368,7 @@ def sale_container(page: ft.Page) -> ft.Container:
             size=16, 
             weight=ft.FontWeight.BOLD
         ),
-        on_click=lambda e: to_checkout(page, product_history, cart),
+        on_click=updates.handler(lambda e: to_checkout(page, cart)),
         width=150,
         height=50,
         bgcolor=ft.Colors.BLACK_38,
@@ -305,7 +389,7 @@ def sale_container(page: ft.Page) -> ft.Container:
             size=20, 
             weight=ft.FontWeight.BOLD
         ),
-        on_click=lambda e: back_home(page, product_history),
+        on_click=updates.handler(session.locked(lambda e: back_home(page, cart, product_history, rendered, customer_total))),
         width=100,
         height=50
     )
@@ -316,6 +400,7 @@ def sale_container(page: ft.Page) -> ft.Container:
             controls=[
                 title,
                 input_row,
+                product_search.control,
                 add_to_cart_row,
                 customer_row,
                 checkout_row,
@@ -328,6 +413,17 @@ def sale_container(page: ft.Page) -> ft.Container:
         alignment=ft.Alignment.CENTER
     )
     
+    def refresh_cart_table():
+        # Behind this view the cart only changes at checkout (paid or cleared).
+        if len(product_history.rows) == len(cart) and customer_total.value == format_paise(cart.total):
+            return
+        rendered.clear()
+        rendered.update((line.sku, cart_row(line)) for line in cart)
+        product_history.rows[:] = list(rendered.values())
+        customer_total.value = format_paise(cart.total)
+
+    get_views(page).on_show("/sale", session.locked(refresh_cart_table))
+    
     return container
 
 
@@ -354,20 +450,18 @@ def sale_view(page: ft.Page) -> ft.View:
     )
 
 
-def checkout_container(page: ft.Page, cart: list) -> ft.Container:
+def checkout_container(page: ft.Page, cart: Cart) -> ft.Container:
+    session = get_sale_session(page)
+    payment = session.payment
+    payment.clear()
+    updates = get_scheduler(page)
+
     checkout_label=ft.Text(
         value="POS.AI", 
         size=24, 
         weight=ft.FontWeight.BOLD
     )
     
-    data_rows = []
-    for item_data in cart:
-        cells = []
-        for value in item_data:
-            cells.append(ft.DataCell(ft.Text(value)))
-        data_rows.append(ft.DataRow(cells=cells))
-    
     cart_values = ft.DataTable(
         columns=[
             ft.DataColumn(ft.Text("SKU")),
@@ -376,7 +470,7 @@ def checkout_container(page: ft.Page, cart: list) -> ft.Container:
             ft.DataColumn(ft.Text("MRP")),
             ft.DataColumn(ft.Text("Total"))
         ],
-        rows=data_rows,
+        rows=[cart_row(line) for line in cart],
         border=ft.border.all(1, "BLACK"),
         divider_thickness=2,
         width = 800
@@ -391,7 +485,7 @@ def checkout_container(page: ft.Page, cart: list) -> ft.Container:
     )
     
     grand_total = ft.Text(
-        value=f"₹ {sum(float(row.cells[4].content.value.replace('₹ ', '')) for row in cart_values.rows)}",
+        value=format_paise(cart.total),
         size=24,
         align=ft.Alignment.BOTTOM_RIGHT,
         color=ft.Colors.RED
@@ -412,7 +506,7 @@ def checkout_container(page: ft.Page, cart: list) -> ft.Container:
             size=16, 
             weight=ft.FontWeight.BOLD
         ),
-        on_click=lambda e: payment_type_choice(page, "UPI", cash_amount, change_amount, finalise_button),
+        on_click=updates.handler(lambda e: payment_type_choice(page, "UPI", cash_amount, change_amount, finalise_button, payment)),
         width=150,
         height=50,
         bgcolor=ft.Colors.BLACK_38,
@@ -425,7 +519,7 @@ def checkout_container(page: ft.Page, cart: list) -> ft.Container:
             size=16, 
             weight=ft.FontWeight.BOLD
         ),
-        on_click=lambda e: payment_type_choice(page, "CASH", cash_amount, change_amount, finalise_button),
+        on_click=updates.handler(lambda e: payment_type_choice(page, "CASH", cash_amount, change_amount, finalise_button, payment)),
         width=150,
         height=50,
         bgcolor=ft.Colors.BLACK_38,
@@ -437,7 +531,7 @@ def checkout_container(page: ft.Page, cart: list) -> ft.Container:
         width=200,
         height = 50,
         visible=False,
-        on_change=lambda e: on_cash_change(e, page, cash_amount, change_amount, grand_total)
+        on_change=updates.handler(lambda e: on_cash_change(e, page, cash_amount, change_amount, cart))
     )
     
     change_amount = ft.Text(
@@ -465,7 +559,7 @@ def checkout_container(page: ft.Page, cart: list) -> ft.Container:
             size=16, 
             weight=ft.FontWeight.BOLD
         ),
-        on_click=lambda e: log_payment(),
+        on_click=updates.handler(session.locked(lambda e: log_payment(page, cart, payment))),
         width=195,
         height=50,
         bgcolor=ft.Colors.BLACK_38,
@@ -521,7 +615,7 @@ def checkout_view(page: ft.Page) -> ft.View:
         horizontal_alignment=ft.CrossAxisAlignment.CENTER,
         bgcolor=ft.Colors.BLUE_GREY_700,
         controls=[
-            checkout_container(page, cart)
+            checkout_container(page, get_sale_session(page).cart)
         ]
     )
 
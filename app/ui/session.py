@@ -0,0 +1,85 @@
+"""
+Per-session state for the sale and checkout screens.
+
+One Flet server process serves every browser lane, so anything that belongs
+to a single customer (the cart, the chosen payment method) lives here, keyed
+by the Flet session's ID, and is dropped when the session closes. Process-wide
+state is limited to what is shared safely: the connection pools and the
+catalog cache.
+"""
+
+import logging
+import threading
+from dataclasses import dataclass, field
+
+from app.ui.cart import Cart
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class SaleSession:
+    """
+    State of one lane: its cart and the payment method picked at checkout.
+
+    The barcode pipeline delivers scans on timer threads while click handlers
+    run on Flet's handler threads, so every change to the cart, the rows
+    drawn from it and the sale inputs goes through ``locked``.
+    """
+    cart: Cart = field(default_factory=Cart)
+    payment: dict = field(default_factory=dict)
+    lock: threading.RLock = field(default_factory=threading.RLock, repr=False)
+
+    def locked(self, fn):
+        """
+        Wrap ``fn`` so that it runs holding this session's lock.
+        """
+        def run(*args, **kwargs):
+            with self.lock:
+                return fn(*args, **kwargs)
+        return run
+
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def session_key(page) -> str:
+    """
+    Key of ``page``'s session in per-lane registries.
+
+    Unlike ``id(page)``, which a new page may reuse once an old one is freed,
+    a session ID is never handed to another lane.
+    """
+    return page.session.id
+
+
+def get_sale_session(page) -> SaleSession:
+    """
+    Return the sale state of ``page``'s session, creating it on first use.
+    """
+    key = session_key(page)
+    session = _sessions.get(key)
+    if session is None:
+        with _sessions_lock:
+            session = _sessions.get(key)
+            if session is None:
+                session = _sessions[key] = SaleSession()
+    return session
+
+
+def end_sale_session(page) -> None:
+    """
+    Drop the sale state of ``page``'s session, e.g. when the session closes.
+    """
+    with _sessions_lock:
+        session = _sessions.pop(session_key(page), None)
+    if session is not None and session.cart:
+        logger.warning(f"Session closed with {len(session.cart)} unpaid cart line(s)")
+
+
+def active_sessions() -> int:
+    """
+    Number of sessions currently holding sale state.
+    """
+    return len(_sessions)
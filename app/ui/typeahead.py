@@ -0,0 +1,116 @@
+"""
+Product typeahead: a search field with a ranked list of matching products.
+
+Searches by name, SKU or description (``app/data/product_search.py``) once
+typing pauses for ``TYPEAHEAD_DEBOUNCE`` seconds, so a burst of keystrokes
+costs one query and one update. Results for text that has changed since are
+dropped. Enter picks the best match for the text in the field, searching
+right away if the shown results are for older text; a click picks any of them.
+"""
+
+import threading
+
+import flet as ft
+
+from app.data.product_search import search_products
+from app.ui.render import get_scheduler
+
+# Seconds typing must pause before the results are refreshed.
+TYPEAHEAD_DEBOUNCE = 0.12
+
+
+class ProductTypeahead:
+    """
+    A product search field that hands the picked product's SKU to ``on_pick``.
+    """
+
+    def __init__(self, page: ft.Page, on_pick, active: bool = None, label: str = "Search products",
+                 width: int = None, debounce: float = TYPEAHEAD_DEBOUNCE) -> None:
+        """
+        Initialize the typeahead.
+
+        Args:
+            page: The Flet page the field is on
+            on_pick: Called as ``on_pick(sku)`` with the chosen product
+            active: Only active (True) or inactive (False) products
+            label: Label of the search field
+            width: Width of the field and the result list
+            debounce: Seconds of silence before searching
+        """
+        self.on_pick = on_pick
+        self.active = active
+        self.debounce = debounce
+        self.updates = get_scheduler(page)
+        # (field text, matches found for it), replaced as one so a reader never
+        # pairs one search's text with another's matches.
+        self.found = ("", [])
+        self._timer = None
+        self._lock = threading.Lock()
+
+        self.field = ft.TextField(
+            label=label,
+            prefix_icon="search",
+            width=width,
+            on_change=lambda e: self._changed(),
+            on_submit=self.updates.handler(lambda e: self._pick_best()),
+        )
+        self.results = ft.Column(controls=[], spacing=0, width=width, visible=False)
+        self.control = ft.Column(controls=[self.field, self.results], spacing=2)
+
+    def _changed(self) -> None:
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+            self._timer = threading.Timer(self.debounce, self.refresh)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def refresh(self) -> None:
+        """
+        Search for the field's current text and show the results.
+        """
+        text = self.field.value or ""
+        matches = search_products(text, active=self.active)
+        if text != (self.field.value or ""):
+            return  # typed on meanwhile; the next search shows its own results
+        self.found = (text, matches)
+        self.results.controls = [self._result(row) for row in matches]
+        self.results.visible = bool(matches)
+        self.updates.request(self.results)
+
+    def _result(self, row: tuple) -> ft.ListTile:
+        sku, name, price, stock, active = row
+        details = f"{sku}   ₹ {price}   stock {stock}" + ("" if active else "   inactive")
+        return ft.ListTile(
+            title=ft.Text(name),
+            subtitle=ft.Text(details, size=12),
+            dense=True,
+            on_click=self.updates.handler(lambda e: self._pick(sku)),
+        )
+
+    def _pick_best(self) -> None:
+        text = self.field.value or ""
+        found_for, matches = self.found
+        if found_for != text:
+            # Enter before the debounced search caught up: find the best match now.
+            matches = search_products(text, limit=1, active=self.active)
+        if matches:
+            self._pick(matches[0][0])
+
+    def _pick(self, sku: str) -> None:
+        self.close()
+        self.field.value = ""
+        self.found = ("", [])
+        self.results.controls = []
+        self.results.visible = False
+        self.updates.request(self.field, self.results)
+        self.on_pick(sku)
+
+    def close(self) -> None:
+        """
+        Cancel a pending search, e.g. when the view is left.
+        """
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
@@ -0,0 +1,113 @@
+"""
+Retained views.
+
+Route changes used to clear ``page.views`` and rebuild every control (and
+re-run its queries) on each navigation. The registry builds a view on its
+first visit and hands back the same instance afterwards; views that show
+data register an ``on_show`` hook that refreshes only what changed.
+"""
+
+import logging
+import threading
+import time
+
+from app.ui.session import session_key
+
+logger = logging.getLogger(__name__)
+
+
+class ViewRegistry:
+    """
+    Builds each route's view once per page and keeps it for later visits.
+    """
+
+    def __init__(self, page) -> None:
+        self.page = page
+        self.builds = 0
+        self.reuses = 0
+        self._builders = {}
+        self._retained = set()
+        self._views = {}
+        self._on_show = {}
+        self._default = None
+
+    def add(self, route: str, builder, retain: bool = True, default: bool = False) -> None:
+        """
+        Register a route.
+
+        Args:
+            route: Route path, e.g. "/sale"
+            builder: Called as ``builder(page)``; returns the view
+            retain: Keep the built view for later visits
+            default: Route shown for unknown paths
+        """
+        self._builders[route] = builder
+        if retain:
+            self._retained.add(route)
+        if default or self._default is None:
+            self._default = route
+
+    def on_show(self, route: str, callback) -> None:
+        """
+        Call ``callback()`` whenever a retained ``route`` is shown again.
+        """
+        self._on_show[route] = callback
+
+    def show(self, route: str):
+        """
+        Return the view for ``route``, building it only on its first visit.
+        """
+        if route not in self._builders:
+            route = self._default
+
+        view = self._views.get(route)
+        if view is None:
+            start = time.perf_counter()
+            view = self._builders[route](self.page)
+            self.builds += 1
+            if route in self._retained:
+                self._views[route] = view
+            logger.debug(f"Built view {route} in {(time.perf_counter() - start) * 1e3:.1f} ms")
+        else:
+            self.reuses += 1
+            callback = self._on_show.get(route)
+            if callback is not None:
+                callback()
+        return view
+
+    def discard(self, route: str = None) -> None:
+        """
+        Forget one retained view (or all of them) so it is rebuilt on the next visit.
+        """
+        if route is None:
+            self._views.clear()
+            self._on_show.clear()
+        else:
+            self._views.pop(route, None)
+            self._on_show.pop(route, None)
+
+
+_registries = {}
+_registries_lock = threading.Lock()
+
+
+def get_views(page) -> ViewRegistry:
+    """
+    Return the view registry of ``page``, creating it on first use.
+    """
+    key = session_key(page)
+    registry = _registries.get(key)
+    if registry is None:
+        with _registries_lock:
+            registry = _registries.get(key)
+            if registry is None:
+                registry = _registries[key] = ViewRegistry(page)
+    return registry
+
+
+def drop_views(page) -> None:
+    """
+    Forget every view of ``page``, e.g. when its session closes.
+    """
+    with _registries_lock:
+        _registries.pop(session_key(page), None)
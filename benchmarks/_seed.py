@@ -0,0 +1,115 @@
+"""
+Helpers shared by the benchmark scripts: build a throwaway POS database with
+the production schema and a synthetic catalog.
+"""
+
+import logging
+import random
+import sqlite3
+import tempfile
+from pathlib import Path
+
+from app.data.database_init import DatabaseInitializer, configurations, tables, indexes, views, triggers
+
+# The initializer logs each database it creates at INFO; keep benchmark output readable.
+logging.getLogger("app.data.database_init").setLevel(logging.WARNING)
+
+CATEGORY_NAMES = ["Beverages", "Snacks", "Dairy", "Bakery", "Produce", "Household", "Personal Care", "Frozen"]
+
+
+def sku_for(i: int) -> str:
+    """
+    Deterministic 13-digit EAN-style SKU for catalog row ``i``.
+    """
+    return f"890{i:010d}"
+
+
+def create_database(directory: str = None) -> Path:
+    """
+    Create an empty database with the full schema in a temporary directory.
+
+    Returns:
+        Path: Path to the new database file
+    """
+    directory = directory or tempfile.mkdtemp(prefix="posai-bench-")
+    db_path = Path(directory) / "posai.db"
+    initializer = DatabaseInitializer(
+        db_path=str(db_path), conn=sqlite3.connect(db_path), config=configurations,
+        table=tables, index=indexes, view=views, trigger=triggers
+    )
+    if not initializer.initialize_database():
+        raise RuntimeError(f"Could not initialize benchmark database at {db_path}")
+    return db_path
+
+
+def seed_catalog(db_path: Path, products: int, seed: int = 42) -> None:
+    """
+    Fill CATEGORIES and PRODUCTS with ``products`` synthetic SKUs.
+    """
+    rng = random.Random(seed)
+    conn = sqlite3.connect(db_path)
+    conn.executemany("INSERT INTO CATEGORIES (NAME) VALUES (?)", [(name,) for name in CATEGORY_NAMES])
+
+    def rows():
+        for i in range(products):
+            cost = round(rng.uniform(5, 500), 2)
+            yield (
+                sku_for(i), f"Product {i}", rng.randint(1, len(CATEGORY_NAMES)),
+                cost, round(cost * rng.uniform(1.05, 1.6), 2), rng.randint(0, 200), 10
+            )
+
+    # Backdated, so benchmark writes stand out from the seed data by UPDATED_AT.
+    conn.executemany(
+        """INSERT INTO PRODUCTS (SKU, NAME, CATEGORY_ID, COST_PRICE, SELLING_PRICE, CURRENT_STOCK, REORDER_LEVEL,
+                                 CREATED_AT, UPDATED_AT)
+           VALUES (?, ?, ?, ?, ?, ?, ?, DATETIME('now', '-1 day'), DATETIME('now', '-1 day'))""",
+        rows()
+    )
+    conn.commit()
+    conn.close()
+
+
+def percentile(samples: list, pct: float) -> float:
+    """
+    Nearest-rank percentile of ``samples``.
+    """
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def seed_sales(db_path: Path, transactions: int, lines: int = 5, products: int = None, days: int = 90,
+               seed: int = 7) -> None:
+    """
+    Insert ``transactions`` completed sales of ``lines`` items each, spread over the last ``days`` days.
+
+    Rows go straight into TRANSACTIONS and TRANSACTION_ITEMS (stock is not
+    touched), so large histories load in seconds.
+    """
+    rng = random.Random(seed)
+    conn = sqlite3.connect(db_path)
+    if products is None:
+        products = conn.execute("SELECT COUNT(*) FROM PRODUCTS").fetchone()[0]
+    prices = dict(conn.execute("SELECT ID, SELLING_PRICE FROM PRODUCTS"))
+    first_id = (conn.execute("SELECT COALESCE(MAX(ID), 0) FROM TRANSACTIONS").fetchone()[0]) + 1
+
+    headers, items = [], []
+    for n in range(transactions):
+        created = f"-{rng.randint(0, days * 86400 - 1)} seconds"
+        basket = [(i + 1, rng.randint(1, 4)) for i in rng.sample(range(products), lines)]
+        subtotal = round(sum(prices[pid] * qty for pid, qty in basket), 2)
+        headers.append((first_id + n, f"SEED-{first_id + n:08d}", subtotal, subtotal, created, created))
+        items += [(first_id + n, pid, sku_for(pid - 1), f"Product {pid - 1}", qty, prices[pid]) for pid, qty in basket]
+
+    conn.executemany(
+        """INSERT INTO TRANSACTIONS (ID, TRANSACTION_NUMBER, SUBTOTAL, TOTAL_AMOUNT, STATUS, CREATED_AT, COMPLETED_AT)
+           VALUES (?, ?, ?, ?, 'COMPLETED', DATETIME('now', ?), DATETIME('now', ?))""",
+        headers
+    )
+    conn.executemany(
+        """INSERT INTO TRANSACTION_ITEMS (TRANSACTION_ID, PRODUCT_ID, SKU, PRODUCT_NAME, QUANTITY, UNIT_PRICE)
+           VALUES (?, ?, ?, ?, ?, ?)""",
+        items
+    )
+    conn.commit()
+    conn.close()
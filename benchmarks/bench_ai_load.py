@@ -0,0 +1,121 @@
+"""
+Load test of the whole assistant pipeline (intent router, answer cache, agent
+on the worker pool) with the deterministic fake LLM backend, so it runs on a
+machine with no network. Managers on several terminals ask a mix of routed,
+repeated and free-form questions while checkouts keep writing.
+
+The fake model sleeps ``--latency`` seconds per LLM call to stand in for a
+remote model. Needs the LangChain stack for the agent path.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_ai_load [--managers 8] [--questions 25] [--latency 0.2]
+"""
+
+import argparse
+import os
+import random
+import threading
+import time
+
+from app.data import products
+from app.data.transactions import SaleLine, commit_sale
+from benchmarks._seed import create_database, seed_catalog, sku_for, percentile
+
+QUESTIONS = [
+    # Answered by the intent router.
+    "What are today's sales?",
+    "What's low on stock?",
+    "Top 5 best-selling products",
+    # Go to the agent, then to the cache until their tables change.
+    "How many active products are there?",
+    "Which category has the most products?",
+    "What is the average selling price?",
+    "How many products are in the Dairy category with a price above 100?",
+]
+
+
+def manager(seed, count, samples, errors, barrier):
+    from app.ai.ai_assistant import submit_question
+
+    rng = random.Random(seed)
+    barrier.wait()
+    for _ in range(count):
+        question = rng.choice(QUESTIONS)
+        start = time.perf_counter()
+        answer = submit_question(question).result()
+        samples.append(time.perf_counter() - start)
+        if answer.startswith("AI Error"):
+            errors.append(answer)
+
+
+def cashier(catalog, stop):
+    rng = random.Random(0)
+    while not stop.is_set():
+        i = rng.randrange(catalog)
+        commit_sale([SaleLine(sku_for(i), f"Product {i}", 1, 10.0)], "CASH")
+        time.sleep(0.05)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--products", type=int, default=2000)
+    parser.add_argument("--managers", type=int, default=8)
+    parser.add_argument("--questions", type=int, default=25, help="questions per manager")
+    parser.add_argument("--latency", type=float, default=0.2, help="fake LLM seconds per call")
+    args = parser.parse_args()
+
+    os.environ["POSAI_LLM_BACKEND"] = "fake"
+    os.environ["POSAI_FAKE_LLM_LATENCY"] = str(args.latency)
+    db_path = create_database()
+    seed_catalog(db_path, args.products)
+    products.DB_PATH = db_path
+
+    from app.ai.answer_cache import get_answer_cache
+    from app.ai.intent_router import get_intent_router
+    from app.ai.query_engine import get_query_engine
+
+    try:
+        get_query_engine().warm()
+    except ImportError as e:
+        print(f"skipped: the agent needs the LangChain stack ({e})")
+        return
+
+    samples, errors = [], []
+    barrier = threading.Barrier(args.managers)
+    stop = threading.Event()
+    writer = threading.Thread(target=cashier, args=(args.products, stop), daemon=True)
+    writer.start()
+    threads = [
+        threading.Thread(target=manager, args=(seed, args.questions, samples, errors, barrier))
+        for seed in range(args.managers)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    stop.set()
+    writer.join()
+
+    print(f"{len(samples)} questions from {args.managers} managers in {elapsed:.1f}s "
+          f"({len(samples) / elapsed:.1f}/s), {len(errors)} errors")
+    print(f"latency: p50 {percentile(samples, 50) * 1e3:.1f} ms, p90 {percentile(samples, 90) * 1e3:.1f} ms, "
+          f"p99 {percentile(samples, 99) * 1e3:.1f} ms")
+    router = get_intent_router().stats()
+    print(f"router: {router['routed']}/{router['questions']} routed ({router['hit_rate']:.0%}), "
+          f"mean {router['mean_route_time'] * 1e3:.2f} ms")
+    cache = get_answer_cache().stats()
+    print(f"cache: {cache['hits']} hits, {cache['misses']} misses ({cache['hit_rate']:.0%}), "
+          f"{cache['stale']} stale, {cache['uncacheable']} uncacheable")
+    engine = get_query_engine().stats()
+    if engine["queries"]:
+        print(f"agent: {engine['queries']} runs, mean {engine['total']:.2f}s (llm {engine['llm']:.2f}s, "
+              f"sql {engine['sql'] * 1e3:.1f} ms)")
+    if errors:
+        print(f"first error: {errors[0]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Prompt cost of the chat assistant: the compact schema digest injected into
+the prompt versus the schema the toolkit agent discovers with its
+list/describe tool calls.
+
+It compares the size of the digest with the table definitions and sample
+rows the toolkit agent fetches (tokens estimated at 4 characters per token)
+and times building and re-reading the digest. It then asks the same
+questions in both modes and reports mean LLM turns, tool calls, prompt tokens
+and latency. The default ``fake`` backend runs offline (its token counts are
+estimates); ``--backend bedrock`` or ``local`` measures a real model. The
+agent runs need the LangChain stack.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_ai_prompt [--products 2000] [--backend fake] [--repeat 1]
+"""
+
+import argparse
+import sqlite3
+import statistics
+import time
+
+from app.ai.schema_context import get_schema_digest
+from benchmarks._seed import create_database, seed_catalog
+
+QUESTIONS = [
+    "How many active products are there?",
+    "Which category has the most products?",
+    "List the five products with the lowest stock.",
+    "What is the average selling price of Dairy products?",
+]
+
+# The toolkit's sql_db_schema output includes this many sample rows per table.
+SAMPLE_ROWS = 3
+
+
+def discovered_schema(db_path) -> str:
+    """
+    Approximate what the toolkit agent reads back: table names, then each
+    CREATE statement followed by a few sample rows.
+    """
+    conn = sqlite3.connect(db_path)
+    objects = conn.execute(
+        "SELECT NAME, SQL FROM sqlite_master "
+        "WHERE TYPE IN ('table', 'view') AND NAME NOT LIKE 'sqlite_%' ORDER BY NAME"
+    ).fetchall()
+    parts = [", ".join(name for name, _ in objects)]
+    for name, sql in objects:
+        cursor = conn.execute(f'SELECT * FROM "{name}" LIMIT {SAMPLE_ROWS}')
+        header = "\t".join(column[0] for column in cursor.description)
+        rows = "\n".join("\t".join(str(value) for value in row) for row in cursor)
+        parts.append(f"{sql}\n\n/*\n{SAMPLE_ROWS} rows from {name} table:\n{header}\n{rows}\n*/")
+    conn.close()
+    return "\n\n".join(parts)
+
+
+def offline(db_path) -> None:
+    start = time.perf_counter()
+    digest = get_schema_digest(db_path)
+    built = time.perf_counter() - start
+
+    cached = []
+    for _ in range(200):
+        start = time.perf_counter()
+        get_schema_digest(db_path)
+        cached.append(time.perf_counter() - start)
+
+    discovered = discovered_schema(db_path)
+    print(f"schema digest:      {len(digest):6d} chars (~{len(digest) // 4} tokens), "
+          f"built in {built * 1e3:.1f} ms, cached read {statistics.median(cached) * 1e6:.0f} us")
+    print(f"discovered schema:  {len(discovered):6d} chars (~{len(discovered) // 4} tokens), "
+          f"fetched over at least 2 extra LLM turns per question")
+
+
+def agent_runs(db_path, backend: str, repeat: int) -> None:
+    from app.ai.query_engine import AIQueryEngine
+
+    for label, schema_digest in (("toolkit agent", False), ("schema digest", True)):
+        engine = AIQueryEngine(db_path=db_path, backend=backend, schema_digest=schema_digest)
+        try:
+            engine.warm()
+        except Exception as e:
+            print(f"{label}: skipped ({e})")
+            continue
+
+        results = []
+        for _ in range(repeat):
+            for question in QUESTIONS:
+                results.append(engine.process_query(question))
+
+        print(f"{label}: {len(results)} questions, "
+              f"llm turns {statistics.mean(r.llm_calls for r in results):.1f}, "
+              f"tool calls {statistics.mean(r.tool_calls for r in results):.1f}, "
+              f"prompt tokens {statistics.mean(r.prompt_tokens for r in results):.0f}, "
+              f"latency {statistics.mean(r.total for r in results):.2f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--products", type=int, default=2000)
+    parser.add_argument("--backend", default="fake", choices=["fake", "local", "bedrock"])
+    parser.add_argument("--repeat", type=int, default=1)
+    args = parser.parse_args()
+
+    db_path = create_database()
+    seed_catalog(db_path, args.products)
+
+    offline(db_path)
+    agent_runs(db_path, args.backend, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Checkout commit latency while managers run heavy reports, with the reports on
+plain connections (one long read transaction each) versus the analytics
+reader pool (short read-only snapshots, chunked scans, giving way to writers).
+
+A cashier commits a small sale every ``--interval`` seconds while
+``--analysts`` threads repeatedly read the product performance report, the
+daily sales summary and an export of TRANSACTION_ITEMS, consuming rows
+slowly like a report screen. It reports commit p50/p99/max, the largest WAL
+file seen (a long snapshot keeps checkpoints from resetting it) and the
+reports completed.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_analytics [--products 5000] [--sales 20000] [--seconds 10]
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import threading
+import time
+
+from app.data import products
+from app.data.connection import close_pools, get_reader_pool
+from app.data.transactions import SaleLine, commit_sale
+from benchmarks._seed import create_database, seed_catalog, seed_sales, sku_for, percentile
+
+REPORT = "SELECT * FROM PRODUCT_PERFORMANCE"
+SUMMARY = "SELECT * FROM DAILY_SALES_SUMMARY"
+EXPORT = "SELECT * FROM TRANSACTION_ITEMS"
+
+# Rows the report screen takes at a time, and how long it spends on each batch.
+CHUNK = 500
+CONSUME_DELAY = 0.005
+
+
+def shared_analyst(db_path, stop, reports):
+    conn = sqlite3.connect(db_path, check_same_thread=False)
+    while not stop.is_set():
+        conn.execute("BEGIN")
+        for query in (REPORT, SUMMARY, EXPORT):
+            cursor = conn.execute(query)
+            while cursor.fetchmany(CHUNK):
+                time.sleep(CONSUME_DELAY)
+        conn.rollback()
+        reports.append(1)
+    conn.close()
+
+
+def pooled_analyst(db_path, stop, reports):
+    pool = get_reader_pool(db_path)
+    while not stop.is_set():
+        # Aggregated reports are read whole in one short snapshot, then consumed.
+        for query in (REPORT, SUMMARY):
+            rows = pool.query(query)
+            for _ in range(0, len(rows), CHUNK):
+                time.sleep(CONSUME_DELAY)
+        # Row-level exports are scanned in chunks, one snapshot each.
+        for _ in pool.scan(EXPORT, key="ID", chunk_size=CHUNK):
+            time.sleep(CONSUME_DELAY)
+        reports.append(1)
+
+
+def cashier(db_path, catalog, interval, stop, samples):
+    rng = random.Random(0)
+    while not stop.is_set():
+        basket = [SaleLine(sku_for(i), f"Product {i}", 1, 10.0) for i in rng.sample(range(catalog), 5)]
+        start = time.perf_counter()
+        commit_sale(basket, "CASH", db_path=db_path)
+        samples.append(time.perf_counter() - start)
+        time.sleep(interval)
+
+
+def run(label, analyst, args):
+    db_path = create_database()
+    seed_catalog(db_path, args.products)
+    seed_sales(db_path, args.sales)
+    products.DB_PATH = db_path
+    # Start from an empty WAL so its size shows what the run itself leaves behind.
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    samples, reports = [], []
+    stop = threading.Event()
+    threads = [threading.Thread(target=cashier, args=(db_path, args.products, args.interval, stop, samples))]
+    if analyst is not None:
+        threads += [threading.Thread(target=analyst, args=(db_path, stop, reports)) for _ in range(args.analysts)]
+    for thread in threads:
+        thread.start()
+
+    wal, largest_wal = f"{db_path}-wal", 0
+    deadline = time.monotonic() + args.seconds
+    while time.monotonic() < deadline:
+        if os.path.exists(wal):
+            largest_wal = max(largest_wal, os.path.getsize(wal))
+        time.sleep(0.05)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    print(f"{label:<22} n={len(samples):<5} p50 {percentile(samples, 50) * 1e3:6.2f} ms   "
+          f"p99 {percentile(samples, 99) * 1e3:6.2f} ms   max {max(samples) * 1e3:7.2f} ms   "
+          f"wal {largest_wal / 2**20:5.1f} MiB   reports {len(reports)}")
+    if analyst is pooled_analyst:
+        stats = get_reader_pool(db_path).stats()
+        print(f"{'':<22} {stats['snapshots']} snapshots, longest {stats['longest_snapshot'] * 1e3:.1f} ms, "
+              f"{stats['yield_time'] * 1e3:.1f} ms yielded to writers, {stats['interrupted']} interrupted")
+    close_pools()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--products", type=int, default=5000)
+    parser.add_argument("--sales", type=int, default=20_000, help="seeded past transactions")
+    parser.add_argument("--analysts", type=int, default=2)
+    parser.add_argument("--interval", type=float, default=0.02, help="seconds between sales")
+    parser.add_argument("--seconds", type=float, default=10.0)
+    args = parser.parse_args()
+
+    print(f"{args.products} products, {args.sales} past sales, {args.analysts} analysts, {args.seconds:.0f}s each")
+    run("checkouts only", None, args)
+    run("shared connections", shared_analyst, args)
+    run("analytics pool", pooled_analyst, args)
+
+
+if __name__ == "__main__":
+    main()
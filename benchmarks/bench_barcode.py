@@ -0,0 +1,72 @@
+"""
+Lookups per code and scan-to-cart latency of the barcode input pipeline, for
+simulated scanner bursts (with and without Enter) and manual typing.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_barcode [--scans 50]
+"""
+
+import argparse
+import random
+import time
+
+from app.data import products
+from app.data.products import get_product_by_sku
+from app.ui.barcode import BarcodePipeline
+from app.ui.cart import Cart, to_paise
+from benchmarks._seed import create_database, seed_catalog, sku_for
+
+
+def type_code(pipeline: BarcodePipeline, code: str, key_gap: float, enter: bool) -> None:
+    for i in range(1, len(code) + 1):
+        pipeline.key(code[:i])
+        time.sleep(key_gap)
+    if enter:
+        pipeline.submit(code)
+
+
+def run(label: str, codes: list, key_gap: float, enter: bool) -> None:
+    cart, lookups = Cart(), []
+
+    def on_scan(sku):
+        lookups.append(sku)
+        name, price = get_product_by_sku(sku)
+        cart.add(sku, name, 1, to_paise(price))
+
+    def on_preview(sku):
+        lookups.append(sku)
+        get_product_by_sku(sku)
+
+    pipeline = BarcodePipeline(on_scan, on_preview)
+    for code in codes:
+        type_code(pipeline, code, key_gap, enter)
+        # Idle between items, so a burst without Enter completes.
+        time.sleep(max(pipeline.scan_idle, pipeline.debounce) * 1.5)
+
+    stats = pipeline.stats()
+    latency = (f"scan-to-cart p50 {stats['latency_p50'] * 1e3:6.1f} ms   p99 {stats['latency_p99'] * 1e3:6.1f} ms"
+               if stats["latency_samples"] else "scan-to-cart n/a (typed)")
+    print(f"{label:<20} codes {len(codes):<4} keystrokes {stats['keystrokes']:<5} lookups {len(lookups):<4} "
+          f"in cart {sum(line.quantity for line in cart):<4} {latency}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--products", type=int, default=10_000)
+    parser.add_argument("--scans", type=int, default=50)
+    args = parser.parse_args()
+
+    db_path = create_database()
+    seed_catalog(db_path, args.products)
+    products.DB_PATH = db_path
+    rng = random.Random(3)
+    codes = [sku_for(rng.randrange(args.products)) for _ in range(args.scans)]
+
+    run("scanner + Enter", codes, 0.004, enter=True)
+    run("scanner, no Enter", codes, 0.004, enter=False)
+    run("typed + Enter", codes[:5], 0.12, enter=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+SKU lookup latency through the catalog cache (hits and misses) and the time it
+takes a price change committed by another process to become visible.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_catalog_cache [--products 100000] [--lookups 200000]
+"""
+
+import argparse
+import random
+import subprocess
+import sys
+import time
+
+from app.data import products
+from app.data.catalog_cache import get_catalog_cache
+from app.data.connection import close_pools
+from benchmarks._seed import create_database, seed_catalog, sku_for
+
+WRITER = """
+import sqlite3, sys
+conn = sqlite3.connect(sys.argv[1])
+conn.execute("UPDATE PRODUCTS SET SELLING_PRICE = ? WHERE SKU = ?", (float(sys.argv[3]), sys.argv[2]))
+conn.commit()
+"""
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--products", type=int, default=100_000)
+    parser.add_argument("--lookups", type=int, default=200_000)
+    parser.add_argument("--hot", type=int, default=5_000, help="number of fast-moving SKUs")
+    args = parser.parse_args()
+
+    db_path = create_database()
+    seed_catalog(db_path, args.products)
+    products.DB_PATH = db_path
+    cache = get_catalog_cache(db_path)
+
+    rng = random.Random(7)
+    hot = [sku_for(rng.randrange(args.products)) for _ in range(args.hot)]
+    print(f"{args.products} products, {len(hot)} hot SKUs ({db_path})")
+
+    start = time.perf_counter()
+    for sku in hot:
+        products.get_product_by_sku(sku)
+    miss = (time.perf_counter() - start) / len(hot)
+
+    skus = [rng.choice(hot) for _ in range(args.lookups)]
+    start = time.perf_counter()
+    for sku in skus:
+        cache.get(sku)
+    hit = (time.perf_counter() - start) / len(skus)
+
+    start = time.perf_counter()
+    for sku in skus:
+        products.get_product_by_sku(sku)
+    api_hit = (time.perf_counter() - start) / len(skus)
+
+    print(f"miss (SQLite read)         {miss * 1e6:8.2f} us")
+    print(f"hit  (CatalogCache.get)    {hit * 1e6:8.2f} us")
+    print(f"hit  (get_product_by_sku)  {api_hit * 1e6:8.2f} us")
+
+    # A price change committed by another process must show up without a restart.
+    target = hot[0]
+    new_price = products.get_product_by_sku(target)[1] + 1
+    subprocess.run([sys.executable, "-c", WRITER, str(db_path), target, str(new_price)], check=True)
+    start = time.perf_counter()
+    while products.get_product_by_sku(target)[1] != new_price:
+        time.sleep(0.001)
+    print(f"cross-process change visible after {(time.perf_counter() - start) * 1e3:.0f} ms "
+          f"(check interval {cache.check_interval * 1e3:.0f} ms)")
+    print(cache.stats())
+
+    close_pools()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Throughput of the streaming catalog importer/exporter, and the commit latency
+seen by another terminal writing to the database while the import runs.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_catalog_import [--products 200000]
+"""
+
+import argparse
+import csv
+import random
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from app.data.catalog_io import import_catalog, export_catalog
+from benchmarks._seed import CATEGORY_NAMES, create_database, sku_for, percentile
+
+
+def write_catalog_csv(path: Path, products: int, markup: float = 1.3) -> None:
+    rng = random.Random(42)
+    with open(path, "w", newline="") as handle:
+        writer = csv.writer(handle)
+        writer.writerow(["SKU", "NAME", "CATEGORY", "COST_PRICE", "SELLING_PRICE", "CURRENT_STOCK", "REORDER_LEVEL"])
+        for i in range(products):
+            cost = round(rng.uniform(5, 500), 2)
+            writer.writerow([sku_for(i), f"Product {i}", rng.choice(CATEGORY_NAMES), cost,
+                             round(cost * markup, 2), rng.randint(0, 200), 10])
+
+
+def concurrent_writer(db_path, stop, samples):
+    """
+    Stand-in for a checkout on another terminal: small write transactions.
+    """
+    conn = sqlite3.connect(db_path, timeout=10)
+    while not stop.is_set():
+        start = time.perf_counter()
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute("UPDATE CATEGORIES SET DESCRIPTION = ? WHERE ID = 1", (str(start),))
+        conn.commit()
+        samples.append(time.perf_counter() - start)
+        time.sleep(0.02)
+    conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--products", type=int, default=200_000)
+    args = parser.parse_args()
+
+    db_path = create_database()
+    source = db_path.parent / "catalog.csv"
+    repriced = db_path.parent / "repriced.csv"
+    write_catalog_csv(source, args.products)
+    write_catalog_csv(repriced, args.products, markup=1.35)
+    print(f"{args.products} products ({db_path})")
+
+    fresh = import_catalog(source, db_path)
+    print(f"import (insert)  {fresh}")
+
+    stop, samples = threading.Event(), []
+    writer = threading.Thread(target=concurrent_writer, args=(db_path, stop, samples))
+    writer.start()
+    update = import_catalog(repriced, db_path)
+    stop.set()
+    writer.join()
+    print(f"import (update)  {update}")
+    print(f"import (same)    {import_catalog(repriced, db_path)}")
+    print(f"concurrent commits during update: {len(samples)}, "
+          f"p50 {percentile(samples, 50) * 1e3:.1f} ms, p99 {percentile(samples, 99) * 1e3:.1f} ms, "
+          f"max {max(samples) * 1e3:.1f} ms")
+
+    for suffix in (".csv", ".jsonl"):
+        print(f"export ({suffix[1:]})   {export_catalog(db_path.parent / ('export' + suffix), db_path)}")
+
+
+if __name__ == "__main__":
+    main()
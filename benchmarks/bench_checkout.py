@@ -0,0 +1,74 @@
+"""
+Commit latency of the checkout engine for large baskets, alone and while a
+bulk catalog import holds the write lock in short bursts.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_checkout [--products 50000] [--lines 200] [--sales 200]
+"""
+
+import argparse
+import random
+import threading
+import time
+
+from app.data import products
+from app.data.catalog_io import import_catalog
+from app.data.transactions import SaleLine, commit_sale
+from benchmarks._seed import create_database, seed_catalog, sku_for, percentile
+from benchmarks.bench_catalog_import import write_catalog_csv
+
+
+def random_basket(rng: random.Random, catalog: int, lines: int) -> list:
+    return [
+        SaleLine(sku_for(i), f"Product {i}", rng.randint(1, 5), round(rng.uniform(10, 500), 2))
+        for i in rng.sample(range(catalog), lines)
+    ]
+
+
+def run_sales(db_path, rng, catalog: int, lines: int, sales: int) -> list:
+    samples = []
+    for _ in range(sales):
+        basket = random_basket(rng, catalog, lines)
+        start = time.perf_counter()
+        commit_sale(basket, payment_method="UPI", db_path=db_path)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def report(label: str, samples: list) -> None:
+    print(f"{label:<28} n={len(samples):<5} p50 {percentile(samples, 50) * 1e3:6.2f} ms   "
+          f"p99 {percentile(samples, 99) * 1e3:6.2f} ms   max {max(samples) * 1e3:6.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--products", type=int, default=50_000)
+    parser.add_argument("--lines", type=int, default=200)
+    parser.add_argument("--sales", type=int, default=200)
+    args = parser.parse_args()
+
+    db_path = create_database()
+    seed_catalog(db_path, args.products)
+    products.DB_PATH = db_path
+    rng = random.Random(7)
+    print(f"{args.products} products, {args.lines}-line baskets ({db_path})")
+
+    run_sales(db_path, rng, args.products, args.lines, 10)
+    report("checkout (idle)", run_sales(db_path, rng, args.products, args.lines, args.sales))
+    report("checkout (1-line)", run_sales(db_path, rng, args.products, 1, args.sales))
+
+    # Reprice the whole catalog in the background while sales keep committing.
+    source = db_path.parent / "repriced.csv"
+    write_catalog_csv(source, args.products, markup=1.4)
+    importer = threading.Thread(target=import_catalog, args=(source, db_path))
+    importer.start()
+    samples = []
+    while importer.is_alive():
+        samples += run_sales(db_path, rng, args.products, args.lines, 1)
+    importer.join()
+    report("checkout (during import)", samples)
+
+
+if __name__ == "__main__":
+    main()
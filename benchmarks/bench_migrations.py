@@ -0,0 +1,92 @@
+"""
+Startup schema check and checkout latency during a PRODUCTS rebuild.
+
+Startup: running every CREATE ... IF NOT EXISTS statement of
+``initialize_database`` on an existing database versus ``migrate``'s single
+``user_version`` read. Rebuild: a cashier commits small sales while PRODUCTS
+is rebuilt in one transaction (the old copy-drop-rename recipe) and then in
+batches by ``rebuild_table``; it reports the rebuild time and commit
+p50/p99/max while each ran.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_migrations [--products 200000] [--repeat 50]
+"""
+
+import argparse
+import random
+import sqlite3
+import statistics
+import threading
+import time
+
+from app.data import products
+from app.data.connection import close_pools
+from app.data.database_init import (
+    SCHEMA_VERSION, DatabaseInitializer, configurations, indexes, tables, triggers, views
+)
+from app.data.migrations import migrate, rebuild_table
+from app.data.transactions import SaleLine, commit_sale
+from benchmarks._seed import create_database, seed_catalog, sku_for, percentile
+
+# PRODUCTS as db_init.py creates it: no price defaults.
+LEGACY_PRODUCTS = tables["PRODUCTS"].replace(" NOT NULL DEFAULT 0.00", " NOT NULL")
+
+
+def cashier(db_path, catalog, stop, samples):
+    rng = random.Random(0)
+    while not stop.is_set():
+        basket = [SaleLine(sku_for(i), f"Product {i}", 1, 10.0) for i in rng.sample(range(catalog), 3)]
+        start = time.perf_counter()
+        commit_sale(basket, "CASH", db_path=db_path)
+        samples.append(time.perf_counter() - start)
+        time.sleep(0.01)
+
+
+def during_rebuild(label, db_path, catalog, definition, batch_size):
+    samples, stop = [], threading.Event()
+    thread = threading.Thread(target=cashier, args=(db_path, catalog, stop, samples))
+    thread.start()
+    time.sleep(0.2)
+    samples.clear()
+    start = time.perf_counter()
+    rebuild_table(db_path, "PRODUCTS", definition, SCHEMA_VERSION, batch_size=batch_size)
+    seconds = time.perf_counter() - start
+    stop.set()
+    thread.join()
+    print(f"{label:<18} {seconds:6.2f}s   n={len(samples):<4} p50 {percentile(samples, 50) * 1e3:6.2f} ms   "
+          f"p99 {percentile(samples, 99) * 1e3:7.2f} ms   max {max(samples) * 1e3:7.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--products", type=int, default=200_000)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    db_path = create_database()
+    seed_catalog(db_path, args.products)
+    products.DB_PATH = db_path
+    print(f"{args.products} products ({db_path})")
+
+    samples = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        DatabaseInitializer(db_path=str(db_path), conn=sqlite3.connect(db_path), config=configurations,
+                            table=tables, index=indexes, view=views, trigger=triggers).initialize_database()
+        samples.append(time.perf_counter() - start)
+    print(f"{'initialize_database':<18} {statistics.median(samples) * 1e3:8.3f} ms per start")
+    samples = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        migrate(db_path)
+        samples.append(time.perf_counter() - start)
+    print(f"{'migrate (current)':<18} {statistics.median(samples) * 1e3:8.3f} ms per start")
+
+    during_rebuild("one transaction", db_path, args.products, LEGACY_PRODUCTS, batch_size=10 ** 9)
+    during_rebuild("batched", db_path, args.products, tables["PRODUCTS"], batch_size=5000)
+    close_pools()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Page latency of the inventory browser: keyset pages against LIMIT/OFFSET.
+
+Reads one page at increasing depths of a large catalog with ``OFFSET`` and
+with ``product_pages.browse_products``, then walks the whole catalog page by
+page in each sort (and with a category and a rare stock filter) and reports
+the per-page p50/p99/max.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_product_pages [--products 200000] [--page-size 100]
+"""
+
+import argparse
+import sqlite3
+import time
+
+from app.data import product_pages, products
+from app.data.connection import close_pools
+from app.data.migrations import migrate
+from benchmarks._seed import create_database, seed_catalog, percentile
+
+OFFSET_SQL = f"SELECT {', '.join(product_pages.COLUMNS)} FROM PRODUCTS ORDER BY NAME, ID LIMIT ? OFFSET ?"
+
+
+def timed(call, repeat=5):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        call()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def walk(label, page_size, **filters):
+    samples, rows, key = [], 0, None
+    while True:
+        start = time.perf_counter()
+        page = product_pages.browse_products(key=key, limit=page_size, **filters)
+        samples.append(time.perf_counter() - start)
+        rows += len(page)
+        if len(page) < page_size:
+            break
+        key = product_pages.row_key(filters.get("sort", "name"), page[-1])
+    print(f"{label:<24} {rows:>7} rows {len(samples):>5} pages   p50 {percentile(samples, 50) * 1e3:6.2f} ms   "
+          f"p99 {percentile(samples, 99) * 1e3:6.2f} ms   max {max(samples) * 1e3:7.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--products", type=int, default=200_000)
+    parser.add_argument("--page-size", type=int, default=product_pages.PAGE_SIZE)
+    args = parser.parse_args()
+
+    db_path = create_database()
+    seed_catalog(db_path, args.products)
+    products.DB_PATH = db_path
+    migrate(db_path)
+    conn = sqlite3.connect(db_path)
+    conn.execute("ANALYZE")
+    print(f"{args.products} products ({db_path})")
+
+    print(f"\n{'depth (rows)':<14} {'OFFSET':>10} {'keyset':>10}")
+    depths = [0, 100, 1_000, 10_000, 100_000, args.products - args.page_size]
+    for depth in sorted({depth for depth in depths if 0 <= depth < args.products}):
+        after = conn.execute("SELECT NAME, ID FROM PRODUCTS ORDER BY NAME, ID LIMIT 1 OFFSET ?",
+                             (depth - 1,)).fetchone() if depth else None
+        offset = timed(lambda: conn.execute(OFFSET_SQL, (args.page_size, depth)).fetchall())
+        keyset = timed(lambda: product_pages.browse_products(key=after, limit=args.page_size))
+        print(f"{depth:<14} {offset * 1e3:8.2f} ms {keyset * 1e3:7.2f} ms")
+    conn.close()
+
+    print()
+    for sort in product_pages.SORTS:
+        walk(f"sort {sort}", args.page_size, sort=sort)
+    walk("category 1 by name", args.page_size, category_id=1)
+    walk("category 1 by stock", args.page_size, sort="stock", category_id=1)
+    walk("out of stock by name", args.page_size, stock="out")
+    walk("active, low by updated", args.page_size, sort="updated", stock="low", active=True)
+    close_pools()
+
+
+if __name__ == "__main__":
+    main()
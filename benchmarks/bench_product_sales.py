@@ -0,0 +1,121 @@
+"""
+Product report latency with sales grouped from TRANSACTION_ITEMS on every
+read (the old PRODUCT_PERFORMANCE definition) versus the trigger-maintained
+PRODUCT_SALES aggregate: top sellers, slow movers and margin by category.
+Also times the checkout commit with and without the per-product triggers.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_product_sales [--products 5000] [--sales 100000] [--lines 3]
+"""
+
+import argparse
+import random
+import sqlite3
+import statistics
+import time
+
+from app.data import products, transactions
+from app.data.transactions import SaleLine, commit_sale
+from benchmarks._seed import create_database, seed_catalog, seed_sales, sku_for, percentile
+
+# The grouped subquery PRODUCT_PERFORMANCE used to run, profit at today's cost.
+GROUPED = """SELECT P.ID, P.NAME, P.CATEGORY_ID,
+                    COALESCE(SALES.TOTAL_QUANTITY_SOLD, 0) AS TOTAL_QUANTITY_SOLD,
+                    COALESCE(SALES.TOTAL_REVENUE, 0) AS TOTAL_REVENUE,
+                    COALESCE(SALES.TOTAL_PROFIT, 0) AS TOTAL_PROFIT,
+                    SALES.LAST_SOLD_AT
+             FROM PRODUCTS P
+             LEFT JOIN (
+                 SELECT TI.PRODUCT_ID, SUM(TI.QUANTITY) AS TOTAL_QUANTITY_SOLD, SUM(TI.LINE_TOTAL) AS TOTAL_REVENUE,
+                        SUM(TI.LINE_TOTAL - (TI.QUANTITY * P2.COST_PRICE)) AS TOTAL_PROFIT,
+                        MAX(T.CREATED_AT) AS LAST_SOLD_AT
+                 FROM TRANSACTION_ITEMS TI
+                 JOIN TRANSACTIONS T ON TI.TRANSACTION_ID = T.ID
+                 JOIN PRODUCTS P2 ON TI.PRODUCT_ID = P2.ID
+                 WHERE T.STATUS = 'COMPLETED'
+                 GROUP BY TI.PRODUCT_ID
+             ) SALES ON P.ID = SALES.PRODUCT_ID
+             WHERE P.IS_ACTIVE = 1"""
+
+AGGREGATE = """SELECT P.ID, P.NAME, P.CATEGORY_ID, PS.TOTAL_QUANTITY_SOLD, PS.TOTAL_REVENUE, PS.TOTAL_PROFIT,
+                      PS.LAST_SOLD_AT
+               FROM PRODUCT_SALES PS CROSS JOIN PRODUCTS P ON P.ID = PS.PRODUCT_ID
+               WHERE +P.IS_ACTIVE = 1"""
+
+REPORTS = [
+    ("top 10 by revenue",
+     f"SELECT NAME, TOTAL_REVENUE FROM ({GROUPED}) ORDER BY TOTAL_REVENUE DESC LIMIT 10",
+     f"{AGGREGATE} ORDER BY PS.TOTAL_REVENUE DESC LIMIT 10"),
+    ("top 10 by profit",
+     f"SELECT NAME, TOTAL_PROFIT FROM ({GROUPED}) ORDER BY TOTAL_PROFIT DESC LIMIT 10",
+     f"{AGGREGATE} ORDER BY PS.TOTAL_PROFIT DESC LIMIT 10"),
+    ("slow movers (30d)",
+     f"SELECT NAME, LAST_SOLD_AT FROM ({GROUPED}) WHERE LAST_SOLD_AT < DATETIME('now', '-30 days')",
+     f"{AGGREGATE} AND PS.LAST_SOLD_AT < DATETIME('now', '-30 days')"),
+    ("margin by category",
+     f"SELECT CATEGORY_ID, SUM(TOTAL_PROFIT) / SUM(TOTAL_REVENUE) FROM ({GROUPED}) GROUP BY CATEGORY_ID",
+     "SELECT CATEGORY_ID, SUM(TOTAL_PROFIT) / SUM(TOTAL_REVENUE) FROM PRODUCT_SALES PS "
+     "JOIN PRODUCTS P ON P.ID = PS.PRODUCT_ID GROUP BY CATEGORY_ID"),
+]
+
+
+def timed(function, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def checkouts(db_path, catalog: int, lines: int, count: int) -> list:
+    rng = random.Random(5)
+    samples = []
+    for _ in range(count):
+        basket = [SaleLine(sku_for(i), f"Product {i}", 1, 10.0) for i in rng.sample(range(catalog), lines)]
+        start = time.perf_counter()
+        commit_sale(basket, "CASH", db_path=db_path)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--products", type=int, default=5000)
+    parser.add_argument("--sales", type=int, default=100_000)
+    parser.add_argument("--lines", type=int, default=3, help="items per seeded sale")
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    db_path = create_database()
+    seed_catalog(db_path, args.products)
+    start = time.perf_counter()
+    seed_sales(db_path, args.sales, lines=args.lines, products=args.products, days=args.days)
+    print(f"{args.products} products, {args.sales * args.lines} sale lines seeded in "
+          f"{time.perf_counter() - start:.1f}s ({db_path})")
+    products.DB_PATH = db_path
+
+    conn = sqlite3.connect(db_path)
+    for label, old, new in REPORTS:
+        grouped = timed(lambda: conn.execute(old).fetchall(), args.repeat)
+        aggregate = timed(lambda: conn.execute(new).fetchall(), args.repeat)
+        print(f"{label:<20} grouped {grouped * 1e3:8.2f} ms   PRODUCT_SALES {aggregate * 1e3:7.3f} ms")
+    conn.close()
+
+    checkouts(db_path, args.products, 5, 20)
+    with_triggers = checkouts(db_path, args.products, 5, 300)
+    with sqlite3.connect(db_path) as conn:
+        for (name,) in conn.execute("SELECT NAME FROM sqlite_master WHERE TYPE = 'trigger' "
+                                    "AND (NAME LIKE 'ROLLUP_ITEM_%' OR NAME LIKE 'ROLLUP_PRODUCT_%')").fetchall():
+            conn.execute(f"DROP TRIGGER {name}")
+    # Checkout adds a sale's items to PRODUCT_SALES itself; leave that out too.
+    transactions.ADD_PRODUCT_SALES = "SELECT :transaction_id"
+    without_triggers = checkouts(db_path, args.products, 5, 300)
+    for label, samples in (("checkout (5 lines)", with_triggers), ("  no product rollup", without_triggers)):
+        print(f"{label:<20} p50 {percentile(samples, 50) * 1e3:6.2f} ms   p99 {percentile(samples, 99) * 1e3:6.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
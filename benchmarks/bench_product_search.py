@@ -0,0 +1,109 @@
+"""
+Typeahead latency of the full-text product search against ``LIKE '%x%'``.
+
+Seeds a catalog with varied product names (brand, descriptor, product, pack
+size), then types product names and SKUs one character at a time and times
+``product_search.search_products`` for every prefix the typeahead would send.
+The names of ten of them are also typed into an unranked ``LIKE`` over
+PRODUCTS for comparison.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_product_search [--products 200000] [--typed 200]
+"""
+
+import argparse
+import random
+import sqlite3
+import time
+
+from app.data import product_search, products
+from app.data.connection import close_pools
+from benchmarks._seed import create_database, seed_catalog, sku_for, percentile
+
+BRANDS = ("Amul Tata Nestle Britannia Parle Haldiram Dabur Patanjali ITC Aashirvaad Fortune Saffola Surf Ariel "
+          "Colgate Dettol Lifebuoy Lux Pears Maggi Kissan Heritage Nandini Milma Aavin Everest MDH Catch Bru "
+          "Taj Brooke Lipton Horlicks Bournvita Kelloggs Quaker Sunfeast Bingo Lays Kurkure Cadbury Dairy Mother "
+          "Godrej Vim Pril Rin Tide Nirma Ghadi Wheel Harpic Lizol Odonil Good Knight Mortein Himalaya Vicco "
+          "Borosil Prestige Milton Cello Eveready Philips Havells").split()
+DESCRIPTORS = ("Fresh Organic Classic Spicy Sweet Salted Roasted Premium Lite Extra Golden Green Red White Brown "
+               "Crunchy Creamy Instant Masala Plain Toned Double Whole Lemon Mint Ginger Honey Chocolate Vanilla "
+               "Strawberry Mango Herbal Active Gentle Sensitive Cool Power Total Ultra").split()
+PRODUCTS = ("Milk Butter Paneer Curd Ghee Cheese Biscuits Cookies Rusk Chips Namkeen Bhujia Atta Maida Besan Rice "
+            "Poha Dal Rajma Chana Oil Sugar Salt Jaggery Tea Coffee Noodles Pasta Oats Cornflakes Muesli Juice "
+            "Water Soda Bread Bun Eggs Jam Ketchup Pickle Papad Soap Shampoo Conditioner Toothpaste Toothbrush "
+            "Facewash Cream Lotion Talc Deodorant Detergent Dishwash Cleaner Freshener Repellent Coil Candle "
+            "Matchbox Bulb Battery Tumbler Bottle Lunchbox Banana Apple Onion Potato Tomato Garlic Ginger "
+            "Coriander Spinach Carrot Cabbage Cauliflower Brinjal Okra Lemon Coconut Grapes Orange Papaya "
+            "Pomegranate Chilli Turmeric Cumin Cardamom Cloves Pepper").split()
+SIZES = ("50g 100g 200g 250g 500g 1kg 2kg 5kg 100ml 200ml 250ml 500ml 1l 2l 5l pack-of-4 pack-of-6 family-pack "
+         "loose per-dozen").split()
+
+LIKE_SQL = """SELECT SKU, NAME, SELLING_PRICE, CURRENT_STOCK, IS_ACTIVE FROM PRODUCTS
+              WHERE NAME LIKE :pattern OR SKU LIKE :pattern OR DESCRIPTION LIKE :pattern
+              LIMIT 10"""
+
+
+def product_name(rng) -> str:
+    return f"{rng.choice(BRANDS)} {rng.choice(DESCRIPTORS)} {rng.choice(PRODUCTS)} {rng.choice(SIZES).replace('-', ' ')}"
+
+
+def time_search(text, **kwargs) -> float:
+    start = time.perf_counter()
+    product_search.search_products(text, **kwargs)
+    return time.perf_counter() - start
+
+
+def report(label, samples):
+    print(f"{label:<26} n={len(samples):<6} p50 {percentile(samples, 50) * 1e3:6.2f} ms   "
+          f"p99 {percentile(samples, 99) * 1e3:6.2f} ms   max {max(samples) * 1e3:7.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--products", type=int, default=200_000)
+    parser.add_argument("--typed", type=int, default=200, help="product names and SKUs typed")
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    db_path = create_database()
+    seed_catalog(db_path, args.products)
+    products.DB_PATH = db_path
+    names = [product_name(rng) for _ in range(args.products)]
+    conn = sqlite3.connect(db_path)
+    start = time.perf_counter()
+    conn.executemany("UPDATE PRODUCTS SET NAME = ? WHERE SKU = ?", ((name, sku_for(i)) for i, name in enumerate(names)))
+    conn.commit()
+    print(f"{args.products} products ({db_path}); renamed through the triggers in {time.perf_counter() - start:.1f}s")
+    start = time.perf_counter()
+    conn.execute("INSERT INTO PRODUCTS_FTS (PRODUCTS_FTS) VALUES ('rebuild')")
+    conn.commit()
+    print(f"Full index rebuild (migration 6): {time.perf_counter() - start:.2f}s\n")
+
+    targets = rng.sample(range(args.products), args.typed)
+    typed_names, typed_skus, active_only = [], [], []
+    for i in targets:
+        name, sku = names[i].lower(), sku_for(i)
+        for end in range(product_search.MIN_QUERY_LENGTH, len(name) + 1):
+            typed_names.append(time_search(name[:end]))
+            active_only.append(time_search(name[:end], active=True))
+        for end in range(product_search.MIN_QUERY_LENGTH, len(sku) + 1):
+            typed_skus.append(time_search(sku[:end]))
+    report("typing names", typed_names)
+    report("typing names, active only", active_only)
+    report("typing SKUs", typed_skus)
+
+    like = []
+    for i in targets[:10]:
+        name = names[i].lower()
+        for end in range(product_search.MIN_QUERY_LENGTH, len(name) + 1):
+            start = time.perf_counter()
+            conn.execute(LIKE_SQL, {"pattern": f"%{name[:end]}%"}).fetchall()
+            like.append(time.perf_counter() - start)
+    report("typing names with LIKE", like)
+    conn.close()
+    close_pools()
+
+
+if __name__ == "__main__":
+    main()
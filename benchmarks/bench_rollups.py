@@ -0,0 +1,110 @@
+"""
+Sales report latency over years of history: grouping TRANSACTIONS (the old
+DAILY_SALES_SUMMARY definition) versus reading the trigger-maintained
+SALES_HOURLY/SALES_DAILY/SALES_MONTHLY rollups. Also times the rollup
+rebuild and the checkout commit with and without the rollup triggers.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_rollups [--sales 300000] [--days 1095] [--repeat 20]
+"""
+
+import argparse
+import random
+import sqlite3
+import statistics
+import time
+
+from app.data import products, transactions
+from app.data.rollups import rebuild_rollups, sales_totals
+from app.data.transactions import SaleLine, commit_sale
+from benchmarks._seed import create_database, seed_catalog, seed_sales, sku_for, percentile
+
+# The view as it was: every read groups all completed transactions.
+OLD_DAILY = """SELECT DATE(CREATED_AT) as SALE_DATE, COUNT(*), SUM(SUBTOTAL), SUM(TAX_AMOUNT),
+                      SUM(DISCOUNT_AMOUNT), SUM(TOTAL_AMOUNT), AVG(TOTAL_AMOUNT)
+               FROM TRANSACTIONS WHERE STATUS = 'COMPLETED'
+               GROUP BY DATE(CREATED_AT) ORDER BY SALE_DATE DESC"""
+
+REPORTS = [
+    ("last 30 days", f"SELECT * FROM ({OLD_DAILY}) WHERE SALE_DATE >= DATE('now', '-30 days')",
+     "SELECT * FROM DAILY_SALES_SUMMARY WHERE SALE_DATE >= DATE('now', '-30 days')"),
+    ("all days", OLD_DAILY, "SELECT * FROM DAILY_SALES_SUMMARY"),
+    ("by month", """SELECT STRFTIME('%Y-%m', CREATED_AT), COUNT(*), SUM(TOTAL_AMOUNT) FROM TRANSACTIONS
+                    WHERE STATUS = 'COMPLETED' GROUP BY 1""",
+     "SELECT PERIOD, TRANSACTION_COUNT, TOTAL_REVENUE FROM SALES_MONTHLY"),
+]
+
+# The intent router's query before the rollups.
+RAW_RANGE = """SELECT COUNT(*), SUM(SUBTOTAL), SUM(TAX_AMOUNT), SUM(DISCOUNT_AMOUNT), SUM(TOTAL_AMOUNT)
+               FROM TRANSACTIONS WHERE STATUS = 'COMPLETED' AND CREATED_AT >= ? AND CREATED_AT < ?"""
+
+
+def timed(function, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def checkouts(db_path, catalog: int, count: int) -> list:
+    rng = random.Random(3)
+    samples = []
+    for _ in range(count):
+        basket = [SaleLine(sku_for(i), f"Product {i}", 1, 10.0) for i in rng.sample(range(catalog), 3)]
+        start = time.perf_counter()
+        commit_sale(basket, "CASH", db_path=db_path)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--products", type=int, default=2000)
+    parser.add_argument("--sales", type=int, default=300_000)
+    parser.add_argument("--days", type=int, default=1095, help="days of history")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    db_path = create_database()
+    seed_catalog(db_path, args.products)
+    start = time.perf_counter()
+    seed_sales(db_path, args.sales, lines=1, days=args.days)
+    print(f"{args.sales} sales over {args.days} days seeded in {time.perf_counter() - start:.1f}s ({db_path})")
+    products.DB_PATH = db_path
+
+    conn = sqlite3.connect(db_path)
+    for label, old, new in REPORTS:
+        grouped = timed(lambda: conn.execute(old).fetchall(), args.repeat)
+        rollup = timed(lambda: conn.execute(new).fetchall(), args.repeat)
+        print(f"{label:<14} grouped {grouped * 1e3:8.2f} ms   rollup {rollup * 1e3:7.3f} ms")
+
+    for days in (1, 30, 365):
+        bounds = (
+            conn.execute(f"SELECT DATETIME('now', '-{days} days', '+30 minutes', 'start of day', '-330 minutes')").fetchone()[0],
+            conn.execute("SELECT DATETIME('now')").fetchone()[0],
+        )
+        raw = timed(lambda: conn.execute(RAW_RANGE, bounds).fetchone(), args.repeat)
+        mixed = timed(lambda: sales_totals(conn, *bounds), args.repeat)
+        print(f"{days:>3} local days  grouped      {raw * 1e3:8.2f} ms   hourly rollup + edges {mixed * 1e3:7.3f} ms")
+    conn.close()
+
+    counts = rebuild_rollups(db_path)
+    print(f"rebuild        {counts['seconds']:.2f}s")
+
+    checkouts(db_path, args.products, 20)
+    with_triggers = checkouts(db_path, args.products, 300)
+    with sqlite3.connect(db_path) as conn:
+        for (name,) in conn.execute("SELECT NAME FROM sqlite_master WHERE TYPE = 'trigger' AND NAME LIKE 'ROLLUP_%'").fetchall():
+            conn.execute(f"DROP TRIGGER {name}")
+    # Checkout adds a sale's items to PRODUCT_SALES itself; leave that out too.
+    transactions.ADD_PRODUCT_SALES = "SELECT :transaction_id"
+    without_triggers = checkouts(db_path, args.products, 300)
+    for label, samples in (("checkout", with_triggers), ("  no rollups", without_triggers)):
+        print(f"{label:<14} p50 {percentile(samples, 50) * 1e3:6.2f} ms   p99 {percentile(samples, 99) * 1e3:6.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
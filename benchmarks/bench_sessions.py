@@ -0,0 +1,127 @@
+"""
+Load test for one server process running many lanes: each lane is a thread
+with its own session that scans a basket and checks out, concurrently with
+every other lane. Verifies no line leaks between carts and reports latencies.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_sessions [--lanes 24] [--sales 20] [--lines 30]
+"""
+
+import argparse
+import random
+import sqlite3
+import threading
+import time
+from types import SimpleNamespace
+
+from app.data import products
+from app.data.products import get_product_by_sku
+from app.data.transactions import commit_sale
+from app.ui.cart import to_paise
+from app.ui.session import active_sessions, end_sale_session, get_sale_session
+from benchmarks._seed import create_database, seed_catalog, sku_for, percentile
+
+
+class Lane:
+    """
+    Stand-in for a Flet page: sale state is keyed by the page's session ID.
+    """
+
+    def __init__(self, lane_id: int) -> None:
+        self.session = SimpleNamespace(id=f"lane-{lane_id}")
+
+
+def run_lane(lane_id, db_path, catalog, sales, lines, scan_samples, checkout_samples, committed, errors, barrier):
+    rng = random.Random(lane_id)
+    page = Lane(lane_id)
+    session = get_sale_session(page)
+    barrier.wait()
+    try:
+        for _ in range(sales):
+            expected = {}
+            for i in rng.sample(range(catalog), lines):
+                sku = sku_for(i)
+                quantity = rng.randint(1, 3)
+                start = time.perf_counter()
+                name, price = get_product_by_sku(sku)
+                session.cart.add(sku, name, quantity, to_paise(price))
+                scan_samples.append(time.perf_counter() - start)
+                expected[sku] = quantity
+
+            if {line.sku: line.quantity for line in session.cart} != expected:
+                errors.append(f"lane {lane_id}: cart does not match its own scans")
+
+            session.payment["method"] = rng.choice(["CASH", "UPI"])
+            start = time.perf_counter()
+            number = commit_sale(session.cart.to_sale_lines(), session.payment["method"], db_path=db_path)
+            checkout_samples.append(time.perf_counter() - start)
+            committed.append((number, expected))
+            session.cart.clear()
+    except Exception as e:
+        errors.append(f"lane {lane_id}: {e!r}")
+    finally:
+        end_sale_session(page)
+
+
+def verify(db_path, committed) -> list:
+    conn = sqlite3.connect(db_path)
+    problems = []
+    for number, expected in committed:
+        stored = dict(conn.execute(
+            """SELECT TI.SKU, TI.QUANTITY FROM TRANSACTION_ITEMS TI
+               JOIN TRANSACTIONS T ON T.ID = TI.TRANSACTION_ID
+               WHERE T.TRANSACTION_NUMBER = ?""",
+            (number,)
+        ).fetchall())
+        if stored != expected:
+            problems.append(f"{number}: stored lines differ from the lane's cart")
+    conn.close()
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--products", type=int, default=50_000)
+    parser.add_argument("--lanes", type=int, default=24)
+    parser.add_argument("--sales", type=int, default=20)
+    parser.add_argument("--lines", type=int, default=30)
+    args = parser.parse_args()
+
+    db_path = create_database()
+    seed_catalog(db_path, args.products)
+    products.DB_PATH = db_path
+    print(f"{args.lanes} lanes x {args.sales} sales x {args.lines} lines ({db_path})")
+
+    scan_samples, checkout_samples, committed, errors = [], [], [], []
+    barrier = threading.Barrier(args.lanes + 1)
+    threads = [
+        threading.Thread(target=run_lane, args=(
+            lane, db_path, args.products, args.sales, args.lines,
+            scan_samples, checkout_samples, committed, errors, barrier
+        ))
+        for lane in range(args.lanes)
+    ]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    print(f"active sessions: {active_sessions()}")
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    errors += verify(db_path, committed)
+    print(f"sales committed: {len(committed)} in {elapsed:.2f} s ({len(committed) / elapsed:.0f} sales/s)")
+    print(f"scan      p50 {percentile(scan_samples, 50) * 1e6:7.1f} us   p99 {percentile(scan_samples, 99) * 1e6:7.1f} us")
+    print(f"checkout  p50 {percentile(checkout_samples, 50) * 1e3:7.2f} ms   p99 {percentile(checkout_samples, 99) * 1e3:7.2f} ms")
+    print(f"sessions left after close: {active_sessions()}")
+    print(f"isolation errors: {len(errors)}")
+    for error in errors[:10]:
+        print(f"  {error}")
+    if errors or active_sessions():
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
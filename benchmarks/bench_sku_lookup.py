@@ -0,0 +1,66 @@
+"""
+Per-lookup latency of SKU queries: a fresh connection per lookup (the old
+``products.get_db_connection``) against the pooled, pre-configured connections.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_sku_lookup [--products 100000] [--lookups 20000]
+"""
+
+import argparse
+import random
+import sqlite3
+import time
+
+from app.data import products
+from app.data.connection import close_pools
+from benchmarks._seed import create_database, seed_catalog, sku_for, percentile
+
+QUERY = "SELECT NAME, SELLING_PRICE AS PRICE FROM PRODUCTS WHERE SKU = ?"
+
+
+def lookup_unpooled(db_path, sku):
+    conn = sqlite3.connect(str(db_path))
+    cur = conn.cursor()
+    cur.execute(QUERY, (sku,))
+    res = cur.fetchone()
+    conn.close()
+    return res
+
+
+def measure(label, lookup, skus):
+    samples = []
+    for sku in skus:
+        start = time.perf_counter()
+        lookup(sku)
+        samples.append(time.perf_counter() - start)
+
+    mean = sum(samples) / len(samples)
+    print(f"{label:<22} mean {mean * 1e6:8.1f} us   p50 {percentile(samples, 50) * 1e6:8.1f} us   "
+          f"p99 {percentile(samples, 99) * 1e6:8.1f} us")
+    return mean
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--products", type=int, default=100_000)
+    parser.add_argument("--lookups", type=int, default=20_000)
+    args = parser.parse_args()
+
+    db_path = create_database()
+    seed_catalog(db_path, args.products)
+    products.DB_PATH = db_path
+
+    rng = random.Random(7)
+    skus = [sku_for(rng.randrange(args.products)) for _ in range(args.lookups)]
+
+    print(f"{args.products} products, {args.lookups} random lookups ({db_path})")
+    before = measure("connection per lookup", lambda sku: lookup_unpooled(db_path, sku), skus)
+    after = measure("pooled connection", products.get_product_by_sku, skus)
+    print(f"speed-up: {before / after:.1f}x")
+
+    close_pools()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Cold-start cost of the POS app: per-module import time (``python -X
+importtime``) and time-to-first-screen, with the AI stack loaded lazily (as
+shipped) versus eagerly at startup (as before).
+
+Time-to-first-screen is measured from process launch until ``main`` is
+imported and the home and sale views are built. Requires the app's
+dependencies (flet; langchain for the eager run).
+
+Run from the repository root:
+
+    python -m benchmarks.bench_startup [--runs 5] [--top 20]
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+FIRST_SCREEN = """
+from types import SimpleNamespace
+{preload}
+import main
+from app.ui.home import home_view
+from app.ui.sale import sale_view
+page = SimpleNamespace(route="/sale")
+home_view(page)
+sale_view(page)
+print("READY", flush=True)
+"""
+
+IMPORT_TARGET = "import main"
+
+EAGER_AI = "from app.ai.ai_assistant import load_ai_stack; load_ai_stack()"
+
+
+def import_times(top: int) -> None:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", IMPORT_TARGET],
+        cwd=ROOT, capture_output=True, text=True
+    )
+    if result.returncode:
+        print(result.stderr.strip().splitlines()[-1])
+        return
+
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        # Nested imports are indented by two spaces per level.
+        name = name[1:]
+        modules.append((int(cumulative_us), int(self_us), name))
+
+    # Top-level entries add up to the total.
+    total = sum(cumulative for cumulative, _, name in modules if not name.startswith(" "))
+    print(f"{IMPORT_TARGET}: {total / 1e3:.1f} ms total, slowest modules (cumulative):")
+    for cumulative, self_us, name in sorted(modules, reverse=True)[:top]:
+        print(f"  {cumulative / 1e3:8.1f} ms  (self {self_us / 1e3:6.1f} ms)  {name.strip()}")
+
+
+def time_to_first_screen(preload: str, runs: int) -> list:
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        process = subprocess.Popen(
+            [sys.executable, "-c", FIRST_SCREEN.format(preload=preload)],
+            cwd=ROOT, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True
+        )
+        line = process.stdout.readline()
+        elapsed = time.perf_counter() - start
+        _, error = process.communicate()
+        if line.strip() != "READY":
+            raise RuntimeError(error.strip().splitlines()[-1] if error.strip() else "first screen not built")
+        samples.append(elapsed)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=20)
+    args = parser.parse_args()
+
+    import_times(args.top)
+    for label, preload in (("lazy AI (default)", ""), ("eager AI", EAGER_AI)):
+        try:
+            samples = time_to_first_screen(preload, args.runs)
+        except RuntimeError as e:
+            print(f"time-to-first-screen, {label}: failed ({e})")
+            continue
+        print(f"time-to-first-screen, {label}: median {statistics.median(samples) * 1e3:.0f} ms, "
+              f"min {min(samples) * 1e3:.0f} ms over {len(samples)} runs")
+
+
+if __name__ == "__main__":
+    main()
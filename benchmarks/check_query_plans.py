@@ -0,0 +1,326 @@
+"""
+Query-plan regression check for every SQL statement the app runs.
+
+Collects the statements in ``app/data``, the assistant's fast paths
+(``app/ai/intent_router.py``) and every view, runs ``EXPLAIN QUERY PLAN`` on
+each against a seeded and analyzed database, and fails (exit status 1) on:
+
+- a full-table scan (``SCAN <table>`` without an index) or a temporary
+  B-tree (``USE TEMP B-TREE FOR ORDER BY/GROUP BY/DISTINCT``) that is not
+  listed in ``ACCEPTED``
+- an index made redundant by another one on the same table, e.g. a plain
+  index on a column that already has a UNIQUE constraint
+- a view or rollup table the assistant cannot read through the SQL sandbox
+  (``app/ai/sql_sandbox.run_query``), e.g. because its plan check fails
+
+It then prints the index plan: each index with the statements that use it,
+and the ``DROP INDEX`` statements for the redundant ones.
+
+Statements are string literals that start with SELECT, WITH, INSERT,
+UPDATE, REPLACE or DELETE, f-strings whose fields are module constants, and
+module-level constants holding SQL (including dicts and lists of it). Format
+templates and SQL built from local values are skipped, and listed by
+``--verbose``.
+
+Run from the repository root:
+
+    python -m benchmarks.check_query_plans [--products 5000] [--sales 20000] [--verbose]
+"""
+
+import argparse
+import ast
+import importlib
+import re
+import sqlite3
+import sys
+from pathlib import Path
+
+from app.ai.sql_sandbox import SandboxError, run_query
+from benchmarks._seed import create_database, seed_catalog, seed_sales
+
+ROOT = Path(__file__).resolve().parents[1]
+
+# Files searched for statements. database_init holds the schema itself (its
+# views are checked from the database), and db_init / insert_records are
+# scripts that write to the app database when imported.
+SOURCES = sorted(set((ROOT / "app" / "data").glob("*.py")) - {
+    ROOT / "app" / "data" / name for name in ("__init__.py", "database_init.py", "db_init.py", "insert_records.py")
+}) + [ROOT / "app" / "ai" / "intent_router.py"]
+
+# Findings reviewed and kept, by statement; each needs a reason.
+ACCEPTED = {
+    # One rollup row per day, read in primary key order.
+    "view DAILY_SALES_SUMMARY": {"SCAN SALES_DAILY"},
+    # Low stock compares two columns of each row; a partial index cannot
+    # express CURRENT_STOCK <= REORDER_LEVEL over changing values.
+    "view LOW_STOCK_ALERTS": {"SCAN P", "USE TEMP B-TREE FOR ORDER BY"},
+    "app.ai.intent_router.LOW_STOCK_SQL": {"SCAN P", "USE TEMP B-TREE FOR ORDER BY"},
+    # The report lists every active product; callers page it with ReaderPool.scan.
+    "view PRODUCT_PERFORMANCE": {"SCAN P"},
+    # Sorts the full-text matches by rank; there are at most SEARCH_CANDIDATES of them.
+    "app.data.product_search.SEARCH_SQL": {"SCAN M", "USE TEMP B-TREE FOR ORDER BY"},
+    # Group one sale's items by product; there are at most a basket's lines.
+    "app.data.transactions.LOG_SALE_MOVEMENTS": {"SCAN I", "USE TEMP B-TREE FOR GROUP BY"},
+    "app.data.transactions.ADD_PRODUCT_SALES": {"USE TEMP B-TREE FOR GROUP BY"},
+}
+
+_STATEMENT = re.compile(r"^\s*(SELECT|WITH|INSERT|UPDATE|REPLACE|DELETE)\s+\S", re.I)
+_TEMPLATE = re.compile(r"\{\w*\}")
+# SCAN <table or alias> with no index; subqueries print as "SCAN (subquery-N)".
+_FULL_SCAN = re.compile(r"^SCAN (\w+)$")
+_INDEX_USE = re.compile(r"\bUSING (?:COVERING )?INDEX (\w+)")
+
+
+def _is_sql(value) -> bool:
+    return isinstance(value, str) and bool(_STATEMENT.match(value)) and not _TEMPLATE.search(value)
+
+
+def _module_name(path: Path) -> str:
+    return ".".join(path.relative_to(ROOT).with_suffix("").parts)
+
+
+def collect_statements() -> tuple:
+    """
+    Find the SQL statements in ``SOURCES``.
+
+    Returns:
+        tuple: ({key: sql}, [keys of statements that could not be resolved])
+    """
+    statements, skipped = {}, []
+
+    def add(key: str, sql: str) -> None:
+        n, unique = 1, key
+        while unique in statements and statements[unique] != sql:
+            n += 1
+            unique = f"{key}#{n}"
+        statements[unique] = sql
+
+    for path in SOURCES:
+        name = _module_name(path)
+        namespace = vars(importlib.import_module(name))
+        tree = ast.parse(path.read_text(), str(path))
+
+        # Module constants, including dicts and lists of statements built at import.
+        for node in tree.body:
+            targets = node.targets if isinstance(node, ast.Assign) else []
+            for target in targets:
+                if isinstance(target, ast.Name):
+                    value = namespace.get(target.id)
+                    if _is_sql(value):
+                        add(f"{name}.{target.id}", value)
+                    elif isinstance(value, dict):
+                        for item_key, item in value.items():
+                            if _is_sql(item):
+                                add(f"{name}.{target.id}[{item_key}]", item)
+                    elif isinstance(value, (list, tuple)):
+                        for i, item in enumerate(value):
+                            if _is_sql(item):
+                                add(f"{name}.{target.id}[{i}]", item)
+
+        # Literals and constant-only f-strings inside functions and methods.
+        def visit(node, scope: list) -> None:
+            for child in ast.iter_child_nodes(node):
+                if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                    visit(child, scope + [child.name])
+                    continue
+                if isinstance(child, ast.Expr) and isinstance(child.value, ast.Constant):
+                    continue  # docstring
+                key = ".".join([name] + scope)
+                if scope and isinstance(child, ast.Constant) and _is_sql(child.value):
+                    add(key, child.value)
+                elif scope and isinstance(child, ast.JoinedStr):
+                    text = _resolve(child, namespace)
+                    if _is_sql(text):
+                        add(key, text)
+                    elif text is None and _STATEMENT.match(_literal_head(child)):
+                        skipped.append(f"{key} (line {child.lineno})")
+                    continue
+                visit(child, scope)
+
+        visit(tree, [])
+    return statements, skipped
+
+
+def _literal_head(node: ast.JoinedStr) -> str:
+    first = node.values[0] if node.values else None
+    return first.value if isinstance(first, ast.Constant) else ""
+
+
+def _resolve(node: ast.JoinedStr, namespace: dict):
+    """
+    The f-string's text if every field is a module constant, else None.
+    """
+    parts = []
+    for value in node.values:
+        if isinstance(value, ast.Constant):
+            parts.append(value.value)
+        elif isinstance(value, ast.FormattedValue) and isinstance(value.value, ast.Name) \
+                and value.format_spec is None and isinstance(namespace.get(value.value.id), (str, int)):
+            parts.append(str(namespace[value.value.id]))
+        else:
+            return None
+    return "".join(parts)
+
+
+def _parameters(sql: str):
+    named = re.findall(r"(?<!:):(\w+)", re.sub(r"'[^']*'", "''", sql))
+    if named:
+        return {name: None for name in named}
+    return (None,) * re.sub(r"'[^']*'", "''", sql).count("?")
+
+
+def explain(conn: sqlite3.Connection, sql: str) -> list:
+    """
+    Plan lines of ``sql`` with every parameter bound to NULL.
+    """
+    return [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", _parameters(sql))]
+
+
+def findings(plan: list) -> set:
+    """
+    Full-table scans and temporary B-trees in a plan.
+    """
+    found = set()
+    for detail in plan:
+        scan = _FULL_SCAN.match(detail)
+        if scan and not scan.group(1).lower().startswith("sqlite_"):
+            found.add(detail)
+        elif detail.startswith("USE TEMP B-TREE"):
+            found.add(detail)
+    return found
+
+
+def index_plan(conn: sqlite3.Connection, used: dict) -> tuple:
+    """
+    Every index with the statements that use it, and the redundant ones.
+
+    An index is redundant when another index on the same table starts with
+    the same columns, in the same order and collation, and is unique or
+    longer; or when it covers only the table's INTEGER PRIMARY KEY.
+
+    Returns:
+        tuple: ([(table, index, columns, unique, users, role)], {redundant index: index that covers it})
+    """
+    listing, redundant = [], {}
+    tables = [row[0] for row in conn.execute(
+        "SELECT NAME FROM sqlite_master WHERE TYPE = 'table' AND NAME NOT LIKE 'sqlite_%' ORDER BY NAME")]
+    for table in tables:
+        rowid_key = [row[1] for row in conn.execute(f"PRAGMA table_info({table})")
+                     if row[5] == 1 and row[2].upper() == "INTEGER"]
+        # Child columns of foreign keys: their index serves ON DELETE actions and checks.
+        references = {row[3] for row in conn.execute(f"PRAGMA foreign_key_list({table})")}
+        keys = {}
+        for _, index, unique, origin, partial in conn.execute(f"PRAGMA index_list({table})").fetchall():
+            if partial:
+                continue
+            keys[index] = (bool(unique), [(row[2], row[3], row[4]) for row in conn.execute(f"PRAGMA index_xinfo({index})")
+                                          if row[5]])
+            columns = [column for column, _, _ in keys[index][1]]
+            role = "primary key" if origin == "pk" else "foreign key" if columns[0] in references else ""
+            listing.append((table, index, columns, bool(unique), sorted(used.get(index, ())), role))
+        for index, (unique, columns) in keys.items():
+            if not unique and [column for column, _, _ in columns] == rowid_key:
+                redundant[index] = "INTEGER PRIMARY KEY"
+                continue
+            for other, (other_unique, other_columns) in keys.items():
+                if other == index or other_columns[:len(columns)] != columns or index.startswith("sqlite_autoindex"):
+                    continue
+                if unique and not (other_unique and len(other_columns) == len(columns)):
+                    continue
+                if other_unique or len(other_columns) > len(columns) or (other.startswith("sqlite_autoindex")):
+                    redundant[index] = other
+                    break
+    return listing, redundant
+
+
+def agent_failures(conn, db_path) -> list:
+    """
+    Read every view and every table without a rowid the way the assistant does.
+
+    Returns:
+        list: ``(name, error)`` for each one the SQL sandbox refused
+    """
+    names = [row[0] for row in conn.execute(
+        "SELECT NAME FROM sqlite_master WHERE TYPE = 'view' OR (TYPE = 'table' AND SQL LIKE '%WITHOUT ROWID%') "
+        "ORDER BY NAME")]
+    failures = []
+    for name in names:
+        try:
+            run_query(f"SELECT * FROM {name}", db_path)
+        except SandboxError as e:
+            failures.append((name, str(e)))
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--products", type=int, default=5000)
+    parser.add_argument("--sales", type=int, default=20_000)
+    parser.add_argument("--verbose", action="store_true", help="print every plan and the skipped statements")
+    args = parser.parse_args()
+
+    db_path = create_database()
+    seed_catalog(db_path, args.products)
+    seed_sales(db_path, args.sales)
+    conn = sqlite3.connect(db_path)
+    # Plans as the app sees them once maintenance has analyzed the database.
+    conn.execute("ANALYZE")
+
+    statements, skipped = collect_statements()
+    for (view,) in conn.execute("SELECT NAME FROM sqlite_master WHERE TYPE = 'view' ORDER BY NAME").fetchall():
+        statements[f"view {view}"] = f"SELECT * FROM {view}"
+
+    failures, errors, stale, used = [], [], [], {}
+    for key, sql in statements.items():
+        try:
+            plan = explain(conn, sql)
+        except sqlite3.Error as e:
+            # e.g. statements on the bulk import's temporary staging table
+            errors.append(f"{key}: {e}")
+            continue
+        for detail in plan:
+            for index in _INDEX_USE.findall(detail):
+                used.setdefault(index, set()).add(key)
+        found = findings(plan)
+        stale.extend(f"{key}: {finding}" for finding in ACCEPTED.get(key, set()) - found)
+        new = found - ACCEPTED.get(key, set())
+        if new:
+            failures.append((key, sorted(new), plan))
+        if args.verbose:
+            print(f"{key}\n" + "".join(f"    {detail}\n" for detail in plan))
+
+    listing, redundant = index_plan(conn, used)
+    stale += [f"{key}: not a statement" for key in ACCEPTED if key not in statements]
+    refused = agent_failures(conn, db_path)
+    conn.close()
+
+    print(f"{len(statements)} statements planned, {len(errors)} not plannable, {len(skipped)} not resolvable")
+    if args.verbose:
+        for line in errors + skipped:
+            print(f"  skipped {line}")
+    for line in stale:
+        print(f"  ACCEPTED entry no longer needed: {line}")
+
+    print("\nIndex plan:")
+    for table, index, columns, unique, users, role in listing:
+        state = f"DROP (covered by {redundant[index]})" if index in redundant else (
+            f"{len(users)} statement(s)" if users else role or "unused by app statements")
+        print(f"  {table:<18} {index:<38} ({', '.join(columns)}){' UNIQUE' if unique else ''}: {state}")
+    for index in redundant:
+        print(f"DROP INDEX IF EXISTS {index};")
+
+    for key, new, plan in failures:
+        print(f"\nFAIL {key}: {', '.join(new)}")
+        for detail in plan:
+            print(f"    {detail}")
+    for name, error in refused:
+        print(f"\nFAIL agent query on {name}: {error}")
+    if failures or redundant or refused:
+        print(f"\n{len(failures)} statement(s) with new scans or sorts, {len(redundant)} redundant index(es), "
+              f"{len(refused)} view(s) or table(s) the assistant cannot read")
+        sys.exit(1)
+    print("\nNo new full scans, temporary B-trees or redundant indexes; the assistant can read every view")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,22 @@
 import os
+import threading
 import flet as ft
+from app.ai.ai_assistant import prewarm_ai
+from app.data import products
+from app.data.connection import close_pools
+from app.data.maintenance import start_maintenance, stop_maintenance
+from app.data.migrations import migrate
+from app.data.products import warm_catalog_cache
 from app.ui.home import home_view
 from app.ui.sale import sale_view, checkout_view
+from app.ui.render import drop_scheduler, get_scheduler
+from app.ui.session import end_sale_session
+from app.ui.views import drop_views, get_views
 from app.ui.inventory import inventory_view
-from app.ui.chat import chat_view
+from app.ui.chat import cancel_chat, chat_view
+
+# Seconds after the first screen is shown before the AI stack starts loading.
+AI_PREWARM_DELAY = 2.0
 
 
 def main(page: ft.Page) -> None:
@@ -19,51 +32,56 @@ def main(page: ft.Page) -> None:
             top_view = page.views[-1]
             await page.push_route(top_view.route)
             
+    # Views are built on first visit and reused; checkout is rebuilt from the cart each time.
+    views = get_views(page)
+    views.add("/home", home_view, default=True)
+    views.add("/sale", sale_view)
+    views.add("/inventory", inventory_view)
+    views.add("/checkout", checkout_view, retain=False)
+    views.add("/chat", chat_view)
+
     def route_change():
-        page.views.clear()
-        
-        if page.route == "/home":
-            page.views.append(
-                home_view(page)
-            )
-            
-        elif page.route == "/sale":
-            page.views.append(
-                sale_view(page)
-            )
-            
-        elif page.route == "/inventory":
-            page.views.append(
-                inventory_view(page)
-            )
-        
-        elif page.route == "/checkout":
-            page.views.append(
-                checkout_view(page)
-            )
-        
-        elif page.route == "/chat":
-            page.views.append(
-                chat_view(page)
-            )
-        
-        else:
-            page.views.append(
-                home_view(page)
-            )
+        view = views.show(page.route)
+        if len(page.views) != 1 or page.views[0] is not view:
+            page.views.clear()
+            page.views.append(view)
+
+        get_scheduler(page).request()
 
-        page.update()
+    # Flet keeps a session across short disconnects; its cart goes when it closes.
+    def close_session(e):
+        cancel_chat(page)
+        end_sale_session(page)
+        drop_scheduler(page)
+        drop_views(page)
 
-    page.on_route_change = route_change
+    page.on_close = close_session
+    # Navigation and everything the new view requests go out as one update.
+    routed = get_scheduler(page).handler(route_change)
+    page.on_route_change = routed
     # page.go("/home") # Process the initial route (e.g., "/")
     page.on_view_pop = view_pop
 
-    route_change()
+    routed()
+
+    # The AI stack is imported on first use; optionally load it now that the
+    # first screen is up, so the first chat question does not wait for it.
+    if os.environ.get("POSAI_PREWARM_AI", "1") == "1":
+        prewarm_ai(delay=AI_PREWARM_DELAY)
 
 if __name__ == "__main__":
     os.environ["FLET_SERVER_PORT"] = "8080"
     os.environ["FLET_SERVER_IP"] = "0.0.0.0"
 
+    # Bring the schema up to date; a single version read when it already is.
+    migrate(products.DB_PATH)
+
+    # Preload the fastest-moving SKUs once per process, off the UI path.
+    threading.Thread(target=warm_catalog_cache, daemon=True).start()
+
+    # Checkpoint the WAL in the background and tidy up the database when idle.
+    start_maintenance(products.DB_PATH)
+
     # ft.run(
     #     main=main,
     #     view=ft.AppView.WEB_BROWSER,
@@ -71,4 +89,8 @@ if __name__ == "__main__":
     #     host="0.0.0.0"
     # )
     
-    ft.run(main=main)
\ No newline at end of file
+    try:
+        ft.run(main=main)
+    finally:
+        stop_maintenance()
+        close_pools()
\ No newline at end of file